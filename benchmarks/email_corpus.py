@@ -0,0 +1,220 @@
+# File: benchmarks/email_corpus.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""
+Generator of the synthetic RFC822 messages parsed by the email parsing benchmark.
+
+The messages are generated from a seeded random generator, so the same corpus is parsed by every run. Their bodies are
+sprinkled with the URLs, domains, IP addresses, email addresses and hashes the app extracts as artifacts.
+"""
+import hashlib
+import random
+from email import encoders
+from email.header import Header
+from email.mime.application import MIMEApplication
+from email.mime.base import MIMEBase
+from email.mime.message import MIMEMessage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formataddr, formatdate
+
+WORDS = (
+    "invoice payment account password verify urgent security update mailbox quota delivery report meeting agenda review "
+    "contract shipment order confirm reset login portal customer support ticket"
+).split()
+
+# Charsets of the 'odd_charsets' messages, with text each of them can encode
+CHARSET_TEXTS = (
+    ("iso-8859-1", "Facture impayée, réglez-la avant échéance"),
+    ("windows-1252", "Zahlungsbestätigung für Ihre Bestellung – dringend"),
+    ("koi8-r", "Срочно подтвердите учетную запись"),
+    ("shift_jis", "アカウントの確認をお願いします"),
+    ("gb2312", "请立即验证您的帐户"),
+    ("iso-2022-jp", "請求書を添付します"),
+    ("big5", "請確認您的付款資訊"),
+)
+
+CORPUS_KINDS = ("plain", "html_heavy", "many_attachments", "nested_rfc822", "odd_charsets", "hex_heavy")
+
+
+class _Generator:
+    def __init__(self, seed):
+        self._random = random.Random(seed)
+
+    def words(self, count):
+        return " ".join(self._random.choice(WORDS) for _ in range(count))
+
+    def domain(self):
+        return "{0}-{1}.example.{2}".format(self._random.choice(WORDS), self._random.randint(1, 999), self._random.choice(["com", "net", "org"]))
+
+    def url(self):
+        return "https://{0}/{1}/{2}?id={3}".format(
+            self.domain(), self._random.choice(WORDS), self._random.choice(WORDS), self._random.randint(1, 10**6)
+        )
+
+    def ip(self):
+        return ".".join(str(self._random.randint(1, 254)) for _ in range(4))
+
+    def address(self):
+        return "{0}.{1}@{2}".format(self._random.choice(WORDS), self._random.randint(1, 99), self.domain())
+
+    def digest(self):
+        algorithm = self._random.choice([hashlib.md5, hashlib.sha1, hashlib.sha256])
+        return algorithm(str(self._random.random()).encode()).hexdigest()
+
+    def bytes(self, size):
+        return self._random.getrandbits(size * 8).to_bytes(size, "little") if size else b""
+
+    def text(self, size):
+        """
+        :return: text of about size characters, one indicator of compromise every few lines
+        """
+        lines, length = [], 0
+        while length < size:
+            indicator = self._random.choice([self.url, self.ip, self.address, self.digest, self.domain])()
+            line = "{0} {1} {2}".format(self.words(8), indicator, self.words(4))
+            lines.append(line)
+            length += len(line) + 1
+        return "\n".join(lines)
+
+    def html(self, size):
+        """
+        :return: HTML document of about size characters, with tables, styles, links and images
+        """
+        rows, length = [], 0
+        while length < size:
+            row = (
+                '<tr><td style="font-family:Arial;color:#{0:06x};padding:4px">{1}</td>'
+                '<td><a href="{2}" target="_blank">{3}</a></td>'
+                '<td><img src="{4}/logo.png" width="16" height="16" alt="{5}"></td>'
+                "<td>{6} {7}</td></tr>"
+            ).format(
+                self._random.getrandbits(24),
+                self.words(6),
+                self.url(),
+                self.url(),
+                self.url(),
+                self._random.choice(WORDS),
+                self.ip(),
+                self.digest(),
+            )
+            rows.append(row)
+            length += len(row)
+        style = "<style>td {border:1px solid #ccc}</style>"
+        return '<html><head>{0}</head><body><table>{1}</table><a href="mailto:{2}">{2}</a></body></html>'.format(
+            style, "".join(rows), self.address()
+        )
+
+    def hex_dump(self, size):
+        """
+        :return: text of about size characters made of hex dumps and hashes
+        """
+        lines, length = [], 0
+        while length < size:
+            if self._random.random() < 0.5:
+                line = "{0:08x}  {1}".format(length, " ".join("{0:02x}".format(byte) for byte in self.bytes(16)))
+            else:
+                line = "{0} {1} {2}".format(self.digest(), self.digest(), self.bytes(24).hex())
+            lines.append(line)
+            length += len(line) + 1
+        return "\n".join(lines)
+
+    def multipart(self, subtype):
+        # The default boundaries are random, they are generated from the seed to keep the corpus reproducible
+        return MIMEMultipart(subtype, boundary="=_{0:032x}".format(self._random.getrandbits(128)))
+
+    def headers(self, message, subject=None):
+        message["Subject"] = subject or self.words(5)
+        message["From"] = formataddr((self.words(2).title(), self.address()))
+        message["To"] = ", ".join(formataddr((self.words(2).title(), self.address())) for _ in range(self._random.randint(1, 4)))
+        message["Date"] = formatdate(1700000000 + self._random.randint(0, 10**6))
+        message["Message-ID"] = "<{0:x}.{1:x}@{2}>".format(self._random.getrandbits(64), self._random.getrandbits(32), self.domain())
+        message["Received"] = "from {0} ([{1}]) by {2} with ESMTPS".format(self.domain(), self.ip(), self.domain())
+        message["X-Originating-IP"] = "[{0}]".format(self.ip())
+        return message
+
+    def attachment(self, index, size):
+        kind = index % 4
+        if kind == 0:
+            part = MIMEText(self.text(size), "plain", "utf-8")
+            file_name = "notes_{0}.txt".format(index)
+        elif kind == 1:
+            part = MIMEApplication(b"%PDF-1.4\n" + self.bytes(size), "pdf")
+            file_name = "invoice_{0}.pdf".format(index)
+        elif kind == 2:
+            part = MIMEBase("image", "png")
+            part.set_payload(b"\x89PNG\r\n\x1a\n" + self.bytes(size))
+            encoders.encode_base64(part)
+            file_name = "image_{0}.png".format(index)
+        else:
+            part = MIMEText("\n".join(",".join([self.address(), self.ip(), self.url()]) for _ in range(max(size // 120, 1))), "csv", "utf-8")
+            file_name = "export_{0}.csv".format(index)
+        part.add_header("Content-Disposition", "attachment", filename=file_name)
+        return part
+
+    def plain(self, size):
+        return self.headers(MIMEText(self.text(size), "plain", "utf-8"))
+
+    def html_heavy(self, size):
+        message = self.multipart("alternative")
+        message.attach(MIMEText(self.text(size // 10), "plain", "utf-8"))
+        message.attach(MIMEText(self.html(size), "html", "utf-8"))
+        return self.headers(message)
+
+    def many_attachments(self, size, attachments=20):
+        message = self.multipart("mixed")
+        message.attach(MIMEText(self.text(size // 4), "plain", "utf-8"))
+        for index in range(attachments):
+            message.attach(self.attachment(index, self._random.randint(size // 8, size // 2)))
+        return self.headers(message)
+
+    def nested_rfc822(self, size, depth=3):
+        inner = self.html_heavy(size // (depth + 1))
+        for level in range(depth):
+            message = self.multipart("mixed")
+            message.attach(MIMEText(self.text(size // (depth + 1)), "plain", "utf-8"))
+            message.attach(self.attachment(level, size // 8))
+            forwarded = MIMEMessage(inner)
+            forwarded.add_header("Content-Disposition", "attachment", filename="forwarded_{0}.eml".format(level))
+            message.attach(forwarded)
+            inner = self.headers(message, subject="Fw: {0}".format(self.words(4)))
+        return inner
+
+    def odd_charsets(self, size):
+        message = self.multipart("mixed")
+        for charset, text in CHARSET_TEXTS:
+            body = "\n".join("{0} {1}".format(text, self.text(80)) for _ in range(max(size // (len(CHARSET_TEXTS) * 120), 1)))
+            message.attach(MIMEText(body, self._random.choice(["plain", "html"]), charset))
+        charset, text = self._random.choice(CHARSET_TEXTS)
+        self.headers(message, subject=Header(text, charset).encode())
+        del message["From"]
+        message["From"] = "{0} <{1}>".format(Header(text[:8], charset).encode(), self.address())
+        return message
+
+    def hex_heavy(self, size):
+        message = self.multipart("mixed")
+        message.attach(MIMEText(self.hex_dump(size), "plain", "utf-8"))
+        message.attach(MIMEText("<html><body><pre>{0}</pre></body></html>".format(self.hex_dump(size // 4)), "html", "utf-8"))
+        return self.headers(message)
+
+
+def generate_corpus(count=5, size=32 * 1024, seed=0):
+    """
+    :param count: Number of messages of every kind
+    :param size: Approximate size of the bodies of a message in bytes
+    :param seed: Seed of the random generator
+    :return: dictionary of the lists of the RFC822 messages, as strings, of every kind of CORPUS_KINDS
+    """
+    generator = _Generator(seed)
+    return {kind: [getattr(generator, kind)(size).as_string() for _ in range(count)] for kind in CORPUS_KINDS}
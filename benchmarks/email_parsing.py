@@ -0,0 +1,176 @@
+# File: benchmarks/email_parsing.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""
+Measures the CPU cost of the email parsing of the ingestion, offline.
+
+Every kind of message of the generated corpus (email_corpus.py) is parsed end to end by ProcessEmail.process_email,
+with the SOAR platform modules replaced by the in-memory stand-in (soar_stub.py). The extractors of the indicators
+and of the header artifacts are also timed on their own, on the text bodies and the MIME parts of the same messages.
+
+The reported times are the medians of the runs, per message. The results can be written as JSON and compared with
+the results of a previous run, e.g. of the previous version of the app on the same machine.
+
+Usage: python benchmarks/email_parsing.py [--count 5] [--size 32768] [--output after.json] [--compare before.json]
+"""
+import argparse
+import email
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(BENCHMARKS_DIR), BENCHMARKS_DIR]
+
+import soar_stub  # noqa: E402
+from email_corpus import CORPUS_KINDS, generate_corpus  # noqa: E402
+
+soar_stub.install()
+
+import office365_connector  # noqa: E402
+from process_email import PROC_EMAIL_JSON_EMAIL_HEADERS, ProcessEmail  # noqa: E402
+
+PARSING_CONFIG = {
+    "extract_attachments": True,
+    "extract_urls": True,
+    "extract_ips": True,
+    "extract_domains": True,
+    "extract_hashes": True,
+    "add_body_to_header_artifacts": False,
+}
+
+PROCESS_EMAIL = "process_email"
+
+
+def new_process_email():
+    connector = office365_connector.Office365Connector()
+    connector.config = dict(PARSING_CONFIG)
+    connector.action_identifier = "on_poll"
+    return ProcessEmail(connector, connector.config)
+
+
+def get_text_bodies(mail):
+    """
+    :return: list of the decoded text parts of the message, the inputs of the indicator extractors
+    """
+    bodies = []
+    for part in mail.walk():
+        if part.get_content_maintype() != "text" or part.get_filename():
+            continue
+        payload = part.get_payload(decode=True) or b""
+        try:
+            bodies.append(payload.decode(part.get_content_charset() or "utf-8", errors="replace"))
+        except LookupError:
+            bodies.append(payload.decode("utf-8", errors="replace"))
+    return bodies
+
+
+def parse_email(rfc822_email, index):
+    ret_val, msg = new_process_email().process_email(rfc822_email, "benchmark-{0}".format(index), epoch=time.time())
+    if not ret_val:
+        raise RuntimeError(msg)
+
+
+def get_benchmarks(messages):
+    """
+    :return: dictionary of the functions running a benchmark over all the messages of a kind
+    """
+    processor = new_process_email()
+    mails = [email.message_from_string(message) for message in messages]
+    bodies = [body for mail in mails for body in get_text_bodies(mail)]
+    parts = [part for mail in mails for part in mail.walk()]
+
+    def extract_headers():
+        for part in parts:
+            processor._parse_email_headers({PROC_EMAIL_JSON_EMAIL_HEADERS: []}, part)
+
+    return {
+        PROCESS_EMAIL: lambda: [parse_email(message, index) for index, message in enumerate(messages)],
+        "_extract_urls_domains": lambda: [processor._extract_urls_domains(body, [], []) for body in bodies],
+        "_get_ips": lambda: [processor._get_ips(body, []) for body in bodies],
+        "_extract_hashes": lambda: [processor._extract_hashes(body, []) for body in bodies],
+        "_parse_email_headers": extract_headers,
+    }
+
+
+def measure(benchmark, runs, count):
+    """
+    :return: dictionary of the median and minimum durations per message in milliseconds
+    """
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        benchmark()
+        durations.append((time.perf_counter() - start) * 1000 / count)
+    return {"median_ms": round(statistics.median(durations), 3), "min_ms": round(min(durations), 3)}
+
+
+def get_change(result, previous):
+    if not previous or not previous.get("median_ms"):
+        return ""
+    return "{0:+.1f}%".format((result["median_ms"] - previous["median_ms"]) * 100 / previous["median_ms"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5, help="number of messages of every kind")
+    parser.add_argument("--size", type=int, default=32 * 1024, help="approximate size of the bodies of a message in bytes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus generator")
+    parser.add_argument("--kind", action="append", choices=CORPUS_KINDS, help="kind of messages to parse, all the kinds by default")
+    parser.add_argument("--runs", type=int, default=5, help="number of timed runs of every benchmark")
+    parser.add_argument("--output", help="path of a JSON file to write the results to")
+    parser.add_argument("--compare", help="path of the JSON results of a previous run to compare with")
+    args = parser.parse_args()
+
+    previous_results = dict()
+    if args.compare:
+        with open(args.compare) as previous:
+            previous_results = json.load(previous)["results"]
+
+    corpus = generate_corpus(count=args.count, size=args.size, seed=args.seed)
+    kinds = args.kind or CORPUS_KINDS
+
+    results = dict()
+    print("{:<18} {:<24} {:>14} {:>12} {:>9}".format("kind", "benchmark", "median (ms)", "min (ms)", "change"))
+    for kind in kinds:
+        results[kind] = dict()
+        for name, benchmark in get_benchmarks(corpus[kind]).items():
+            # Warm up the lazy imports and the compiled regular expressions out of the timed runs
+            benchmark()
+            result = measure(benchmark, args.runs, args.count)
+            results[kind][name] = result
+            change = get_change(result, previous_results.get(kind, {}).get(name))
+            print("{:<18} {:<24} {:>14.3f} {:>12.3f} {:>9}".format(kind, name, result["median_ms"], result["min_ms"], change))
+
+    if args.output:
+        output_data = {
+            "corpus": {
+                "count": args.count,
+                "size": args.size,
+                "seed": args.seed,
+                "bytes": {kind: sum(len(message) for message in corpus[kind]) for kind in kinds},
+            },
+            "runs": args.runs,
+            "python": platform.python_version(),
+            "results": results,
+        }
+        with open(args.output, "w") as output:
+            json.dump(output_data, output, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# File: benchmarks/import_time.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""
+Measures the import cost paid by every action of the app.
+
+Every action runs in a new process, which imports the connector module and then the modules the action loads on
+first use. Each measurement imports these modules in a fresh interpreter, and the median of the runs is reported.
+
+Usage: python benchmarks/import_time.py [--runs 5] [--action on_poll] [--cba]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules loaded on first use by the actions parsing emails, on top of the connector module
+EMAIL_PARSING_MODULES = ["bs4", "process_email"]
+EMAIL_PARSING_ACTIONS = ["on_poll", "get_email", "get_mailbox_messages"]
+
+# Module loaded on first use when the asset uses the certificate based authentication
+CBA_MODULES = ["msal"]
+
+# Modules that must not be loaded by the import of the connector module
+LAZY_MODULES = ["bs4", "django.http", "magic", "msal", "process_email"]
+
+MEASURE_SCRIPT = """
+import sys
+import time
+
+sys.path.insert(0, {app_dir!r})
+start = time.perf_counter()
+import office365_connector
+connector_time = time.perf_counter() - start
+eagerly_loaded = [module for module in {lazy_modules!r} if module in sys.modules]
+
+start = time.perf_counter()
+for module in {modules!r}:
+    __import__(module)
+action_time = time.perf_counter() - start
+print(connector_time, action_time, ",".join(eagerly_loaded))
+"""
+
+
+def measure(modules, runs):
+    script = MEASURE_SCRIPT.format(app_dir=APP_DIR, lazy_modules=LAZY_MODULES, modules=modules)
+    connector_times, action_times = [], []
+    eagerly_loaded = ""
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout.split()
+        connector_times.append(float(output[0]))
+        action_times.append(float(output[1]))
+        eagerly_loaded = output[2] if len(output) > 2 else ""
+    return statistics.median(connector_times) * 1000, statistics.median(action_times) * 1000, eagerly_loaded
+
+
+def get_action_modules(action, cba):
+    modules = list(EMAIL_PARSING_MODULES) if action in EMAIL_PARSING_ACTIONS else []
+    return modules + CBA_MODULES if cba else modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters per measurement")
+    parser.add_argument("--action", help="identifier of the action to measure, all the actions by default")
+    parser.add_argument("--cba", action="store_true", help="include the modules loaded by the certificate based authentication")
+    args = parser.parse_args()
+
+    with open(os.path.join(APP_DIR, "office365.json")) as app_json:
+        actions = [action["identifier"] for action in json.load(app_json)["actions"]]
+    if args.action:
+        actions = [args.action]
+
+    print("{:<25} {:>15} {:>15} {:>12}  {}".format("action", "connector (ms)", "on use (ms)", "total (ms)", "modules loaded on use"))
+    for action in actions:
+        modules = get_action_modules(action, args.cba)
+        connector_time, action_time, eagerly_loaded = measure(modules, args.runs)
+        print(
+            "{:<25} {:>15.1f} {:>15.1f} {:>12.1f}  {}".format(
+                action, connector_time, action_time, connector_time + action_time, ", ".join(modules) or "-"
+            )
+        )
+        if eagerly_loaded:
+            print("  warning: the connector module loads {} at import time".format(eagerly_loaded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# File: benchmarks/mock_graph.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""
+Local stand-in of the MS Graph mail endpoints used by the ingestion, serving a synthetic mailbox.
+
+The messages, their attachments and nested item attachments are generated from their index, so a mailbox of any size
+costs no memory. The server supports $select, $filter on lastModifiedDateTime, $orderBy, $top/$skip paging through
+@odata.nextLink, JSON batching, and throttles every Nth request with a 429 response and a Retry-After header.
+"""
+import base64
+import json
+import re
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+START_TIME = datetime(2024, 1, 1)
+
+FILLER = (
+    "<p>Hello team, the report for host 10.{a}.{b}.7 is available at https://reports{b}.example.com/view?id={a}&amp;q={b} "
+    "and the file hash is {sha256}. Please reach out to support{a}@example.org or visit http://www.example.net/{a}/{b} "
+    "for more details about this incident.</p>\n"
+)
+
+MESSAGES_PATH = re.compile(r"/v1\.0/users/(?P<mailbox>[^/]+)(?:/mailFolders/[^/]+)?/messages")
+MESSAGE_PATH = re.compile(r"/v1\.0/users/(?P<mailbox>[^/]+)(?:/mailFolders/[^/]+)?/messages/(?P<message>[^/]+)")
+MESSAGE_VALUE_PATH = re.compile(r"/v1\.0/users/(?P<mailbox>[^/]+)(?:/mailFolders/[^/]+)?/messages/(?P<message>[^/]+)/\$value")
+ATTACHMENTS_PATH = re.compile(r"/v1\.0/users/(?P<mailbox>[^/]+)(?:/mailFolders/[^/]+)?/messages/(?P<message>[^/]+)/attachments")
+ATTACHMENT_PATH = re.compile(ATTACHMENTS_PATH.pattern + r"/(?P<attachment>[^/]+)")
+ATTACHMENT_VALUE_PATH = re.compile(ATTACHMENT_PATH.pattern + r"/\$value")
+
+
+@dataclass
+class MailboxSpec:
+    """
+    Shape of the synthetic mailbox.
+    """
+
+    messages: int = 100
+    body_size: int = 8 * 1024
+    attachments: int = 1
+    attachment_size: int = 64 * 1024
+    item_attachments: int = 0
+    nesting_depth: int = 1
+    throttle_every: int = 0
+    retry_after: int = 0
+
+
+class MockGraph:
+    """
+    Request handling of the stand-in, independent of the HTTP server so that the JSON batches are served by it too.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.url = None
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def _message_id(self, index):
+        return "AAMkAGI2-{0:08d}".format(index)
+
+    def _message_index(self, message_id):
+        return int(message_id.rsplit("-", 1)[1])
+
+    def _body(self, index):
+        body = []
+        size = 0
+        while size < self.spec.body_size:
+            chunk = FILLER.format(a=index % 256, b=len(body) % 256, sha256="{0:064x}".format(index * 7919 + len(body)))
+            body.append(chunk)
+            size += len(chunk)
+        return "<html><body>\n{0}</body></html>".format("".join(body))[: max(self.spec.body_size, 64)]
+
+    def _message(self, index):
+        timestamp = (START_TIME + timedelta(seconds=index)).strftime(TIME_FORMAT)
+        body = self._body(index)
+        sender = {"emailAddress": {"name": "Sender {0}".format(index % 50), "address": "sender{0}@example.com".format(index % 50)}}
+        return {
+            "@odata.etag": 'W/"{0}"'.format(index),
+            "id": self._message_id(index),
+            "createdDateTime": timestamp,
+            "lastModifiedDateTime": timestamp,
+            "receivedDateTime": timestamp,
+            "sentDateTime": timestamp,
+            "hasAttachments": bool(self.spec.attachments or self.spec.item_attachments),
+            "internetMessageId": "<message{0}@example.com>".format(index),
+            "subject": "Benchmark message {0}".format(index),
+            "bodyPreview": re.sub("<[^>]+>", "", body)[:255],
+            "importance": "normal",
+            "parentFolderId": "inbox",
+            "conversationId": "conversation{0}".format(index // 3),
+            "isRead": False,
+            "isDraft": False,
+            "webLink": "https://outlook.office365.com/owa/?ItemID={0}".format(index),
+            "body": {"contentType": "html", "content": body},
+            "uniqueBody": {"contentType": "html", "content": body},
+            "sender": sender,
+            "from": sender,
+            "toRecipients": [{"emailAddress": {"name": "Analyst", "address": "analyst@example.com"}}],
+            "ccRecipients": [],
+            "bccRecipients": [],
+            "replyTo": [],
+            "categories": [],
+            "internetMessageHeaders": [
+                {"name": "Received", "value": "from mail{0}.example.com (10.0.{1}.1) by mx.example.com".format(index, index % 256)},
+                {"name": "Message-ID", "value": "<message{0}@example.com>".format(index)},
+                {"name": "Subject", "value": "Benchmark message {0}".format(index)},
+                {"name": "X-MS-Exchange-Organization-AuthAs", "value": "Anonymous"},
+            ],
+        }
+
+    def _rfc822(self, index, attachment_id):
+        return (
+            "From: sender{0}@example.com\r\nTo: analyst@example.com\r\nSubject: Forwarded message {1}\r\n"
+            "Message-ID: <{1}.{0}@example.com>\r\nDate: Mon, 1 Jan 2024 00:00:00 +0000\r\nMIME-Version: 1.0\r\n"
+            "Content-Type: text/html; charset=utf-8\r\n\r\n{2}\r\n".format(index, attachment_id, self._body(index))
+        ).encode()
+
+    def _file_content(self, index, attachment_id):
+        seed = "{0}:{1}\n".format(index, attachment_id).encode()
+        return (seed * (self.spec.attachment_size // len(seed) + 1))[: self.spec.attachment_size]
+
+    def _file_attachment(self, index, attachment_id, with_content=False):
+        attachment = {
+            "@odata.type": "#microsoft.graph.fileAttachment",
+            "id": attachment_id,
+            "name": "{0}.txt".format(attachment_id),
+            "contentType": "text/plain",
+            "size": self.spec.attachment_size,
+            "lastModifiedDateTime": (START_TIME + timedelta(seconds=index)).strftime(TIME_FORMAT),
+            "isInline": False,
+        }
+        if with_content:
+            attachment["contentBytes"] = base64.b64encode(self._file_content(index, attachment_id)).decode()
+        return attachment
+
+    def _item_attachment(self, index, attachment_id, depth):
+        attachment = {
+            "@odata.type": "#microsoft.graph.itemAttachment",
+            "id": attachment_id,
+            "name": "Forwarded message {0}".format(attachment_id),
+            "contentType": "message/rfc822",
+            "size": self.spec.body_size,
+            "lastModifiedDateTime": (START_TIME + timedelta(seconds=index)).strftime(TIME_FORMAT),
+            "isInline": False,
+        }
+        if depth:
+            item = self._message(index)
+            item["id"] = "{0}-item".format(attachment_id)
+            item["attachments"] = [self._file_attachment(index, "{0}-file".format(attachment_id), with_content=True)]
+            if depth > 1:
+                item["attachments"].append(self._item_attachment(index, "{0}-nested".format(attachment_id), depth - 1))
+            attachment["item"] = item
+        return attachment
+
+    def _attachments(self, index):
+        attachments = [self._file_attachment(index, "file{0}".format(number)) for number in range(self.spec.attachments)]
+        attachments += [self._item_attachment(index, "item{0}".format(number), 0) for number in range(self.spec.item_attachments)]
+        return attachments
+
+    def _select(self, message, query):
+        fields = query.get("$select")
+        if not fields:
+            return message
+        selected = set(fields.split(",")) | {"id", "@odata.etag"}
+        return {key: value for key, value in message.items() if key in selected}
+
+    def _list_messages(self, path, query):
+        order = query.get("$orderBy", query.get("$orderby", "lastModifiedDateTime asc"))
+        indexes = range(self.spec.messages - 1, -1, -1) if order.endswith("desc") else range(self.spec.messages)
+
+        match = re.search(r"lastModifiedDateTime ge (\S+)", query.get("$filter", ""))
+        if match:
+            start = int((datetime.strptime(match.group(1), TIME_FORMAT) - START_TIME).total_seconds())
+            indexes = [index for index in indexes if index >= start]
+
+        top = int(query.get("$top", 10))
+        skip = int(query.get("$skip", 0))
+        page = list(indexes)[skip : skip + top]
+        response = {"value": [self._select(self._message(index), query) for index in page]}
+        if skip + top < len(indexes):
+            next_query = dict(query, **{"$skip": str(skip + top)})
+            response["@odata.nextLink"] = "{0}{1}?{2}".format(self.url, path, urlencode(next_query))
+        return response
+
+    def _route(self, path, query):
+        """
+        :return: status code, route name, JSON-serializable or bytes response body
+        """
+        match = ATTACHMENT_VALUE_PATH.fullmatch(path)
+        if match:
+            index, attachment_id = self._message_index(match.group("message")), match.group("attachment")
+            if attachment_id.startswith("item"):
+                return 200, "attachment_value", self._rfc822(index, attachment_id)
+            return 200, "attachment_value", self._file_content(index, attachment_id)
+
+        match = ATTACHMENT_PATH.fullmatch(path)
+        if match:
+            index, attachment_id = self._message_index(match.group("message")), match.group("attachment")
+            if attachment_id.startswith("item"):
+                return 200, "attachment", self._item_attachment(index, attachment_id, self.spec.nesting_depth)
+            return 200, "attachment", self._file_attachment(index, attachment_id, with_content=True)
+
+        match = ATTACHMENTS_PATH.fullmatch(path)
+        if match:
+            return 200, "attachments", {"value": self._attachments(self._message_index(match.group("message")))}
+
+        match = MESSAGE_VALUE_PATH.fullmatch(path)
+        if match:
+            message_id = match.group("message")
+            return 200, "message_value", self._rfc822(self._message_index(message_id), message_id)
+
+        match = MESSAGE_PATH.fullmatch(path)
+        if match and self._message_index(match.group("message")) < self.spec.messages:
+            return 200, "message", self._select(self._message(self._message_index(match.group("message"))), query)
+
+        if MESSAGES_PATH.fullmatch(path):
+            return 200, "messages", self._list_messages(path, query)
+
+        return 404, "not_found", {"error": {"code": "ErrorItemNotFound", "message": "The specified object was not found in the store."}}
+
+    def _is_throttled(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            return bool(self.spec.throttle_every) and self.stats["requests"] % self.spec.throttle_every == 0
+
+    def _count(self, route, size):
+        with self._lock:
+            self.stats[route] += 1
+            self.stats["bytes"] += size
+
+    def handle(self, method, path, query, body):
+        """
+        :return: status code, headers, response body in bytes
+        """
+        if self._is_throttled():
+            self._count("throttled", 0)
+            error = {"error": {"code": "TooManyRequests", "message": "Application is over its MailboxConcurrency limit."}}
+            return 429, {"Content-Type": "application/json", "Retry-After": str(self.spec.retry_after)}, json.dumps(error).encode()
+
+        if method == "POST" and path == "/v1.0/$batch":
+            responses = [self._handle_batch_request(request) for request in json.loads(body)["requests"]]
+            data = json.dumps({"responses": responses}).encode()
+            self._count("batch", len(data))
+            return 200, {"Content-Type": "application/json"}, data
+
+        status, route, response = self._route(path, query)
+        if isinstance(response, bytes):
+            self._count(route, len(response))
+            return status, {"Content-Type": "application/octet-stream"}, response
+
+        data = json.dumps(response).encode()
+        self._count(route, len(data))
+        return status, {"Content-Type": "application/json"}, data
+
+    def _handle_batch_request(self, request):
+        url = urlsplit(request["url"])
+        status, route, response = self._route("/v1.0" + url.path, dict(parse_qsl(url.query)))
+        self._count("batched_" + route, 0)
+        return {"id": request["id"], "status": status, "headers": {"Content-Type": "application/json"}, "body": response}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The client resets its pooled connections at the end of a run
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockGraphServer:
+    """
+    HTTP server of the stand-in, listening on a free local port.
+    """
+
+    def __init__(self, spec):
+        self.graph = MockGraph(spec)
+        self._server = _Server(("127.0.0.1", 0), self._get_handler())
+        self.url = self.graph.url = "http://127.0.0.1:{0}".format(self._server.server_address[1])
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _get_handler(self):
+        graph = self.graph
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # The headers and the body are written separately, the delayed ACKs would add 40ms to every response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self, method):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, data = graph.handle(method, url.path, dict(parse_qsl(url.query)), body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+        return Handler
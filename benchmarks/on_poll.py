@@ -0,0 +1,176 @@
+# File: benchmarks/on_poll.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""
+Measures the ingestion throughput of on_poll, offline.
+
+The first scheduled poll of a synthetic mailbox runs against the local stand-in of MS Graph (mock_graph.py), with the
+SOAR platform modules replaced by the in-memory stand-in (soar_stub.py). The server runs in the same process, so the
+numbers are meant for comparing two versions of the app on the same machine, not as absolute figures.
+
+The reported time is the median of the runs. The peak memory comes from an extra run traced by tracemalloc, as the
+tracing slows the run down.
+
+Usage: python benchmarks/on_poll.py [--messages 200] [--attachments 1] [--item-attachments 1] [--throttle-every 50]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(BENCHMARKS_DIR), BENCHMARKS_DIR]
+
+import soar_stub  # noqa: E402
+from mock_graph import MailboxSpec, MockGraphServer  # noqa: E402
+
+soar_stub.install()
+
+import office365_connector  # noqa: E402
+
+MAILBOX = "analyst@example.com"
+
+ASSET_CONFIG = {
+    "tenant": "benchmark",
+    "client_id": "benchmark",
+    "client_secret": "benchmark",
+    "admin_access": True,
+    "admin_consent": True,
+    "email_address": MAILBOX,
+    "folder": "Inbox",
+    "get_folder_id": False,
+    "extract_attachments": True,
+    "extract_urls": True,
+    "extract_ips": True,
+    "extract_domains": True,
+    "extract_hashes": True,
+    "extract_eml": False,
+    "retry_count": 3,
+    "retry_wait_time": 1,
+}
+
+
+def run_on_poll(server, config, trace_memory=False):
+    """
+    :return: dictionary of the measurements of a first scheduled poll of the whole mailbox
+    """
+    connector = office365_connector.Office365Connector()
+    connector.config = dict(ASSET_CONFIG, first_run_max_emails=server.graph.spec.messages, **config)
+    connector.action_identifier = "on_poll"
+    connector.state = {"admin_consent": True, "admin_auth": {"access_token": "benchmark"}}
+    server.graph.stats.clear()
+    soar_stub.VAULT.clear()
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    if not connector.initialize():
+        raise RuntimeError(connector.get_status_message())
+    connector.handle_action({})
+    connector.finalize()
+
+    elapsed = time.perf_counter() - start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    action_result = connector.get_action_results()[-1]
+    if not action_result.get_status():
+        raise RuntimeError(action_result.get_message())
+
+    emails = len(connector.containers)
+    stats = server.graph.stats
+    return {
+        "seconds": elapsed,
+        "emails": emails,
+        "artifacts": len(connector.artifacts),
+        "vault_files": len(soar_stub.VAULT),
+        "requests": stats["requests"],
+        "throttled_requests": stats["throttled"],
+        "response_bytes": stats["bytes"],
+        "peak_memory_bytes": peak_memory,
+        "requests_by_route": {route: count for route, count in sorted(stats.items()) if route not in ("requests", "throttled", "bytes")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200, help="number of messages of the mailbox")
+    parser.add_argument("--body-size", type=int, default=8 * 1024, help="size of the HTML body of the messages in bytes")
+    parser.add_argument("--attachments", type=int, default=1, help="number of file attachments per message")
+    parser.add_argument("--attachment-size", type=int, default=64 * 1024, help="size of the file attachments in bytes")
+    parser.add_argument("--item-attachments", type=int, default=0, help="number of item (email) attachments per message")
+    parser.add_argument("--nesting-depth", type=int, default=1, help="depth of the item attachments nested in the item attachments")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth request with a 429 response, 0 to disable")
+    parser.add_argument("--retry-after", type=int, default=0, help="Retry-After of the throttled responses in seconds")
+    parser.add_argument("--max-concurrent-requests", type=int, default=1, help="'max_concurrent_requests' asset configuration")
+    parser.add_argument("--projection-profile", default="forensic", help="'projection_profile' asset configuration")
+    parser.add_argument("--two-phase-fetch", action="store_true", help="enable the 'two_phase_fetch' asset configuration")
+    parser.add_argument("--extract-eml", action="store_true", help="enable the 'extract_eml' asset configuration")
+    parser.add_argument("--runs", type=int, default=3, help="number of timed runs")
+    parser.add_argument("--skip-memory", action="store_true", help="skip the run measuring the peak memory")
+    parser.add_argument("--output", help="path of a JSON file to write the results to")
+    args = parser.parse_args()
+
+    spec = MailboxSpec(
+        messages=args.messages,
+        body_size=args.body_size,
+        attachments=args.attachments,
+        attachment_size=args.attachment_size,
+        item_attachments=args.item_attachments,
+        nesting_depth=args.nesting_depth,
+        throttle_every=args.throttle_every,
+        retry_after=args.retry_after,
+    )
+    config = {
+        "max_concurrent_requests": args.max_concurrent_requests,
+        "projection_profile": args.projection_profile,
+        "two_phase_fetch": args.two_phase_fetch,
+        "extract_eml": args.extract_eml,
+    }
+
+    with MockGraphServer(spec) as server:
+        office365_connector.MSGRAPH_API_URL = server.url
+        runs = [run_on_poll(server, config) for _ in range(args.runs)]
+        memory_run = None if args.skip_memory else run_on_poll(server, config, trace_memory=True)
+
+    result = dict(runs[-1])
+    result["seconds"] = statistics.median(run["seconds"] for run in runs)
+    result["peak_memory_bytes"] = memory_run["peak_memory_bytes"] if memory_run else None
+    result["emails_per_second"] = result["emails"] / result["seconds"]
+    result["requests_per_email"] = result["requests"] / max(result["emails"], 1)
+    result["mailbox"] = vars(spec)
+    result["config"] = config
+
+    print("emails ingested:      {0}".format(result["emails"]))
+    print("median time:          {0:.2f} s over {1} run(s)".format(result["seconds"], args.runs))
+    print("emails per second:    {0:.1f}".format(result["emails_per_second"]))
+    print("requests per email:   {0:.2f} ({1} throttled)".format(result["requests_per_email"], result["throttled_requests"]))
+    print("response bytes:       {0}".format(result["response_bytes"]))
+    if result["peak_memory_bytes"] is not None:
+        print("peak traced memory:   {0:.1f} MB".format(result["peak_memory_bytes"] / 1024 / 1024))
+    print("requests by route:    {0}".format(", ".join("{0}={1}".format(*item) for item in result["requests_by_route"].items())))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=4)
+
+
+if __name__ == "__main__":
+    main()
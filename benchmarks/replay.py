@@ -0,0 +1,106 @@
+# File: benchmarks/replay.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""
+Replays an action recorded to a cassette file, offline.
+
+The cassette is recorded by an asset with the 'cassette_mode' asset configuration set to 'record', e.g. during a slow
+on_poll of a customer. The action is run again with the sanitized asset configuration, state and parameters it was
+recorded with, and its requests are served from the cassette, with the SOAR platform modules replaced by the in-memory
+stand-in (soar_stub.py). The requests that were not recorded fail, they are reported as missed.
+
+The reported time is the median of the runs, with the recorded latencies of the responses by default.
+
+Usage: python benchmarks/replay.py cassette.jsonl [--latency recorded] [--runs 3] [--output results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(BENCHMARKS_DIR), BENCHMARKS_DIR]
+
+import soar_stub  # noqa: E402
+
+soar_stub.install()
+
+import office365_connector  # noqa: E402
+from office365_cassette import read_cassette_header  # noqa: E402
+
+
+def run_replay(cassette_path, header, latency):
+    """
+    :return: dictionary of the measurements of a replay of the recorded action
+    """
+    connector = office365_connector.Office365Connector()
+    connector.config = dict(header["config"], cassette_mode="replay", cassette_path=os.path.basename(cassette_path), cassette_latency=latency)
+    connector.action_identifier = header["action"]
+    connector.state = header["state"]
+    soar_stub.VAULT.clear()
+
+    start = time.perf_counter()
+    if not connector.initialize():
+        raise RuntimeError(connector.get_status_message())
+    connector.handle_action(header["param"])
+    connector.finalize()
+    elapsed = time.perf_counter() - start
+
+    action_result = connector.get_action_results()[-1]
+    adapter = connector._session.get_adapter("https://")
+    return {
+        "seconds": elapsed,
+        "status": "success" if action_result.get_status() else "failed",
+        "message": action_result.get_message(),
+        "containers": len(connector.containers),
+        "artifacts": len(connector.artifacts),
+        "vault_files": len(soar_stub.VAULT),
+        "replayed_requests": adapter.replayed,
+        "missed_requests": adapter.missed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", help="path of the cassette file")
+    parser.add_argument("--latency", default="recorded", help="latency of the responses, 'recorded' or a number of milliseconds")
+    parser.add_argument("--runs", type=int, default=3, help="number of timed runs")
+    parser.add_argument("--output", help="path of a JSON file to write the results to")
+    args = parser.parse_args()
+
+    # The connector only opens the cassette files of the state directory
+    cassette_path = shutil.copy(args.cassette, soar_stub.STATE_DIR)
+    header = read_cassette_header(cassette_path)
+    runs = [run_replay(cassette_path, header, args.latency) for _ in range(args.runs)]
+
+    result = dict(runs[-1])
+    result["seconds"] = statistics.median(run["seconds"] for run in runs)
+    result["action"] = header["action"]
+    result["latency"] = args.latency
+
+    print("action:               {0} ({1}) {2}".format(result["action"], result["status"], result["message"]))
+    print("median time:          {0:.2f} s over {1} run(s)".format(result["seconds"], args.runs))
+    print("containers:           {0} ({1} artifacts, {2} vault files)".format(result["containers"], result["artifacts"], result["vault_files"]))
+    print("replayed requests:    {0} ({1} missed)".format(result["replayed_requests"], result["missed_requests"]))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=4)
+
+
+if __name__ == "__main__":
+    main()
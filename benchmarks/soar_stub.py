@@ -0,0 +1,268 @@
+# File: benchmarks/soar_stub.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""
+In-memory stand-in of the Splunk SOAR platform modules used by the app, to run the benchmarks outside of SOAR.
+
+The containers, artifacts, vault files and state are kept in memory, and the duplicate containers are reported the way
+SOAR does. Only the platform API used by the connector and ProcessEmail is provided, and it does nothing else.
+"""
+import hashlib
+import ipaddress
+import json
+import os
+import re
+import sys
+import tempfile
+import types
+from urllib.parse import urlparse
+
+STATE_DIR = tempfile.mkdtemp(prefix="msgoffice365_benchmark_")
+VAULT_TMP_DIR = os.path.join(STATE_DIR, "vault_tmp")
+os.makedirs(VAULT_TMP_DIR)
+
+# Vault files keyed by the vault ID
+VAULT = dict()
+
+
+class ActionResult:
+    def __init__(self, param=None):
+        self._param = param or dict()
+        self._status = False
+        self._message = ""
+        self._data = []
+        self._summary = dict()
+
+    def set_status(self, status, message="", exception=None):
+        self._status = status
+        self._message = message
+        return status
+
+    def get_status(self):
+        return self._status
+
+    def get_message(self):
+        return self._message
+
+    def get_param(self):
+        return self._param
+
+    def add_data(self, data):
+        self._data.append(data)
+
+    def update_data(self, data):
+        self._data.extend(data)
+
+    def get_data(self):
+        return self._data
+
+    def get_data_size(self):
+        return len(self._data)
+
+    def update_summary(self, summary):
+        self._summary.update(summary)
+        return self._summary
+
+    def get_summary(self):
+        return self._summary
+
+    def add_debug_data(self, data):
+        pass
+
+
+class BaseConnector:
+    def __init__(self):
+        self.config = dict()
+        self.action_identifier = None
+        self.current_param = dict()
+        self.app_run_id = 1
+        self.state = dict()
+        self.containers = []
+        self.artifacts = []
+        self._action_results = []
+        self._status = True
+        self._message = ""
+        self._container_ids = dict()
+
+    def get_config(self):
+        return self.config
+
+    def get_action_identifier(self):
+        return self.action_identifier
+
+    def get_action_name(self):
+        return self.action_identifier
+
+    def get_current_param(self):
+        return self.current_param
+
+    def get_asset_id(self):
+        return "1"
+
+    def get_app_run_id(self):
+        return self.app_run_id
+
+    def get_container_id(self):
+        return None
+
+    def get_phantom_base_url(self):
+        return "https://127.0.0.1/"
+
+    def get_app_json(self):
+        with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "office365.json")) as app_json:
+            return json.load(app_json)
+
+    def get_state_dir(self):
+        return STATE_DIR
+
+    def load_state(self):
+        return json.loads(json.dumps(self.state))
+
+    def save_state(self, state):
+        self.state = json.loads(json.dumps(state))
+        return True
+
+    def is_poll_now(self):
+        return False
+
+    def debug_print(self, *args, **kwargs):
+        pass
+
+    def error_print(self, *args, **kwargs):
+        pass
+
+    def save_progress(self, *args, **kwargs):
+        pass
+
+    def send_progress(self, *args, **kwargs):
+        pass
+
+    def set_status(self, status, message="", exception=None):
+        self._status = status
+        self._message = message
+        return status
+
+    def get_status(self):
+        return self._status
+
+    def get_status_message(self):
+        return self._message
+
+    def add_action_result(self, action_result):
+        self._action_results.append(action_result)
+        return action_result
+
+    def get_action_results(self):
+        return self._action_results
+
+    def save_container(self, container, fail_on_duplicate=False):
+        source_data_identifier = container.get("source_data_identifier")
+        if source_data_identifier in self._container_ids:
+            return True, "Duplicate container found", self._container_ids[source_data_identifier]
+
+        self.containers.append(container)
+        self._container_ids[source_data_identifier] = len(self.containers)
+        return True, "Container created", len(self.containers)
+
+    def get_container_info(self, container_id=None):
+        return True, self.containers[container_id - 1], 200
+
+    def save_artifacts(self, artifacts):
+        self.artifacts.extend(artifacts)
+        return True, "Artifacts created", list(range(len(self.artifacts) - len(artifacts) + 1, len(self.artifacts) + 1))
+
+    def save_artifact(self, artifact):
+        self.artifacts.append(artifact)
+        return True, "Artifact created", len(self.artifacts)
+
+
+class Vault:
+    @staticmethod
+    def get_vault_tmp_dir():
+        return VAULT_TMP_DIR
+
+
+def vault_add(container=None, file_location=None, file_name=None, metadata=None):
+    sha1 = hashlib.sha1()
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(file_location, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(1024 * 1024), b""):
+            sha1.update(chunk)
+            sha256.update(chunk)
+            size += len(chunk)
+    os.remove(file_location)
+
+    vault_id = sha1.hexdigest()
+    VAULT[vault_id] = {
+        "vault_id": vault_id,
+        "name": file_name,
+        "size": size,
+        "container": container,
+        "metadata": {"sha1": vault_id, "sha256": sha256.hexdigest(), "md5": ""},
+    }
+    return True, "Success", vault_id
+
+
+def vault_info(vault_id=None, container_id=None, **kwargs):
+    info = VAULT.get(vault_id)
+    return bool(info), "", [info] if info else []
+
+
+def is_ip(value):
+    try:
+        ipaddress.IPv4Address(value)
+    except ValueError:
+        return False
+    return True
+
+
+def is_sha1(value):
+    return bool(re.fullmatch(r"[0-9a-fA-F]{40}", value or ""))
+
+
+def is_email(value):
+    return bool(re.fullmatch(r"[^@\s]+@[^@\s]+\.[^@\s]+", value or ""))
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+def install():
+    """
+    Register the stand-in modules in place of the platform ones, before the connector module is imported.
+    """
+    app = _module(
+        "phantom.app",
+        APP_SUCCESS=True,
+        APP_ERROR=False,
+        APP_JSON_CONTAINER_COUNT="container_count",
+        APP_JSON_ACTION_NAME="action_name",
+        APP_JSON_APP_RUN_ID="app_run_id",
+        APP_ERR_FILE_ADD_TO_VAULT="Error occurred while adding the file to the vault. {0}",
+        is_fail=lambda status: not status,
+        is_success=lambda status: bool(status),
+        get_host_from_url=lambda url: urlparse(url).hostname,
+    )
+    package = _module("phantom", __path__=[], app=app)
+    package.action_result = _module("phantom.action_result", ActionResult=ActionResult)
+    package.base_connector = _module("phantom.base_connector", BaseConnector=BaseConnector)
+    package.rules = _module("phantom.rules", vault_add=vault_add, vault_info=vault_info)
+    package.utils = _module("phantom.utils", is_ip=is_ip, is_sha1=is_sha1, is_email=is_email)
+    package.vault = _module("phantom.vault", Vault=Vault, vault_info=vault_info)
+    _module("encryption_helper", encrypt=lambda value, key: value, decrypt=lambda value, key: value)
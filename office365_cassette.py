@@ -0,0 +1,466 @@
+# File: office365_cassette.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qsl, unquote, urlparse, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CASSETTE_VERSION = 1
+REDACTED = "REDACTED"
+PSEUDONYM_DOMAIN = "redacted.invalid"
+
+# Keys whose values are secrets, they are replaced
+SECRET_KEYS = frozenset(
+    [
+        "access_token",
+        "refresh_token",
+        "id_token",
+        "client_secret",
+        "client_assertion",
+        "password",
+        "certificate_private_key",
+        "certificate_thumbprint",
+        "code",
+    ]
+)
+
+# Keys whose values are kept, apart from the email addresses they contain: the identifiers, timestamps, sizes and
+# structural fields the connector reads. The values of all the other keys are masked as personal content.
+SAFE_KEYS = frozenset(
+    [
+        "@odata.context",
+        "@odata.etag",
+        "@odata.id",
+        "@odata.mediacontenttype",
+        "@odata.type",
+        "auth_type",
+        "changekey",
+        "client-request-id",
+        "content-type",
+        "contentid",
+        "contenttype",
+        "conversationid",
+        "conversationindex",
+        "correlation_id",
+        "createddatetime",
+        "date",
+        "datetime",
+        "error",
+        "error_codes",
+        "error_description",
+        "expires_on",
+        "flagstatus",
+        "folder",
+        "id",
+        "importance",
+        "inferenceclassification",
+        "internetmessageid",
+        "last_time",
+        "last_time_email_ids",
+        "lastmodifieddatetime",
+        "method",
+        "parentfolderid",
+        "receiveddatetime",
+        "request-id",
+        "retry-after",
+        "scope",
+        "sentdatetime",
+        "status",
+        "timestamp",
+        "timezone",
+        "token_type",
+        "trace_id",
+        "wellknownname",
+    ]
+)
+
+# Keys whose values are URLs the connector requests, e.g. the next pages and the upload sessions, they are sanitized
+# like the URLs of the requests so that their requests are found in the cassette
+URL_KEYS = frozenset(["@odata.deltalink", "@odata.nextlink", "uploadurl", "url"])
+
+# Query parameters whose values are kept in the URLs, the values of the other ones, e.g. the search terms, the skip
+# and delta tokens and the authentication tokens of the upload sessions, are masked
+SAFE_QUERY_PARAMETERS = frozenset(["$count", "$expand", "$orderby", "$select", "$skip", "$top"])
+
+# Keys of the error objects of the responses whose values are kept, the connector handles the errors with them
+ERROR_OBJECT_KEYS = frozenset(["error", "innererror"])
+ERROR_KEYS = frozenset(["code", "message"])
+
+# Keys whose values are binary content, their letters and digits are masked
+BINARY_KEYS = frozenset(["contentbytes"])
+
+# Headers of the responses the connector reads, the URLs of the Location headers are sanitized
+RECORDED_HEADERS = ("Content-Type", "Retry-After", "Location")
+
+EMAIL_ADDRESS_REGEX = re.compile(r"[\w.+-]+(?:@|%40)[\w-]+(?:\.[\w-]+)+")
+INDICATOR_REGEX = re.compile(
+    r"(?P<url>https?://[^\s\"'<>]+)"
+    r"|(?P<email>[\w.+-]+@[\w-]+(?:\.[\w-]+)+)"
+    r"|(?P<ip>\b(?:\d{1,3}\.){3}\d{1,3}\b)"
+    r"|(?P<hash>\b(?:[0-9a-fA-F]{64}|[0-9a-fA-F]{40}|[0-9a-fA-F]{32})\b)"
+)
+HTML_TAG_REGEX = re.compile(r"(</?[a-zA-Z][\w:-]*(?:\s[^<>]*)?/?>)")
+HTML_ATTRIBUTE_VALUE_REGEX = re.compile(r"(\"[^\"]*\"|'[^']*')")
+PERSONAL_CHARS_REGEX = re.compile(r"[^\W_]")
+MIME_HEADER_REGEX = re.compile(r"^([\w-]+):(.*)$", re.DOTALL)
+MIME_FILE_NAME_REGEX = re.compile(r'(\b(?:file)?name\*?\s*=\s*)("[^"]*"|[^;\s]+)', re.IGNORECASE)
+
+# Headers of the MIME content that make its structure or are not personal, only their file names are masked
+STRUCTURAL_MIME_HEADERS = frozenset(["content-type", "content-disposition", "content-transfer-encoding", "mime-version", "date"])
+
+
+def _pseudonymize_address(match):
+    address = unquote(match.group(0)).lower()
+    if address.endswith("@" + PSEUDONYM_DOMAIN):
+        return match.group(0)
+
+    return "user-{0}@{1}".format(hashlib.sha256(address.encode()).hexdigest()[:12], PSEUDONYM_DOMAIN)
+
+
+def pseudonymize(text):
+    """
+    Replace the email addresses with pseudonyms, the same address always gets the same pseudonym and the pseudonyms are kept as is.
+
+    :param text: Text to pseudonymize
+    :return: pseudonymized text
+    """
+    return EMAIL_ADDRESS_REGEX.sub(_pseudonymize_address, text)
+
+
+def _get_digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def _pseudonymize_indicator(match):
+    value = match.group(0)
+    if match.lastgroup == "url":
+        # The URLs of the same host get the same host, so that the same domains are extracted
+        host = urlparse(value).hostname or ""
+        return "https://{0}.{1}/{2}".format(_get_digest(host)[:12], PSEUDONYM_DOMAIN, _get_digest(value)[:12])
+    if match.lastgroup == "email":
+        return _pseudonymize_address(match)
+    if match.lastgroup == "ip":
+        return "10.{0}.{1}.{2}".format(*bytes.fromhex(_get_digest(value)[:6]))
+    return _get_digest(value)[: len(value)]
+
+
+def _mask_text(text):
+    masked = []
+    position = 0
+    for match in INDICATOR_REGEX.finditer(text):
+        masked.append(PERSONAL_CHARS_REGEX.sub("x", text[position : match.start()]))
+        masked.append(_pseudonymize_indicator(match))
+        position = match.end()
+    masked.append(PERSONAL_CHARS_REGEX.sub("x", text[position:]))
+    return "".join(masked)
+
+
+def mask(text):
+    """
+    Mask the letters and digits of personal content, except in the HTML tags and attribute names, so that its parsing costs about the same.
+    The URLs, email addresses, IP addresses and hashes are replaced with pseudonyms, they are still extracted as indicators.
+
+    :param text: Text or HTML to mask
+    :return: masked text
+    """
+    parts = HTML_TAG_REGEX.split(text)
+    for index in range(1, len(parts), 2):
+        parts[index] = HTML_ATTRIBUTE_VALUE_REGEX.sub(lambda match: _mask_text(match.group(0)), parts[index])
+    for index in range(0, len(parts), 2):
+        parts[index] = _mask_text(parts[index])
+    return "".join(parts)
+
+
+def mask_mime(text):
+    """
+    Mask the letters and digits of MIME content, e.g. of a downloaded email, keeping the headers and boundaries that
+    make its structure. A text that does not start with a header is masked as a whole.
+
+    :param text: MIME content to mask
+    :return: masked MIME content
+    """
+    lines = text.splitlines(keepends=True)
+    in_headers = bool(lines and MIME_HEADER_REGEX.match(lines[0]))
+    structural = False
+    masked = []
+    for line in lines:
+        if not in_headers:
+            if line.startswith("--"):
+                # The boundaries are kept, the headers of the next part follow them
+                masked.append(line)
+                in_headers = True
+            else:
+                masked.append(mask(line))
+            continue
+
+        if not line.strip():
+            masked.append(line)
+            in_headers = False
+            continue
+
+        match = MIME_HEADER_REGEX.match(line)
+        if match:
+            structural = match.group(1).lower() in STRUCTURAL_MIME_HEADERS
+            prefix, value = "{0}:".format(match.group(1)), match.group(2)
+        else:
+            # Continuation line of the previous header
+            structural = structural and line[:1] in " \t"
+            prefix, value = "", line
+
+        if structural:
+            masked.append(prefix + MIME_FILE_NAME_REGEX.sub(lambda match: match.group(1) + _mask_text(match.group(2)), value))
+        else:
+            masked.append(prefix + mask(value))
+
+    return "".join(masked)
+
+
+def sanitize_url(url):
+    """
+    Sanitize an absolute or relative URL. Sanitizing a sanitized URL returns it unchanged, so that the URLs the connector
+    gets from the recorded responses map to the same requests.
+
+    :param url: URL to sanitize
+    :return: URL with the email addresses pseudonymized and the values of the query parameters masked, except for the
+             ones of SAFE_QUERY_PARAMETERS
+    """
+    parts = urlsplit(url)
+    query = "&".join(
+        "{0}={1}".format(name, value if name.lower() in SAFE_QUERY_PARAMETERS else _mask_text(value))
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+    )
+    return pseudonymize(urlunsplit(parts._replace(path=unquote(parts.path), query=query)))
+
+
+def sanitize(value, key=None, in_error=False):
+    """
+    :param value: JSON value to sanitize
+    :param key: Lowercase key of the value in its parent dictionary
+    :param in_error: Whether the value is in an error object of a response
+    :return: copy of the value with the secrets replaced, the personal content masked and the email addresses pseudonymized
+    """
+    if isinstance(value, dict):
+        # The names of the name/value pairs, e.g. of the internet message headers, are kept
+        name_value_pair = "name" in value and "value" in value
+        in_error = key in ERROR_OBJECT_KEYS
+        return {
+            pseudonymize(curr_key): (curr_value if name_value_pair and curr_key == "name" else sanitize(curr_value, curr_key.lower(), in_error))
+            for curr_key, curr_value in value.items()
+        }
+    if isinstance(value, list):
+        return [sanitize(item, key, in_error) for item in value]
+    if not isinstance(value, str):
+        return value
+    if in_error and key in ERROR_KEYS:
+        return pseudonymize(value)
+    if key in SECRET_KEYS:
+        return REDACTED
+    if key in SAFE_KEYS:
+        return pseudonymize(value)
+    if key in URL_KEYS:
+        return sanitize_url(value)
+    if key in BINARY_KEYS:
+        return PERSONAL_CHARS_REGEX.sub("x", value)
+
+    return mask(value)
+
+
+def sanitize_config(config):
+    """
+    :param config: Asset configuration
+    :return: copy of the asset configuration with the secrets replaced and the email addresses pseudonymized
+    """
+    return {key: REDACTED if key in SECRET_KEYS else pseudonymize(value) if isinstance(value, str) else value for key, value in config.items()}
+
+
+def _get_body_key(request):
+    """
+    :return: hash of the sanitized JSON body of the request, an empty string if the request has no JSON body
+    """
+    body = request.body
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    if not body or not isinstance(body, str):
+        return ""
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        # The form bodies of the token requests carry secrets and one-time codes, they are not part of the key
+        return ""
+
+    return hashlib.sha256(json.dumps(sanitize(data), sort_keys=True).encode()).hexdigest()
+
+
+def _get_request_key(request):
+    return "{0} {1} {2}".format(request.method, sanitize_url(request.url), _get_body_key(request))
+
+
+def read_cassette_header(path):
+    """
+    :param path: Path of the cassette file
+    :return: dictionary of the action, asset configuration, state and parameters the cassette was recorded with
+    """
+    with open(path) as cassette:
+        for line in cassette:
+            header = json.loads(line)
+            # The requests made by the initialization of the connector can be recorded before the header
+            if "action" in header:
+                if header.get("version") != CASSETTE_VERSION:
+                    raise ValueError("Unsupported cassette version: {0}".format(header.get("version")))
+                return header
+
+    raise ValueError("No action recorded in the cassette")
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Transport adapter recording the sanitized requests and responses of an action to a cassette file.
+
+    The cassette is a JSON lines file: one interaction per request, and a header with the sanitized asset configuration,
+    state and parameters of the action. The secrets are replaced, the personal content is masked, and the email addresses
+    are replaced with pseudonyms. The JSON and MIME bodies are kept with their structure, only the size of the binary
+    bodies is kept.
+    The responses are read in memory to be recorded, including the streamed downloads.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        # An existing file is never overwritten
+        self._cassette = open(path, "x")
+        self._lock = threading.Lock()
+
+    def _write(self, data):
+        with self._lock:
+            if self._cassette.closed:
+                return
+            self._cassette.write(json.dumps(data) + "\n")
+            self._cassette.flush()
+
+    def record_action(self, action, config, state, param):
+        self._write(
+            {
+                "version": CASSETTE_VERSION,
+                "action": action,
+                "config": sanitize_config(config),
+                "state": sanitize(state),
+                "param": sanitize(param),
+            }
+        )
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        start = time.perf_counter()
+        response = super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        content = response.content
+
+        interaction = {
+            "request": _get_request_key(request),
+            "status_code": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                header: sanitize_url(response.headers[header]) if header == "Location" else response.headers[header]
+                for header in RECORDED_HEADERS
+                if header in response.headers
+            },
+            "elapsed": round(time.perf_counter() - start, 4),
+        }
+        try:
+            interaction["body"] = json.dumps(sanitize(json.loads(content)))
+        except ValueError:
+            try:
+                interaction["body"] = mask_mime(content.decode("utf-8"))
+            except UnicodeDecodeError:
+                interaction["body_size"] = len(content)
+
+        self._write(interaction)
+        return response
+
+    def close(self):
+        with self._lock:
+            self._cassette.close()
+        super().close()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    Transport adapter serving the responses of a cassette file instead of sending the requests.
+
+    The responses of the same request are served in the recorded order, the last one is served again once they are all
+    served. The binary bodies are replaced with filler of the recorded size. A request that was not recorded fails like
+    a connection error.
+    """
+
+    def __init__(self, path, latency=None, **kwargs):
+        """
+        :param path: Path of the cassette file
+        :param latency: Latency of every response in seconds, None to replay the recorded latencies
+        """
+        super().__init__(**kwargs)
+        self._latency = latency
+        self._interactions = dict()
+        self._last_interactions = dict()
+        self._lock = threading.Lock()
+        self.replayed = 0
+        self.missed = 0
+
+        read_cassette_header(path)
+        with open(path) as cassette:
+            for line in cassette:
+                interaction = json.loads(line)
+                if "request" in interaction:
+                    self._interactions.setdefault(interaction["request"], deque()).append(interaction)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        request_key = _get_request_key(request)
+        with self._lock:
+            interactions = self._interactions.get(request_key)
+            if interactions:
+                interaction = self._last_interactions[request_key] = interactions.popleft()
+            else:
+                interaction = self._last_interactions.get(request_key)
+            if interaction is None:
+                self.missed += 1
+            else:
+                self.replayed += 1
+
+        if interaction is None:
+            raise requests.exceptions.ConnectionError(
+                "No response recorded in the cassette for {0}".format(request_key.strip()), request=request
+            )
+
+        time.sleep(interaction["elapsed"] if self._latency is None else self._latency)
+
+        response = requests.Response()
+        response.status_code = interaction["status_code"]
+        response.reason = interaction["reason"]
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        if "body" in interaction:
+            response._content = interaction["body"].encode()
+        else:
+            response._content = b"x" * interaction["body_size"]
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
@@ -14,33 +14,44 @@
 # and limitations under the License.
 #
 import base64
+import fcntl
 import grp
+import hashlib
+import heapq
+import html
 import json
+import mmap
 import os
 import pathlib
 import pwd
 import re
+import shutil
 import sys
 import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime
+from itertools import islice
+from string import Template
 
 import encryption_helper
-import msal
 import phantom.app as phantom
 import phantom.rules as ph_rules
 import phantom.utils as util
 import phantom.vault as phantom_vault
 import requests
-from bs4 import BeautifulSoup, UnicodeDammit
-from django.http import HttpResponse
 from phantom.action_result import ActionResult
 from phantom.base_connector import BaseConnector
 from phantom.vault import Vault
 
+from office365_cassette import RecordingAdapter, ReplayAdapter
 from office365_consts import *
-from process_email import ProcessEmail
+from office365_directory_cache import DirectoryCache
+from office365_logging import DEBUG_SUBSYSTEMS, DEBUG_SUBSYSTEMS_ALL, DebugLogger, get_debug_logger, parse_debug_subsystems
+from office365_profiler import ActionCapture, PerformanceProfile, profiled
 
 TC_FILE = "oauth_task.out"
 SERVER_TOKEN_URL = "https://login.microsoftonline.com/{0}/oauth2/v2.0/token"
@@ -91,8 +102,7 @@ def _load_app_state(asset_id, app_connector=None):
             error_msg = _get_error_msg_from_exception(e, app_connector)
             app_connector.debug_print("In _load_app_state: {0}".format(error_msg))
 
-    if app_connector:
-        app_connector.debug_print("Loaded state: ", state)
+    get_debug_logger(app_connector).debug("state", "Loaded state: {0}", state)
 
     try:
         if "code" in state:
@@ -138,12 +148,10 @@ def _save_app_state(state, asset_id, app_connector=None):
             error_msg = _get_error_msg_from_exception(e, app_connector)
             app_connector.debug_print("{}: {}".format(MSGOFFICE365_ENCRYPTION_ERROR, error_msg))
 
-    if app_connector:
-        app_connector.debug_print("Saving state: ", state)
+    get_debug_logger(app_connector).debug("state", "Saving state: {0}", state)
 
     try:
-        with open(real_state_file_path, "w+") as state_file_obj:
-            state_file_obj.write(json.dumps(state))
+        _write_file_atomically(real_state_file_path, json.dumps(state))
     except Exception as e:
         error_msg = _get_error_msg_from_exception(e, app_connector)
         if app_connector:
@@ -154,6 +162,38 @@ def _save_app_state(state, asset_id, app_connector=None):
     return phantom.APP_SUCCESS
 
 
+def _write_file_atomically(file_path, data):
+    """This function writes the data to a temporary file next to the given file, and renames it over the file.
+    A reader of the file gets either its previous or its new content, never a partially written one.
+
+    :param file_path: Path of the file to write
+    :param data: String to write in the file
+    """
+
+    file_dir, file_name = os.path.split(file_path)
+    file_descriptor, temp_file_path = tempfile.mkstemp(dir=file_dir, prefix=".{0}.".format(file_name), suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w") as temp_file_obj:
+            temp_file_obj.write(data)
+            temp_file_obj.flush()
+            os.fsync(temp_file_obj.fileno())
+
+        # Keep the permissions and the ownership of the replaced file
+        if os.path.exists(file_path):
+            file_stat = os.stat(file_path)
+            os.chmod(temp_file_path, file_stat.st_mode)
+            try:
+                os.chown(temp_file_path, file_stat.st_uid, file_stat.st_gid)
+            except OSError:
+                pass
+
+        os.replace(temp_file_path, file_path)
+    except Exception:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise
+
+
 def _get_error_msg_from_exception(e, app_connector=None):
     """
     Get appropriate error message from the exception.
@@ -228,6 +268,8 @@ def _handle_oauth_result(request, path_parts):
     """
     <base_url>?admin_consent=True&tenant=a417c578-c7ee-480d-a225-d48057e74df5&state=13
     """
+    from django.http import HttpResponse
+
     asset_id = request.GET.get("state")
     if not asset_id:
         return HttpResponse(
@@ -291,6 +333,7 @@ def _handle_oauth_result(request, path_parts):
 
 
 def _handle_oauth_start(request, path_parts):
+    from django.http import HttpResponse
 
     # get the asset id, the state file is created for each asset
     asset_id = request.GET.get("asset_id")
@@ -328,6 +371,7 @@ def handle_request(request, path_parts):
     request contains the data posted to the rest endpoint, it is the django http request object
     path_parts is a list of the URL tokenized
     """
+    from django.http import HttpResponse
 
     # get the type of data requested, it's the last part of the URL used to post to the REST endpoint
     if len(path_parts) < 2:
@@ -402,10 +446,34 @@ class Office365Connector(BaseConnector):
         self._refresh_token = None
         self._REPLACE_CONST = "C53CEA8298BD401BA695F247633D0542"  # pragma: allowlist secret
         self._duplicate_count = 0
+        self._projection_profile = MSGOFFICE365_DEFAULT_PROJECTION_PROFILE
+        self._payload_bytes = 0
+        self._payload_bytes_lock = threading.Lock()
+        self._prefer_text_body = False
+        self._max_concurrent_requests = MSGOFFICE365_DEFAULT_MAX_CONCURRENT_REQUESTS
+        self._token_lock = threading.Lock()
+        self._session = requests.Session()
+        self._process_email = None
+        self._folder_cache_ttl = MSGOFFICE365_DEFAULT_FOLDER_CACHE_TTL
+        self._folder_cache_hits = 0
+        self._folder_cache_misses = 0
+        self._folder_id_from_cache = False
+        self._directory_cache_ttl = MSGOFFICE365_DEFAULT_DIRECTORY_CACHE_TTL
         self._asset_id = None
         self._cba_auth = None
         self._private_key = None
         self._certificate_private_key = None
+        self._persisted_state = {}
+        self._encrypted_secrets = {}
+        self._decrypted_secrets = {}
+        self._last_state_save = 0
+        self.debug_logger = DebugLogger()
+        self.performance_profile = PerformanceProfile()
+        self._profile_capture = MSGOFFICE365_PROFILE_CAPTURE_NONE
+        self._last_container_id = None
+        self._cassette_recorder = None
+        self._state_lock = threading.RLock()
+        self._state_lock_file = None
 
     def load_state(self):
         """
@@ -413,28 +481,186 @@ class Office365Connector(BaseConnector):
 
         :return: loaded state
         """
-        state = super().load_state()
+        with self._state_file_lock():
+            state = super().load_state()
         if not isinstance(state, dict):
             self.debug_print("Resetting the state file with the default format")
             state = {"app_version": self.get_app_json().get("app_version")}
             return state
-        return self._decrypt_state(state)
+
+        state = self._decrypt_state(state)
+
+        # A state file written before the encryption of the tokens is saved again, even if unchanged
+        if state.get("is_encrypted"):
+            self._persisted_state = self._get_state_snapshot(state)
+        return state
 
     def save_state(self, state):
         """
         Encrypt and save the current state dictionary to the state file.
+        The state dictionary itself is left decrypted, and it is not written again if none of its fields changed
+        since it was last loaded or saved.
+        Other actions of the asset may have saved the state in the meantime, so only the changed fields are written
+        over the saved state, and the other fields of the state dictionary are updated from it. The fields of
+        MSGOFFICE365_STATE_MERGED_FIELDS are merged the same way, entry by entry.
+        Without the state file lock the state is not written, the changed fields are saved by the next save instead.
 
         :param state: state dictionary
         :return: status
         """
-        return super().save_state(self._encrypt_state(state))
+        with self._state_file_lock() as locked:
+            snapshot = self._get_state_snapshot(state)
+            persisted = self._persisted_state
+            dirty_fields = sorted(key for key in set(snapshot) | set(persisted) if snapshot.get(key) != persisted.get(key))
+            if not dirty_fields:
+                self.debug_logger.debug("state", "The state is unchanged, skipping the save")
+                return phantom.APP_SUCCESS
+
+            if not locked:
+                self.debug_print("Unable to save the state without the state lock, the changed fields are kept for the next save")
+                # The next checkpoint retries after the checkpoint interval
+                self._last_state_save = time.monotonic()
+                return phantom.APP_ERROR
+
+            saved_state = self._read_saved_state()
+            if saved_state is not None:
+                for key in set(saved_state) | set(state):
+                    if key in MSGOFFICE365_STATE_MERGED_FIELDS and isinstance(state.get(key), dict) and isinstance(saved_state.get(key), dict):
+                        self._merge_state_entries(state[key], saved_state[key], snapshot[key], persisted.get(key))
+                        continue
+                    if key in dirty_fields:
+                        continue
+                    if key in saved_state:
+                        state[key] = saved_state[key]
+                    else:
+                        state.pop(key, None)
+                snapshot = self._get_state_snapshot(state)
+
+            self.debug_logger.debug("state", "Saving the changed state fields: {0}", ", ".join(dirty_fields))
+            ret_val = super().save_state(self._encrypt_state(deepcopy(state)))
+            self._persisted_state = snapshot
+            self._last_state_save = time.monotonic()
+            return ret_val
+
+    def _read_saved_state(self):
+        """
+        Read the state last saved by any action of the asset. The caller must hold the state file lock.
+
+        :return: decrypted saved state, None if the state file is missing or not in the encrypted format
+        """
+        saved_state = super().load_state()
+        if not isinstance(saved_state, dict) or not saved_state.get("is_encrypted"):
+            return None
+        return self._decrypt_state(saved_state)
+
+    @contextmanager
+    def _state_file_lock(self):
+        """
+        Hold an exclusive lock on the state of the asset, shared by all the actions of the asset running in parallel.
+        The lock is reentrant within an action. If it can not be acquired within MSGOFFICE365_STATE_LOCK_TIMEOUT seconds,
+        the action goes on without it, and the caller must not write the state.
+
+        :return: context manager yielding True if the lock is held, False otherwise
+        """
+        with self._state_lock:
+            if self._state_lock_file:
+                yield True
+                return
+
+            lock_file_path = os.path.join(self.get_state_dir(), "{0}_state.lock".format(self._asset_id))
+            try:
+                lock_file = open(lock_file_path, "a")
+            except Exception as e:
+                self.debug_print("Unable to open the state lock file: {0}".format(_get_error_msg_from_exception(e, self)))
+                yield False
+                return
+
+            deadline = time.monotonic() + MSGOFFICE365_STATE_LOCK_TIMEOUT
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        self.debug_print("Timed out waiting for the state lock, continuing without it")
+                        lock_file.close()
+                        yield False
+                        return
+                    time.sleep(MSGOFFICE365_STATE_LOCK_POLL_INTERVAL)
+
+            self._state_lock_file = lock_file
+            try:
+                yield True
+            finally:
+                # Closing the file releases the lock
+                self._state_lock_file = None
+                lock_file.close()
+
+    def _merge_state_entries(self, entries, saved_entries, snapshot_entries, persisted_entries):
+        """
+        Update the entries of a dictionary field of the state that this action did not change from the saved state, in place.
+
+        :param entries: dictionary field of the state
+        :param saved_entries: same field of the state last saved by any action of the asset
+        :param snapshot_entries: serialized entries of the field
+        :param persisted_entries: serialized entries of the field when it was last loaded or saved by this action
+        """
+        if not isinstance(persisted_entries, dict):
+            persisted_entries = {}
+
+        for entry in set(saved_entries) | set(entries):
+            if snapshot_entries.get(entry) != persisted_entries.get(entry):
+                continue
+            if entry in saved_entries:
+                entries[entry] = saved_entries[entry]
+            else:
+                entries.pop(entry, None)
+
+    def _get_state_snapshot(self, state):
+        """
+        :param state: state dictionary
+        :return: dictionary of the serialized value of every field of the state, to find the fields changed since.
+                 The fields of MSGOFFICE365_STATE_MERGED_FIELDS are serialized entry by entry.
+        """
+        snapshot = dict()
+        for key, value in state.items():
+            if key in MSGOFFICE365_STATE_MERGED_FIELDS and isinstance(value, dict):
+                snapshot[key] = {entry: json.dumps(entry_value, sort_keys=True) for entry, entry_value in value.items()}
+            else:
+                snapshot[key] = json.dumps(value, sort_keys=True)
+        return snapshot
+
+    def _checkpoint_state(self):
+        """
+        Save the progress of a long running action. The checkpoints are coalesced to one save every
+        MSGOFFICE365_STATE_CHECKPOINT_INTERVAL seconds, the state is saved anyway in finalize.
+        """
+        if time.monotonic() - self._last_state_save >= MSGOFFICE365_STATE_CHECKPOINT_INTERVAL:
+            self.save_state(self._state)
 
     def update_state_fields(self, value, helper_function, error_message):
+        # An unchanged secret keeps the ciphertext it was loaded from or last saved with, only the new ones are encrypted
+        encrypt = helper_function is encryption_helper.encrypt
+        if encrypt and value in self._encrypted_secrets:
+            return self._encrypted_secrets[value]
+        if not encrypt and value in self._decrypted_secrets:
+            return self._decrypted_secrets[value]
+
         try:
-            return helper_function(value, self._asset_id)
+            result = helper_function(value, self._asset_id)
         except Exception as ex:
             self.debug_print("{}: {}".format(error_message, _get_error_msg_from_exception(ex, self)))
-        return None
+            return None
+
+        if result is None:
+            return None
+        if encrypt:
+            self._encrypted_secrets[value] = result
+            self._decrypted_secrets[result] = value
+        else:
+            self._encrypted_secrets[result] = value
+            self._decrypted_secrets[value] = result
+        return result
 
     def check_state_fields(self, state, helper_function, error_message):
         access_token = state.get("non_admin_auth", {}).get("access_token")
@@ -487,6 +713,8 @@ class Office365Connector(BaseConnector):
         status_code = response.status_code
 
         try:
+            from bs4 import BeautifulSoup
+
             soup = BeautifulSoup(response.text, "html.parser")
             # Remove the script, style, footer and navigation part from the HTML message
             for element in soup(["script", "style", "footer", "nav"]):
@@ -530,6 +758,8 @@ class Office365Connector(BaseConnector):
 
             if error_msg:
                 try:
+                    from bs4 import BeautifulSoup
+
                     soup = BeautifulSoup(resp_json.get("error", {}).get("message"), "html.parser")
                     # Remove the script, style, footer and navigation part from the HTML message
                     for element in soup(["script", "style", "footer", "nav"]):
@@ -562,11 +792,32 @@ class Office365Connector(BaseConnector):
 
     def _process_response(self, r, action_result):
 
-        # store the r_text in debug data, it will get dumped in the logs if the action fails
-        if hasattr(action_result, "add_debug_data"):
-            action_result.add_debug_data({"r_status_code": r.status_code})
-            action_result.add_debug_data({"r_text": r.text})
-            action_result.add_debug_data({"r_headers": r.headers})
+        ret_val, resp_json = self._parse_response(r, action_result)
+
+        # store the r_text of a failed response in debug data, it will get dumped in the logs if the action fails
+        if phantom.is_fail(ret_val) and hasattr(action_result, "add_debug_data"):
+            self._add_response_debug_data(r, action_result)
+
+        return RetVal(ret_val, resp_json)
+
+    def _add_response_debug_data(self, r, action_result):
+        """
+        This function stores the status code, the headers and the beginning of the body of the response in debug data.
+        The body is capped to MSGOFFICE365_DEBUG_DATA_MAX_SIZE bytes, so that a large page is not held in memory again.
+
+        :param r: Response object
+        :param action_result: Object of ActionResult class
+        """
+        content = r.content or b""
+        r_text = content[:MSGOFFICE365_DEBUG_DATA_MAX_SIZE].decode("utf-8", errors="replace")
+        if len(content) > MSGOFFICE365_DEBUG_DATA_MAX_SIZE:
+            r_text = "{0}... ({1} more bytes)".format(r_text, len(content) - MSGOFFICE365_DEBUG_DATA_MAX_SIZE)
+
+        action_result.add_debug_data({"r_status_code": r.status_code})
+        action_result.add_debug_data({"r_text": r_text})
+        action_result.add_debug_data({"r_headers": dict(r.headers)})
+
+    def _parse_response(self, r, action_result):
 
         # Process each 'Content-Type' of response separately
 
@@ -600,6 +851,7 @@ class Office365Connector(BaseConnector):
 
         return RetVal(action_result.set_status(phantom.APP_ERROR, msg), None)
 
+    @profiled("rest_call")
     def _make_rest_call(
         self,
         action_result,
@@ -615,7 +867,7 @@ class Office365Connector(BaseConnector):
         resp_json = None
 
         try:
-            request_func = getattr(requests, method)
+            request_func = getattr(self._session, method)
         except AttributeError:
             return RetVal(
                 action_result.set_status(phantom.APP_ERROR, "Invalid method: {0}".format(method)),
@@ -637,10 +889,15 @@ class Office365Connector(BaseConnector):
                 error_msg = _get_error_msg_from_exception(e, self)
                 return RetVal(action_result.set_status(phantom.APP_ERROR, "Error connecting to server. {0}".format(error_msg)), resp_json)
 
-            if r.status_code != 502:
+            if r.status_code not in (429, 502):
                 break
-            self.debug_print("Received 502 status code from the server")
-            time.sleep(self._retry_wait_time)
+            self.debug_print("Received {0} status code from the server".format(r.status_code))
+            with self.performance_profile.measure("throttle_sleep"):
+                time.sleep(self._get_retry_wait_time(r))
+
+        # Keep track of the size of the received payload, it is reported in the summary of the ingestion actions
+        self._add_payload_bytes(len(r.content or b""))
+        self.performance_profile.add_bytes("rest_call", len(r.content or b""))
 
         if download:
             if 200 <= r.status_code < 399:
@@ -650,6 +907,20 @@ class Office365Connector(BaseConnector):
 
         return self._process_response(r, action_result)
 
+    def _get_retry_wait_time(self, response):
+        """
+        This function returns the delay before retrying the request. The server's Retry-After header
+        of a throttled (429) response takes precedence over the configured delay.
+
+        :param response: Response object of the request to retry
+        :return: delay in seconds
+        """
+        retry_after = response.headers.get("Retry-After")
+        if response.status_code == 429 and retry_after and retry_after.isdigit():
+            return int(retry_after)
+
+        return self._retry_wait_time
+
     def _get_asset_name(self, action_result):
 
         rest_endpoint = SPLUNK_SOAR_ASSET_INFO_URL.format(url=self.get_phantom_base_url(), asset_id=self._asset_id)
@@ -776,9 +1047,8 @@ class Office365Connector(BaseConnector):
         if headers is None:
             headers = {}
 
-        headers.update(
-            {"Authorization": "Bearer {0}".format(self._access_token), "Accept": "application/json", "Content-Type": "application/json"}
-        )
+        access_token = self._access_token
+        headers.update({"Authorization": "Bearer {0}".format(access_token), "Accept": "application/json", "Content-Type": "application/json"})
 
         ret_val, resp_json = self._make_rest_call(action_result, url, verify, headers, params, data, method, download=download)
 
@@ -786,7 +1056,7 @@ class Office365Connector(BaseConnector):
         msg = action_result.get_message()
         if msg and (("token" in msg and "expired" in msg) or any(failure_msg in msg for failure_msg in MSGOFFICE365_AUTH_FAILURE_MSG)):
             self.debug_print("MSGRAPH", f"Error '{msg}' found in API response. Requesting new access token using refresh token")
-            ret_val = self._get_token(action_result)
+            ret_val = self._refresh_access_token(action_result, access_token)
             if phantom.is_fail(ret_val):
                 return action_result.get_status(), None
 
@@ -808,6 +1078,156 @@ class Office365Connector(BaseConnector):
 
         return phantom.APP_SUCCESS, resp_json
 
+    def _refresh_access_token(self, action_result, expired_token):
+        """
+        This function generates a new access token, unless another worker thread or another action of the asset has
+        already replaced the expired one. The state file lock is held meanwhile, so that a single action of the asset
+        requests a new token while the others wait for it.
+
+        :param action_result: Object of ActionResult class
+        :param expired_token: Access token the failed request was made with
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS
+        """
+        with self._token_lock, self._state_file_lock():
+            if self._access_token != expired_token:
+                return phantom.APP_SUCCESS
+
+            auth_key = "admin_auth" if self._admin_access else "non_admin_auth"
+            saved_auth = (self._read_saved_state() or {}).get(auth_key) or {}
+            if saved_auth.get("access_token") and saved_auth["access_token"] != expired_token:
+                self.debug_print("Using the access token generated by another action of the asset")
+                self._state[auth_key] = saved_auth
+                self._persisted_state[auth_key] = json.dumps(saved_auth, sort_keys=True)
+                self._access_token = saved_auth["access_token"]
+                self._refresh_token = saved_auth.get("refresh_token")
+                return phantom.APP_SUCCESS
+
+            return self._get_token(action_result)
+
+    def _add_payload_bytes(self, size):
+        # The REST calls and downloads run in the worker threads of _run_concurrently as well
+        with self._payload_bytes_lock:
+            self._payload_bytes += size
+
+    def _remove_tmp_files(self, tmp_file_paths):
+        """
+        This function removes the temporary files of the prefetched attachments which were not added to the vault.
+
+        :param tmp_file_paths: List of temporary file paths, None for the attachments without content
+        """
+        for tmp_file_path in tmp_file_paths:
+            if not tmp_file_path or not os.path.exists(tmp_file_path):
+                continue
+            try:
+                os.remove(tmp_file_path)
+            except OSError as e:
+                error_msg = _get_error_msg_from_exception(e, self)
+                self.debug_print("Unable to remove the temporary file {0}. {1}".format(tmp_file_path, error_msg))
+
+    def _run_concurrently(self, func, items):
+        """
+        This function calls the given function for every item using at most 'max_concurrent_requests' worker threads.
+        Every call gets its own ActionResult object, as the status message of the action result is used to detect the token expiry.
+        An exception raised by a call fails its item only, so that the results of the other items, e.g. their temporary files, are returned.
+
+        :param func: Function to call with the worker's action result and an item, returning RetVal
+        :param items: List of items to process
+        :return: list of (action result, RetVal) tuples in the order of the items
+        """
+
+        def worker(item):
+            worker_action_result = ActionResult()
+            try:
+                return worker_action_result, func(worker_action_result, item)
+            except Exception as e:
+                error_msg = _get_error_msg_from_exception(e, self)
+                return worker_action_result, RetVal(worker_action_result.set_status(phantom.APP_ERROR, error_msg), None)
+
+        if self._max_concurrent_requests <= 1 or len(items) <= 1:
+            return [worker(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=min(self._max_concurrent_requests, len(items))) as executor:
+            return list(executor.map(worker, items))
+
+    @profiled("download")
+    def _stream_to_file(self, action_result, url, file_obj):
+        """
+        This function streams the raw content of the given URL into the file object, without holding it in memory.
+
+        :param action_result: Object of ActionResult class
+        :param url: URL to download the content from
+        :param file_obj: Writable binary file object
+        :return: status code of the response, None in case of an error
+        """
+        headers = {"Authorization": "Bearer {0}".format(self._access_token)}
+
+        for _ in range(self._number_of_retries):
+            try:
+                r = self._session.get(url, headers=headers, stream=True, timeout=MSGOFFICE365_DEFAULT_REQUEST_TIMEOUT)
+            except Exception as e:
+                error_msg = _get_error_msg_from_exception(e, self)
+                action_result.set_status(phantom.APP_ERROR, "Error connecting to server. {0}".format(error_msg))
+                return None
+
+            with r:
+                if r.status_code in (429, 502):
+                    self.debug_print("Received {0} status code from the server".format(r.status_code))
+                    with self.performance_profile.measure("throttle_sleep"):
+                        time.sleep(self._get_retry_wait_time(r))
+                    continue
+
+                if not 200 <= r.status_code < 399:
+                    return r.status_code
+
+                try:
+                    file_obj.seek(0)
+                    file_obj.truncate()
+                    for chunk in r.iter_content(chunk_size=MSGOFFICE365_DOWNLOAD_CHUNK_SIZE):
+                        file_obj.write(chunk)
+                        self._add_payload_bytes(len(chunk))
+                        self.performance_profile.add_bytes("download", len(chunk))
+                except Exception as e:
+                    error_msg = _get_error_msg_from_exception(e, self)
+                    action_result.set_status(phantom.APP_ERROR, "Error occurred while downloading the file content. {0}".format(error_msg))
+                    return None
+
+                return r.status_code
+
+        return r.status_code
+
+    def _download_to_file(self, action_result, endpoint, file_obj):
+        """
+        This function downloads the raw content of the given endpoint (e.g. an attachment's '$value') into the file object.
+
+        :param action_result: Object of ActionResult class
+        :param endpoint: REST endpoint that needs to be appended to the service address
+        :param file_obj: Writable binary file object
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS
+        """
+        url = f"{MSGRAPH_API_URL}/v1.0{endpoint}"
+        access_token = self._access_token
+
+        status_code = self._stream_to_file(action_result, url, file_obj)
+
+        # If token is expired, generate a new token
+        if status_code == 401:
+            self.debug_print("MSGRAPH", "Received 401 status code while downloading the file content. Requesting new access token")
+            ret_val = self._refresh_access_token(action_result, access_token)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
+
+            status_code = self._stream_to_file(action_result, url, file_obj)
+
+        if status_code is None:
+            return action_result.get_status()
+
+        if not 200 <= status_code < 399:
+            return action_result.set_status(
+                phantom.APP_ERROR, "Status Code: {0}. Error occurred while downloading the file content".format(status_code)
+            )
+
+        return phantom.APP_SUCCESS
+
     def _sanitize_file_name(self, file_name):
         return re.sub("[,\"']", "", file_name)
 
@@ -818,6 +1238,42 @@ class Office365Connector(BaseConnector):
         with open(tmp_file_path, file_mode) as f:
             f.write(file_data)
 
+        return self._add_file_to_vault(attachment, container_id, tmp_file_path)
+
+    def _download_attachment_to_tmp_file(self, action_result, attach_endpoint, attachment):
+        """
+        This function streams the raw content of the attachment into a vault temporary file.
+
+        :param action_result: Object of ActionResult class
+        :param attach_endpoint: attachment endpoint
+        :param attachment: Attachment metadata
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, path of the temporary file (None if the attachment has no content)
+        """
+        fd, tmp_file_path = tempfile.mkstemp(dir=Vault.get_vault_tmp_dir())
+        os.close(fd)
+
+        try:
+            with open(tmp_file_path, "wb") as f:
+                ret_val = self._download_to_file(action_result, "{0}/{1}/$value".format(attach_endpoint, attachment["id"]), f)
+        except Exception:
+            os.remove(tmp_file_path)
+            raise
+
+        if phantom.is_fail(ret_val) or not os.path.getsize(tmp_file_path):
+            os.remove(tmp_file_path)
+            if phantom.is_fail(ret_val):
+                self.debug_print(
+                    "Error while downloading the file content, for attachment id: {}. {}".format(attachment["id"], action_result.get_message())
+                )
+                return RetVal(phantom.APP_ERROR, None)
+            return RetVal(phantom.APP_SUCCESS, None)
+
+        return RetVal(phantom.APP_SUCCESS, tmp_file_path)
+
+    @profiled("vault_add")
+    def _add_file_to_vault(self, attachment, container_id, tmp_file_path):
+
+        self.performance_profile.add_bytes("vault_add", os.path.getsize(tmp_file_path))
         file_name = self._sanitize_file_name(attachment["name"])
 
         success, msg, vault_id = ph_rules.vault_add(
@@ -831,7 +1287,7 @@ class Office365Connector(BaseConnector):
         else:
             return RetVal(phantom.APP_SUCCESS, vault_id)
 
-    def _handle_attachment(self, attachment, container_id, artifact_json=None):
+    def _handle_attachment(self, attachment, container_id, artifact_json=None, tmp_file_path=None):
 
         vault_id = None
 
@@ -841,6 +1297,10 @@ class Office365Connector(BaseConnector):
                 ret_val, vault_id = self._add_attachment_to_vault(attachment, container_id, file_data)
                 if phantom.is_fail(ret_val):
                     return phantom.APP_ERROR
+            elif tmp_file_path:  # Check whether the content of the attachment has been downloaded
+                ret_val, vault_id = self._add_file_to_vault(attachment, container_id, tmp_file_path)
+                if phantom.is_fail(ret_val):
+                    return phantom.APP_ERROR
             else:
                 self.debug_print("No content found in the attachment. Hence, skipping the vault file creation.")
 
@@ -871,16 +1331,18 @@ class Office365Connector(BaseConnector):
 
         return phantom.APP_SUCCESS
 
-    def _handle_item_attachment(self, attachment, container_id, endpoint, action_result):
+    def _handle_item_attachment(self, attachment, container_id, endpoint, action_result, rfc822_email=None):
 
         vault_id = None
 
         try:
-            attach_endpoint = "{}/{}/$value".format(endpoint, attachment["id"])
-            ret_val, rfc822_email = self._make_rest_call_helper(action_result, attach_endpoint, download=True)
-            if phantom.is_fail(ret_val):
-                self.debug_print("Error while downloading the file content, for attachment id: {}".format(attachment["id"]))
-                return phantom.APP_ERROR
+            # The content might already have been fetched along with the other attachments of the email
+            if rfc822_email is None:
+                attach_endpoint = "{}/{}/$value".format(endpoint, attachment["id"])
+                ret_val, rfc822_email = self._make_rest_call_helper(action_result, attach_endpoint, download=True)
+                if phantom.is_fail(ret_val):
+                    self.debug_print("Error while downloading the file content, for attachment id: {}".format(attachment["id"]))
+                    return phantom.APP_ERROR
 
             attachment["name"] = "{}.eml".format(attachment["name"])
 
@@ -923,6 +1385,15 @@ class Office365Connector(BaseConnector):
 
         return phantom.APP_SUCCESS
 
+    def _get_process_email(self):
+        # ProcessEmail loads the HTML parser and libmagic, it is only created by the actions that parse emails
+        if self._process_email is None:
+            from process_email import ProcessEmail
+
+            self._process_email = ProcessEmail(self, self.get_config())
+        return self._process_email
+
+    @profiled("create_email_artifacts")
     def _create_email_artifacts(self, container_id, email, artifact_id=None, create_iocs=True):
         """
         Create email artifacts.
@@ -943,8 +1414,9 @@ class Office365Connector(BaseConnector):
             artifact_id = email["id"]
 
             # Set email ID contains
-            self._process_email._set_email_id_contains(email["id"])
-            email_artifact["cef_types"] = {"messageId": self._process_email._email_id_contains}
+            process_email = self._get_process_email()
+            process_email._set_email_id_contains(email["id"])
+            email_artifact["cef_types"] = {"messageId": process_email._email_id_contains}
 
         email_artifact["source_data_identifier"] = artifact_id
 
@@ -982,6 +1454,8 @@ class Office365Connector(BaseConnector):
             html_body = cef["body"]["content"]
 
             try:
+                from bs4 import BeautifulSoup
+
                 soup = BeautifulSoup(html_body, "html.parser")
                 # Remove the script, style, footer, title and navigation part from the HTML message
                 for element in soup(["script", "style", "footer", "title", "nav"]):
@@ -994,14 +1468,18 @@ class Office365Connector(BaseConnector):
                     cef["bodyText"] = body_text
             except Exception:
                 self.debug_print("Cannot parse email body text details")
+        elif self._prefer_text_body and cef.get("body", {}).get("content") and (cef.get("body", {}).get("contentType") == "text"):
+            # The server has already rendered the body as text, no need to parse it
+            cef["bodyText"] = cef["body"]["content"]
 
-        if not create_iocs:
+        # The body is not fetched by the minimal projection profile, there is nothing to extract the IOCs from
+        if not create_iocs or not email.get("body", {}).get("content"):
             return [email_artifact]
 
         body = email["body"]["content"]
 
         ips = []
-        self._process_email._get_ips(body, ips)
+        self._get_process_email()._get_ips(body, ips)
 
         for ip in ips:
             ip_artifact = {}
@@ -1014,7 +1492,7 @@ class Office365Connector(BaseConnector):
 
         urls = []
         domains = []
-        self._process_email._extract_urls_domains(body, urls, domains)
+        self._get_process_email()._extract_urls_domains(body, urls, domains)
 
         for url in urls:
             url_artifact = {}
@@ -1035,7 +1513,7 @@ class Office365Connector(BaseConnector):
             domain_artifact["source_data_identifier"] = artifact_id
 
         hashes = []
-        self._process_email._extract_hashes(body, hashes)
+        self._get_process_email()._extract_hashes(body, hashes)
 
         for hash in hashes:
             hash_artifact = {}
@@ -1050,6 +1528,101 @@ class Office365Connector(BaseConnector):
 
         return artifacts
 
+    def _get_file_attachment_content(self, action_result, attach_endpoint, attachment):
+        """
+        This function returns the content of the file attachment, from the inlined 'contentBytes' if present
+        or else by downloading the raw content of the attachment.
+
+        :param action_result: Object of ActionResult class
+        :param attach_endpoint: attachment endpoint
+        :param attachment: attachment dict
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, content of the attachment in bytes
+        """
+        if "contentBytes" in attachment:
+            try:
+                return RetVal(phantom.APP_SUCCESS, base64.b64decode(attachment["contentBytes"]))
+            except Exception as e:
+                error_msg = _get_error_msg_from_exception(e, self)
+                self.debug_print("Unable to decode Email Mime Content. {0}".format(error_msg))
+                return RetVal(action_result.set_status(phantom.APP_ERROR, "Unable to decode Email Mime Content"), None)
+
+        with tempfile.TemporaryFile(dir=Vault.get_vault_tmp_dir()) as f:
+            ret_val = self._download_to_file(action_result, "{0}/{1}/$value".format(attach_endpoint, attachment["id"]), f)
+            if phantom.is_fail(ret_val):
+                return RetVal(action_result.get_status(), None)
+            f.seek(0)
+            return RetVal(phantom.APP_SUCCESS, f.read())
+
+    def _fetch_ingestion_attachment_content(self, action_result, attach_endpoint, attachment):
+        """
+        This function fetches the content of the attachment required for the ingestion. It runs in a worker thread.
+
+        :param action_result: Object of ActionResult class
+        :param attach_endpoint: attachment endpoint
+        :param attachment: attachment dict
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, the expanded item and its rfc822 content for item attachments,
+                 the content in bytes for .eml file attachments and the temporary file path for other file attachments
+        """
+        if attachment.get("@odata.type") == "#microsoft.graph.itemAttachment":
+            sub_email_endpoint = attach_endpoint + "/{0}?$expand=microsoft.graph.itemattachment/item".format(attachment["id"])
+            ret_val, sub_email_resp = self._make_rest_call_helper(action_result, sub_email_endpoint)
+            if phantom.is_fail(ret_val):
+                return RetVal(action_result.get_status(), None)
+
+            # Fetch the rfc822 content for the item attachment
+            sub_email_endpoint = "{0}/{1}/$value".format(attach_endpoint, attachment["id"])
+            ret_val, rfc822_email = self._make_rest_call_helper(action_result, sub_email_endpoint, download=True)
+            if phantom.is_fail(ret_val):
+                self.debug_print("Error while downloading the email content, for attachment id: {}".format(attachment["id"]))
+
+            return RetVal(phantom.APP_SUCCESS, (sub_email_resp.get("item", {}), rfc822_email))
+
+        if attachment.get("@odata.type") == "#microsoft.graph.referenceAttachment":
+            return RetVal(phantom.APP_SUCCESS, None)
+
+        if attachment.get("name", "").endswith(".eml"):
+            return self._get_file_attachment_content(action_result, attach_endpoint, attachment)
+
+        return self._download_attachment_to_tmp_file(action_result, attach_endpoint, attachment)
+
+    def _fetch_attachment_content(self, action_result, attach_endpoint, attachment):
+        """
+        This function fetches the content of the attachment to be added to the vault. It runs in a worker thread.
+
+        :param action_result: Object of ActionResult class
+        :param attach_endpoint: attachment endpoint
+        :param attachment: attachment dict
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, the temporary file path for file attachments
+                 and the rfc822 content for item attachments
+        """
+        if attachment.get("@odata.type") == "#microsoft.graph.fileAttachment":
+            return self._download_attachment_to_tmp_file(action_result, attach_endpoint, attachment)
+
+        if attachment.get("@odata.type") == "#microsoft.graph.itemAttachment":
+            ret_val, rfc822_email = self._make_rest_call_helper(
+                action_result, "{}/{}/$value".format(attach_endpoint, attachment["id"]), download=True
+            )
+            if phantom.is_fail(ret_val):
+                self.debug_print("Error while downloading the file content, for attachment id: {}".format(attachment["id"]))
+            return RetVal(ret_val, rfc822_email)
+
+        return RetVal(phantom.APP_SUCCESS, None)
+
+    def _get_prefetched_content(self, action_result, prefetched, attachment):
+        """
+        This function returns the content of the attachment fetched by the worker threads.
+
+        :param action_result: Object of ActionResult class
+        :param prefetched: Dictionary of the worker's (action result, RetVal) tuples keyed by the attachment ID
+        :param attachment: attachment dict
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, content of the attachment
+        """
+        worker_action_result, (ret_val, content) = prefetched[attachment["id"]]
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.set_status(phantom.APP_ERROR, worker_action_result.get_message()), None)
+
+        return RetVal(phantom.APP_SUCCESS, content)
+
     def _extract_attachments(
         self,
         config,
@@ -1072,122 +1645,157 @@ class Office365Connector(BaseConnector):
         :param first_time: boolean flag to specify if we want to expand the item attachment
         :return: status phantom.APP_ERROR/phantom.APP_SUCCESS with status message
         """
-        for attachment in attachments:
+        prefetched = dict()
+        tmp_file_paths = []
+        if first_time:
+            # Fetch the content of the attachments concurrently, the vault and parsing work below stays serial
+            results = self._run_concurrently(
+                lambda worker_action_result, attachment: self._fetch_ingestion_attachment_content(
+                    worker_action_result, attach_endpoint, attachment
+                ),
+                attachments,
+            )
+            prefetched = {attachment["id"]: result for attachment, result in zip(attachments, results)}
+            # The content of the file attachments other than .eml is fetched to temporary files
+            tmp_file_paths = [
+                content
+                for attachment, (_, (_, content)) in zip(attachments, results)
+                if attachment.get("@odata.type") not in ("#microsoft.graph.itemAttachment", "#microsoft.graph.referenceAttachment")
+                and not attachment.get("name", "").endswith(".eml")
+            ]
+
+        try:
+            for attachment in attachments:
 
-            if attachment.get("@odata.type") == "#microsoft.graph.itemAttachment":
+                if attachment.get("@odata.type") == "#microsoft.graph.itemAttachment":
 
-                # We need to expand the item attachment only once
-                if first_time:
-                    sub_email_endpoint = attach_endpoint + "/{0}?$expand=microsoft.graph.itemattachment/item".format(attachment["id"])
-                    ret_val, sub_email_resp = self._make_rest_call_helper(action_result, sub_email_endpoint)
-                    if phantom.is_fail(ret_val):
-                        return action_result.get_status()
-                    sub_email = sub_email_resp.get("item", {})
+                    # We need to expand the item attachment only once
+                    if first_time:
+                        ret_val, content = self._get_prefetched_content(action_result, prefetched, attachment)
+                        if phantom.is_fail(ret_val):
+                            return action_result.get_status()
+                        sub_email, rfc822_email = content
 
-                else:
-                    sub_email = attachment.get("item", {})
-
-                if sub_email:
-                    sub_artifacts = self._create_email_artifacts(container_id, sub_email, attachment["id"], create_iocs=False)
-                    artifacts += sub_artifacts
-
-                # Use recursive approach to extract the reference attachment
-                item_attachments = sub_email.pop("attachments", [])
-                if item_attachments:
-                    ret_val = self._extract_attachments(
-                        config,
-                        attach_endpoint,
-                        artifacts,
-                        action_result,
-                        item_attachments,
-                        container_id,
-                    )
-                    if phantom.is_fail(ret_val):
-                        self.debug_print("Error while processing nested attachments, for attachment id: {}".format(attachment["id"]))
+                    else:
+                        sub_email = attachment.get("item", {})
+
+                    if sub_email:
+                        sub_artifacts = self._create_email_artifacts(container_id, sub_email, attachment["id"], create_iocs=False)
+                        artifacts += sub_artifacts
+
+                    # Use recursive approach to extract the reference attachment
+                    item_attachments = sub_email.pop("attachments", [])
+                    if item_attachments:
+                        ret_val = self._extract_attachments(
+                            config,
+                            attach_endpoint,
+                            artifacts,
+                            action_result,
+                            item_attachments,
+                            container_id,
+                        )
+                        if phantom.is_fail(ret_val):
+                            self.debug_print("Error while processing nested attachments, for attachment id: {}".format(attachment["id"]))
 
-                if first_time:
-                    # Fetch the rfc822 content for the item attachment
-                    sub_email_endpoint = "{0}/{1}/$value".format(attach_endpoint, attachment["id"])
-                    attachment["name"] = "{}.eml".format(attachment["name"])
-                    ret_val, rfc822_email = self._make_rest_call_helper(action_result, sub_email_endpoint, download=True)
-                    if phantom.is_fail(ret_val):
-                        self.debug_print("Error while downloading the email content, for attachment id: {}".format(attachment["id"]))
+                    if first_time:
+                        attachment["name"] = "{}.eml".format(attachment["name"])
 
-                    if rfc822_email:
-                        # Create ProcessEmail Object for email item attachment
-                        process_email_obj = ProcessEmail(self, config)
-                        process_email_obj._trigger_automation = False
+                        if rfc822_email:
+                            # Create ProcessEmail Object for email item attachment
+                            from process_email import ProcessEmail
 
-                        ret_val, msg = process_email_obj.process_email(
-                            rfc822_email, attachment["id"], epoch=None, container_id=container_id, ingest_email=False
-                        )
+                            process_email_obj = ProcessEmail(self, config)
+                            process_email_obj._trigger_automation = False
 
-                        if phantom.is_fail(ret_val):
-                            self.debug_print("Error while processing the email content, for attachment id: {}".format(attachment["id"]))
+                            with self.performance_profile.measure("process_email"):
+                                ret_val, msg = process_email_obj.process_email(
+                                    rfc822_email, attachment["id"], epoch=None, container_id=container_id, ingest_email=False
+                                )
 
-                        if config.get("ingest_eml", False):
-                            # Add eml file into the vault if ingest_email is checked
-                            ret_val, vault_id = self._add_attachment_to_vault(attachment, container_id, rfc822_email)
                             if phantom.is_fail(ret_val):
-                                self.debug_print("Could not process item attachment. See logs for details")
-                            else:
-                                # If success, create vault artifact
-                                artifact_json = {
-                                    "name": "Vault Artifact",
-                                    "label": "attachment",
-                                    "container_id": container_id,
-                                    "source_data_identifier": attachment["id"],
-                                }
-
-                                artifact_cef = {
-                                    "size": attachment["size"],
-                                    "lastModified": attachment["lastModifiedDateTime"],
-                                    "filename": attachment["name"],
-                                    "mimeType": attachment["contentType"],
-                                }
-                                if vault_id:
-                                    artifact_cef["vault_id"] = vault_id
-                                artifact_json["cef"] = artifact_cef
-                                artifacts.append(artifact_json)
+                                self.debug_print("Error while processing the email content, for attachment id: {}".format(attachment["id"]))
+
+                            if config.get("ingest_eml", False):
+                                # Add eml file into the vault if ingest_email is checked
+                                ret_val, vault_id = self._add_attachment_to_vault(attachment, container_id, rfc822_email)
+                                if phantom.is_fail(ret_val):
+                                    self.debug_print("Could not process item attachment. See logs for details")
+                                else:
+                                    # If success, create vault artifact
+                                    artifact_json = {
+                                        "name": "Vault Artifact",
+                                        "label": "attachment",
+                                        "container_id": container_id,
+                                        "source_data_identifier": attachment["id"],
+                                    }
+
+                                    artifact_cef = {
+                                        "size": attachment["size"],
+                                        "lastModified": attachment["lastModifiedDateTime"],
+                                        "filename": attachment["name"],
+                                        "mimeType": attachment["contentType"],
+                                    }
+                                    if vault_id:
+                                        artifact_cef["vault_id"] = vault_id
+                                    artifact_json["cef"] = artifact_cef
+                                    artifacts.append(artifact_json)
 
-                    else:
-                        self.debug_print("No content found for the item attachment. Hence, skipping the email file processing.")
+                        else:
+                            self.debug_print("No content found for the item attachment. Hence, skipping the email file processing.")
 
-            elif attachment.get("@odata.type") == "#microsoft.graph.referenceAttachment":
+                elif attachment.get("@odata.type") == "#microsoft.graph.referenceAttachment":
 
-                attach_artifact = {}
-                artifacts.append(attach_artifact)
-                self._create_reference_attachment_artifact(container_id, attachment, attach_artifact)
+                    attach_artifact = {}
+                    artifacts.append(attach_artifact)
+                    self._create_reference_attachment_artifact(container_id, attachment, attach_artifact)
 
-            elif attachment.get("name", "").endswith(".eml"):
-                if "contentBytes" in attachment:
-                    try:
-                        rfc822_email = base64.b64decode(attachment["contentBytes"])
-                        rfc822_email = UnicodeDammit(rfc822_email).unicode_markup
-                    except Exception as e:
-                        error_msg = _get_error_msg_from_exception(e, self)
-                        self.debug_print("Unable to decode Email Mime Content. {0}".format(error_msg))
-                        return action_result.set_status(phantom.APP_ERROR, "Unable to decode Email Mime Content")
+                elif attachment.get("name", "").endswith(".eml"):
+                    if "contentBytes" in attachment or first_time:
+                        if first_time:
+                            ret_val, rfc822_email = self._get_prefetched_content(action_result, prefetched, attachment)
+                        else:
+                            ret_val, rfc822_email = self._get_file_attachment_content(action_result, attach_endpoint, attachment)
+                        if phantom.is_fail(ret_val):
+                            return action_result.get_status()
 
-                    # Create ProcessEmail Object for email file attachment
-                    process_email_obj = ProcessEmail(self, config)
-                    process_email_obj._trigger_automation = False
+                        try:
+                            from bs4 import UnicodeDammit
 
-                    ret_val, msg = process_email_obj.process_email(rfc822_email, attachment["id"], epoch=None, container_id=container_id)
+                            rfc822_email = UnicodeDammit(rfc822_email).unicode_markup
+                        except Exception as e:
+                            error_msg = _get_error_msg_from_exception(e, self)
+                            self.debug_print("Unable to decode Email Mime Content. {0}".format(error_msg))
+                            return action_result.set_status(phantom.APP_ERROR, "Unable to decode Email Mime Content")
 
-                    if phantom.is_fail(ret_val):
-                        return action_result.set_status(phantom.APP_ERROR, msg)
-                else:
-                    self.debug_print("No content found in the .eml file attachment. Hence, skipping the email file processing.")
+                        # Create ProcessEmail Object for email file attachment
+                        from process_email import ProcessEmail
 
-            elif first_time:
-                attach_artifact = {}
-                artifacts.append(attach_artifact)
-                if not self._handle_attachment(attachment, container_id, artifact_json=attach_artifact):
-                    return action_result.set_status(
-                        phantom.APP_ERROR,
-                        "Could not process attachment. See logs for details.",
-                    )
+                        process_email_obj = ProcessEmail(self, config)
+                        process_email_obj._trigger_automation = False
+
+                        with self.performance_profile.measure("process_email"):
+                            ret_val, msg = process_email_obj.process_email(rfc822_email, attachment["id"], epoch=None, container_id=container_id)
+
+                        if phantom.is_fail(ret_val):
+                            return action_result.set_status(phantom.APP_ERROR, msg)
+                    else:
+                        self.debug_print("No content found in the .eml file attachment. Hence, skipping the email file processing.")
+
+                elif first_time:
+                    attach_artifact = {}
+                    artifacts.append(attach_artifact)
+                    ret_val, tmp_file_path = self._get_prefetched_content(action_result, prefetched, attachment)
+                    if phantom.is_fail(ret_val) or not self._handle_attachment(
+                        attachment, container_id, artifact_json=attach_artifact, tmp_file_path=tmp_file_path
+                    ):
+                        return action_result.set_status(
+                            phantom.APP_ERROR,
+                            "Could not process attachment. See logs for details.",
+                        )
+
+        finally:
+            # The vault takes over the temporary files it adds, the ones left by an early return are removed
+            self._remove_tmp_files(tmp_file_paths)
 
         return phantom.APP_SUCCESS
 
@@ -1237,7 +1845,7 @@ class Office365Connector(BaseConnector):
                 if phantom.is_fail(ret_val):
                     return action_result.get_status()
 
-        self.debug_print("Creating email artifacts")
+        self.debug_logger.debug("ingestion", "Creating email artifacts for email ID: {0}", email.get("id"))
         email_artifacts = self._create_email_artifacts(container_id, email)
         attachment_artifacts = []
 
@@ -1278,7 +1886,8 @@ class Office365Connector(BaseConnector):
         if email["hasAttachments"] and config.get("extract_attachments", False):
 
             attach_endpoint = endpoint + "/{0}/attachments".format(email["id"])
-            ret_val, attach_resp = self._make_rest_call_helper(action_result, attach_endpoint)
+            params = {"$select": ",".join(MSGOFFICE365_ATTACHMENT_SELECT_PARAMETER_LIST)}
+            ret_val, attach_resp = self._make_rest_call_helper(action_result, attach_endpoint, params=params)
             if phantom.is_fail(ret_val):
                 return action_result.get_status()
 
@@ -1332,31 +1941,48 @@ class Office365Connector(BaseConnector):
         if download_attachments and email.get("hasAttachments"):
             endpoint += "/attachments"
             attachment_endpoint = "{}?$expand=microsoft.graph.itemattachment/item".format(endpoint)
-            ret_val, attach_resp = self._make_rest_call_helper(action_result, attachment_endpoint)
+            params = {"$select": ",".join(MSGOFFICE365_ATTACHMENT_DETAILS_SELECT_PARAMETER_LIST)}
+            ret_val, attach_resp = self._make_rest_call_helper(action_result, attachment_endpoint, params=params)
 
             if phantom.is_fail(ret_val):
                 return action_result.get_status()
 
-            for attachment in attach_resp.get("value", []):
-                # If it is fileAttachment, then we have to ingest it
-                if attachment.get("@odata.type") == "#microsoft.graph.fileAttachment":
-                    if not self._handle_attachment(attachment, self.get_container_id()):
-                        return action_result.set_status(
-                            phantom.APP_ERROR,
-                            "Could not process attachment. See logs for details",
-                        )
-                elif attachment.get("@odata.type") == "#microsoft.graph.itemAttachment":
-                    if not self._handle_item_attachment(attachment, self.get_container_id(), endpoint, action_result):
-                        return action_result.set_status(
-                            phantom.APP_ERROR,
-                            "Could not process item attachment. See logs for details",
-                        )
-
-            email["attachments"] = attach_resp["value"]
+            # Fetch the content of the attachments concurrently, the vault work below stays serial
+            attachments = attach_resp.get("value", [])
+            results = self._run_concurrently(
+                lambda worker_action_result, attachment: self._fetch_attachment_content(worker_action_result, endpoint, attachment), attachments
+            )
 
-        if email.get("@odata.type") in [
-            "#microsoft.graph.eventMessage",
-            "#microsoft.graph.eventMessageRequest",
+            try:
+                for attachment, (_, (ret_val, content)) in zip(attachments, results):
+                    # If it is fileAttachment, then we have to ingest it
+                    if attachment.get("@odata.type") == "#microsoft.graph.fileAttachment":
+                        if phantom.is_fail(ret_val) or not self._handle_attachment(attachment, self.get_container_id(), tmp_file_path=content):
+                            return action_result.set_status(
+                                phantom.APP_ERROR,
+                                "Could not process attachment. See logs for details",
+                            )
+                    elif attachment.get("@odata.type") == "#microsoft.graph.itemAttachment":
+                        if phantom.is_fail(ret_val) or not self._handle_item_attachment(
+                            attachment, self.get_container_id(), endpoint, action_result, rfc822_email=content
+                        ):
+                            return action_result.set_status(
+                                phantom.APP_ERROR,
+                                "Could not process item attachment. See logs for details",
+                            )
+            finally:
+                # The vault takes over the temporary files it adds, the ones left by an early return are removed
+                self._remove_tmp_files(
+                    content
+                    for attachment, (_, (_, content)) in zip(attachments, results)
+                    if attachment.get("@odata.type") == "#microsoft.graph.fileAttachment"
+                )
+
+            email["attachments"] = attach_resp["value"]
+
+        if email.get("@odata.type") in [
+            "#microsoft.graph.eventMessage",
+            "#microsoft.graph.eventMessageRequest",
             "#microsoft.graph.eventMessageResponse",
         ]:
             event_endpoint = "{}/?$expand=Microsoft.Graph.EventMessage/Event".format(endpoint)
@@ -1377,6 +2003,9 @@ class Office365Connector(BaseConnector):
             for attachment in email["attachments"]:
                 attachment_type = attachment.get("@odata.type", "")
                 attachment["attachmentType"] = attachment_type
+                # The media type annotation is only returned with the contentBytes, which are not selected
+                if attachment_type == "#microsoft.graph.fileAttachment":
+                    attachment.setdefault("@odata.mediaContentType", attachment.get("contentType"))
                 if attachment_type == "#microsoft.graph.itemAttachment":
                     attachment["itemType"] = attachment.get("item", {}).get("@odata.type", "")
 
@@ -1479,24 +2108,24 @@ class Office365Connector(BaseConnector):
         body = {"DestinationId": folder}
 
         if param.get("get_folder_id", True):
-            try:
+            ret_val, body["DestinationId"] = self._resolve_folder_id(action_result, folder, email_addr)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
 
-                dir_id, error, _ = self._get_folder_id(action_result, folder, email_addr)
-            except ReturnException as e:
-                self._dump_error_log(e)
+        ret_val, response = self._make_rest_call_helper(action_result, endpoint, data=json.dumps(body), method="post")
+        if phantom.is_fail(ret_val) and self._is_stale_folder_id(action_result, email_addr, folder):
+            # The cached folder ID no longer exists, retry with the freshly resolved one
+            ret_val, body["DestinationId"] = self._resolve_folder_id(action_result, folder, email_addr)
+            if phantom.is_fail(ret_val):
                 return action_result.get_status()
 
-            if dir_id:
-                body["DestinationId"] = dir_id
-            else:
-                self.save_progress(error)
-                return action_result.set_status(phantom.APP_ERROR, error)
+            ret_val, response = self._make_rest_call_helper(action_result, endpoint, data=json.dumps(body), method="post")
 
-        ret_val, response = self._make_rest_call_helper(action_result, endpoint, data=json.dumps(body), method="post")
         if phantom.is_fail(ret_val):
             return action_result.get_status()
 
         action_result.add_data(response)
+        self._update_folder_cache_summary(action_result)
 
         return action_result.set_status(phantom.APP_SUCCESS, "Successfully copied email")
 
@@ -1514,25 +2143,24 @@ class Office365Connector(BaseConnector):
 
         body = {"DestinationId": folder}
         if param.get("get_folder_id", True):
-            try:
-                dir_id, error, _ = self._get_folder_id(action_result, folder, email_addr)
-
-            except ReturnException as e:
-                self._dump_error_log(e)
+            ret_val, body["DestinationId"] = self._resolve_folder_id(action_result, folder, email_addr)
+            if phantom.is_fail(ret_val):
                 return action_result.get_status()
 
-            if dir_id:
-                body["DestinationId"] = dir_id
+        ret_val, response = self._make_rest_call_helper(action_result, endpoint, data=json.dumps(body), method="post")
+        if phantom.is_fail(ret_val) and self._is_stale_folder_id(action_result, email_addr, folder):
+            # The cached folder ID no longer exists, retry with the freshly resolved one
+            ret_val, body["DestinationId"] = self._resolve_folder_id(action_result, folder, email_addr)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
 
-            else:
-                self.save_progress(error)
-                return action_result.set_status(phantom.APP_ERROR, error)
+            ret_val, response = self._make_rest_call_helper(action_result, endpoint, data=json.dumps(body), method="post")
 
-        ret_val, response = self._make_rest_call_helper(action_result, endpoint, data=json.dumps(body), method="post")
         if phantom.is_fail(ret_val):
             return action_result.get_status()
 
         action_result.add_data(response)
+        self._update_folder_cache_summary(action_result)
 
         return action_result.set_status(phantom.APP_SUCCESS, "Successfully moved email")
 
@@ -1553,6 +2181,183 @@ class Office365Connector(BaseConnector):
 
         return action_result.set_status(phantom.APP_SUCCESS, "Successfully deleted email")
 
+    def _get_bulk_requests(self, email_addr, message_ids, operation, folder_id):
+        """
+        This function creates the batch requests performing the operation on the messages of the mailbox.
+
+        :param email_addr: Email address of the mailbox
+        :param message_ids: List of the message IDs
+        :param operation: Operation to perform, one of 'move', 'copy' or 'delete'
+        :param folder_id: ID of the destination folder of the move and copy operations
+        :return: list of batch requests, the position of the message ID is used as the request ID
+        """
+        requests_list = list()
+        for index, message_id in enumerate(message_ids):
+            url = "/users/{0}/messages/{1}".format(email_addr, message_id)
+            if operation == "delete":
+                requests_list.append({"id": str(index), "method": "DELETE", "url": url})
+                continue
+
+            requests_list.append(
+                {
+                    "id": str(index),
+                    "method": "POST",
+                    "url": "{0}/{1}".format(url, operation),
+                    "body": {"DestinationId": folder_id},
+                    "headers": {"Content-Type": "application/json"},
+                }
+            )
+
+        return requests_list
+
+    def _remediate_mailbox(self, action_result, email_addr, message_ids, operation, folder_id):
+        """
+        This function performs the operation on the messages of a single mailbox. It runs in a worker thread.
+
+        :param action_result: Object of ActionResult class
+        :param email_addr: Email address of the mailbox
+        :param message_ids: List of the message IDs
+        :param operation: Operation to perform, one of 'move', 'copy' or 'delete'
+        :param folder_id: ID of the destination folder of the move and copy operations
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, dictionary of batch responses keyed by the request ID
+        """
+        ret_val, responses = self._make_batch_request(action_result, self._get_bulk_requests(email_addr, message_ids, operation, folder_id))
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
+
+        return RetVal(phantom.APP_SUCCESS, responses)
+
+    def _resolve_mailbox_folder_ids(self, mailboxes, folder, mailbox_results):
+        """
+        This function resolves the destination folder of every mailbox. The folders are resolved serially, before the fan-out,
+        as the folder ID cache of the state is not shared with the worker threads.
+
+        :param mailboxes: List of the email addresses of the mailboxes
+        :param folder: Destination folder path
+        :param mailbox_results: Dictionary of the (action result, RetVal) tuples keyed by the mailbox, the failures are added to it
+        :return: dictionary of the folder IDs keyed by the mailbox, set of the mailboxes whose folder ID was served from the cache
+        """
+        folder_ids = dict()
+        cached_mailboxes = set()
+        for mailbox in mailboxes:
+            mailbox_action_result = ActionResult()
+            ret_val, folder_id = self._resolve_folder_id(mailbox_action_result, folder, mailbox)
+            if phantom.is_fail(ret_val):
+                mailbox_results[mailbox] = (mailbox_action_result, RetVal(ret_val, None))
+                continue
+            folder_ids[mailbox] = folder_id
+            if self._folder_id_from_cache:
+                cached_mailboxes.add(mailbox)
+
+        return folder_ids, cached_mailboxes
+
+    def _remediate_mailboxes(self, mailbox_messages, operation, folder_ids, mailbox_results):
+        """
+        This function performs the operation on the messages of the mailboxes concurrently.
+
+        :param mailbox_messages: Dictionary of the lists of the message IDs keyed by the mailbox
+        :param operation: Operation to perform, one of 'move', 'copy' or 'delete'
+        :param folder_ids: Dictionary of the destination folder IDs keyed by the mailbox, the mailboxes to remediate
+        :param mailbox_results: Dictionary of the (action result, RetVal) tuples keyed by the mailbox, the results are added to it
+        """
+        mailboxes = list(folder_ids)
+        results = self._run_concurrently(
+            lambda worker_action_result, mailbox: self._remediate_mailbox(
+                worker_action_result, mailbox, mailbox_messages[mailbox], operation, folder_ids[mailbox]
+            ),
+            mailboxes,
+        )
+        mailbox_results.update(zip(mailboxes, results))
+
+    def _handle_bulk_remediate_email(self, param):
+
+        self.save_progress("In action handler for: {0}".format(self.get_action_identifier()))
+        action_result = self.add_action_result(ActionResult(dict(param)))
+
+        operation = param.get("operation", "move").lower()
+        if operation not in MSGOFFICE365_BULK_OPERATIONS:
+            return action_result.set_status(
+                phantom.APP_ERROR, MSGOFFICE365_BULK_INVALID_OPERATION.format(values=", ".join(MSGOFFICE365_BULK_OPERATIONS))
+            )
+
+        folder = param.get("folder")
+        if operation != "delete" and not folder:
+            return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_BULK_FOLDER_REQUIRED.format(operation=operation))
+
+        try:
+            messages = json.loads(param["messages"])
+            if (
+                not messages
+                or not isinstance(messages, list)
+                or not all(isinstance(message, dict) and message.get("email_address") and message.get("id") for message in messages)
+            ):
+                return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_BULK_INVALID_MESSAGES)
+        except Exception as e:
+            error_msg = _get_error_msg_from_exception(e, self)
+            return action_result.set_status(phantom.APP_ERROR, "{0}. {1}".format(MSGOFFICE365_BULK_INVALID_MESSAGES, error_msg))
+
+        # Group the messages by mailbox, so that the destination folder is resolved once per mailbox
+        mailbox_messages = dict()
+        for message in messages:
+            mailbox_messages.setdefault(message["email_address"].lower(), []).append(message["id"])
+
+        mailboxes = list(mailbox_messages)
+        self.save_progress("Performing the {0} operation on {1} email(s) of {2} mailbox(es)".format(operation, len(messages), len(mailboxes)))
+
+        mailbox_results = dict()
+        folder_ids = dict.fromkeys(mailboxes, folder)
+        cached_mailboxes = set()
+        if operation != "delete" and param.get("get_folder_id", True):
+            folder_ids, cached_mailboxes = self._resolve_mailbox_folder_ids(mailboxes, folder, mailbox_results)
+
+        self._remediate_mailboxes(mailbox_messages, operation, folder_ids, mailbox_results)
+
+        # Every request failing with 404 indicates that the destination folder ID served from the cache no longer exists
+        stale_mailboxes = [
+            mailbox
+            for mailbox in cached_mailboxes
+            if phantom.is_success(mailbox_results[mailbox][1][0])
+            and all(response.get("status") == 404 for response in mailbox_results[mailbox][1][1].values())
+        ]
+        if stale_mailboxes:
+            for mailbox in stale_mailboxes:
+                self._invalidate_folder_cache(mailbox, self._get_folder_path(folder))
+            folder_ids, _ = self._resolve_mailbox_folder_ids(stale_mailboxes, folder, mailbox_results)
+            self._remediate_mailboxes(mailbox_messages, operation, folder_ids, mailbox_results)
+
+        mailbox_positions = dict()
+        failed_items = 0
+        for message in messages:
+            mailbox = message["email_address"].lower()
+            worker_action_result, (ret_val, responses) = mailbox_results[mailbox]
+
+            # The position of the message within its mailbox is the ID of its batch request
+            position = mailbox_positions.get(mailbox, 0)
+            mailbox_positions[mailbox] = position + 1
+
+            item = {"email_address": message["email_address"], "id": message["id"], "operation": operation}
+            response = (responses or {}).get(str(position)) or {}
+            if phantom.is_fail(ret_val) or not 200 <= response.get("status", 0) < 300:
+                failed_items += 1
+                error = (response.get("body") or {}).get("error") or {}
+                item.update({"status": "failed", "message": error.get("message") or worker_action_result.get_message()})
+            else:
+                item.update({"status": "success", "new_id": (response.get("body") or {}).get("id")})
+            action_result.add_data(item)
+
+        action_result.update_summary(
+            {"total_emails": len(messages), "successful_emails": len(messages) - failed_items, "failed_emails": failed_items}
+        )
+        self._update_folder_cache_summary(action_result)
+
+        if failed_items == len(messages):
+            return action_result.set_status(phantom.APP_ERROR, "Failed to {0} all the emails".format(operation))
+
+        return action_result.set_status(
+            phantom.APP_SUCCESS,
+            "Successfully performed the {0} operation on {1} of {2} email(s)".format(operation, len(messages) - failed_items, len(messages)),
+        )
+
     def _handle_delete_event(self, param):
 
         self.save_progress("In action handler for: {0}".format(self.get_action_identifier()))
@@ -1657,6 +2462,105 @@ class Office365Connector(BaseConnector):
             "Successfully retrieved {} event{}".format(num_events, "" if num_events == 1 else "s"),
         )
 
+    def _sync_directory(self, action_result, directory_cache, kind):
+        """
+        This function pulls the changes of the users or groups since the last sync into the directory snapshot.
+        The first sync, or a sync whose delta link has expired, fetches the whole directory.
+
+        :param action_result: Object of ActionResult class
+        :param directory_cache: Object of DirectoryCache class
+        :param kind: Kind of the directory objects, 'users' or 'groups'
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS
+        """
+        delta_link, _ = directory_cache.get_sync_state(kind)
+        if not delta_link:
+            directory_cache.clear(kind)
+
+        self.save_progress("Synchronizing the {0} of the directory snapshot".format(kind))
+        next_link = delta_link
+        while True:
+            ret_val, response = self._make_rest_call_helper(action_result, "/{0}/delta".format(kind), nextLink=next_link)
+            if phantom.is_fail(ret_val):
+                if delta_link and "Status Code: 410" in (action_result.get_message() or ""):
+                    # The delta link has expired, the snapshot has to be rebuilt
+                    directory_cache.clear(kind)
+                    return self._sync_directory(action_result, directory_cache, kind)
+                return action_result.get_status()
+
+            # The sync state is only stored along with the last page, an interrupted sync starts over from the previous delta link
+            directory_cache.apply_changes(kind, response.get("value", []), response.get("@odata.deltaLink"))
+
+            next_link = response.get("@odata.nextLink")
+            if not next_link:
+                break
+
+        return phantom.APP_SUCCESS
+
+    def _get_directory_cache(self, action_result, kind):
+        """
+        This function opens the directory snapshot, synchronizing the users or groups if they are older than the configured TTL.
+
+        :param action_result: Object of ActionResult class
+        :param kind: Kind of the directory objects, 'users' or 'groups'
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, object of DirectoryCache class (None if the snapshot is disabled)
+        """
+        if not self._directory_cache_ttl:
+            return RetVal(phantom.APP_SUCCESS, None)
+
+        try:
+            db_path = os.path.join(self.get_state_dir(), MSGOFFICE365_DIRECTORY_CACHE_FILE.format(asset_id=self._asset_id))
+            directory_cache = DirectoryCache(db_path)
+        except Exception as e:
+            error_msg = _get_error_msg_from_exception(e, self)
+            self.debug_print("Unable to open the directory snapshot, querying the server instead. {0}".format(error_msg))
+            return RetVal(phantom.APP_SUCCESS, None)
+
+        if not directory_cache.is_fresh(kind, self._directory_cache_ttl):
+            ret_val = self._sync_directory(action_result, directory_cache, kind)
+            if phantom.is_fail(ret_val):
+                directory_cache.close()
+                return RetVal(action_result.get_status(), None)
+
+        return RetVal(phantom.APP_SUCCESS, directory_cache)
+
+    def _list_directory_objects(self, action_result, kind, limit, query):
+        """
+        This function lists the users or groups, from the directory snapshot if enabled and no filter is provided.
+
+        :param action_result: Object of ActionResult class
+        :param kind: Kind of the directory objects, 'users' or 'groups'
+        :param limit: Maximum number of objects to return
+        :param query: OData filter of the objects, it is always evaluated by the server
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, list of objects
+        """
+        if query:
+            return self._paginator(action_result, "/{0}".format(kind), limit, query=query)
+
+        ret_val, directory_cache = self._get_directory_cache(action_result, kind)
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
+
+        if not directory_cache:
+            return self._paginator(action_result, "/{0}".format(kind), limit)
+
+        try:
+            return RetVal(phantom.APP_SUCCESS, directory_cache.list(kind, limit))
+        finally:
+            directory_cache.close()
+
+    def _find_groups_by_mail(self, action_result, mail, limit):
+        ret_val, directory_cache = self._get_directory_cache(action_result, "groups")
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
+
+        if not directory_cache:
+            return self._paginator(action_result, "/groups", limit, query="mail eq '{0}'".format(mail))
+
+        try:
+            return RetVal(phantom.APP_SUCCESS, directory_cache.find_by_mail("groups", mail, limit))
+        finally:
+            directory_cache.close()
+
     def _handle_list_groups(self, param):
 
         self.save_progress("In action handler for: {0}".format(self.get_action_identifier()))
@@ -1671,9 +2575,7 @@ class Office365Connector(BaseConnector):
 
         query = param.get("filter") if param.get("filter") else None
 
-        endpoint = "/groups"
-
-        ret_val, groups = self._paginator(action_result, endpoint, limit, query=query)
+        ret_val, groups = self._list_directory_objects(action_result, "groups", limit, query)
 
         if phantom.is_fail(ret_val):
             return action_result.get_status()
@@ -1719,8 +2621,7 @@ class Office365Connector(BaseConnector):
             if not util.is_email(identificator):
                 return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_INVALID_EMAIL)
 
-            name_filtering = "mail eq '{0}'".format(identificator)
-            ret_val, group = self._paginator(action_result, "/groups", limit, query=name_filtering)
+            ret_val, group = self._find_groups_by_mail(action_result, identificator, limit)
 
             if phantom.is_fail(ret_val):
                 return action_result.get_status()
@@ -1769,9 +2670,7 @@ class Office365Connector(BaseConnector):
 
         query = param.get("filter") if param.get("filter") else None
 
-        endpoint = "/users"
-
-        ret_val, users = self._paginator(action_result, endpoint, limit, query=query)
+        ret_val, users = self._list_directory_objects(action_result, "users", limit, query)
 
         if phantom.is_fail(ret_val):
             return action_result.get_status()
@@ -1868,37 +2767,35 @@ class Office365Connector(BaseConnector):
         list_folder = list()
         user_id = param["user_id"]
         folder_id = param.get("folder_id")
+        expand_child_folders = param.get("expand_child_folders", False)
+        child_folders_map = dict()
 
         if not folder_id:
             # fetching root level folders
-            ret_val, root_folders = self._fetch_root_folders(action_result, user_id)
+            ret_val, root_folders = self._fetch_root_folders(action_result, user_id, expand_child_folders)
 
             if phantom.is_fail(ret_val):
                 return action_result.get_status()
 
             # adding root folders to main list of folders
-            list_folder.extend(root_folders)
+            list_folder.extend(root_folders or [])
 
-            # checking for child folder if have, add it in list of folders
-            for root_folder in root_folders:
+            # crawling the child folders of the root folders which have any
+            folder_ids = self._get_unfetched_folder_ids(root_folders or [], child_folders_map)
+        else:
+            folder_ids = [folder_id]
 
-                if root_folder.get("childFolderCount", 0) == 0:
-                    continue
-                else:
-                    ret_val = self._list_child_folders(
-                        action_result,
-                        list_folder,
-                        user_id=user_id,
-                        parent_folder=root_folder,
-                    )
+        ret_val = self._crawl_folder_tree(action_result, user_id, folder_ids, child_folders_map, expand_child_folders)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
 
-                    if phantom.is_fail(ret_val):
-                        return action_result.get_status()
+        # The child folders are listed depth-first, after the root folders
+        if not folder_id:
+            for root_folder in root_folders or []:
+                if root_folder.get("childFolderCount", 0):
+                    self._list_child_folders(list_folder, child_folders_map, root_folder["id"])
         else:
-            ret_val = self._list_child_folders(action_result, list_folder, user_id=user_id, folder_id=folder_id)
-
-            if phantom.is_fail(ret_val):
-                return action_result.get_status()
+            self._list_child_folders(list_folder, child_folders_map, folder_id)
 
         for folder in list_folder:
             action_result.add_data(folder)
@@ -1911,11 +2808,12 @@ class Office365Connector(BaseConnector):
             "Successfully retrieved {} mail folder{}".format(num_folders, "" if num_folders == 1 else "s"),
         )
 
-    def _fetch_root_folders(self, action_result, user_id):
+    def _fetch_root_folders(self, action_result, user_id, expand_child_folders=False):
 
         endpoint = "/users/{user_id}/mailFolders".format(user_id=user_id)
+        params = {"$expand": "childFolders"} if expand_child_folders else None
 
-        ret_val, folders = self._paginator(action_result, endpoint)
+        ret_val, folders = self._paginator(action_result, endpoint, params=params)
 
         if phantom.is_fail(ret_val):
             return action_result.get_status(), None
@@ -1928,42 +2826,79 @@ class Office365Connector(BaseConnector):
 
         return phantom.APP_SUCCESS, folders
 
-    def _list_child_folders(self, action_result, list_folder, user_id, parent_folder=None, folder_id=None):
-
-        # fetching root level folders
-        if not folder_id:
-            ret_val, child_folders = self._fetch_child_folders(action_result, user_id, parent_folder["id"])
-        else:
-            ret_val, child_folders = self._fetch_child_folders(action_result, user_id, folder_id)
+    def _get_unfetched_folder_ids(self, folders, child_folders_map):
+        """
+        This function returns the IDs of the folders whose child folders still need to be fetched. The child folders
+        expanded along with a folder are added to the map of child folders instead.
 
-        if phantom.is_fail(ret_val):
-            return action_result.get_status()
+        :param folders: List of folders
+        :param child_folders_map: Dictionary of the child folders keyed by the parent folder ID
+        :return: list of folder IDs
+        """
+        folder_ids = list()
 
-        # checking for child folder if have, add it in list of folders
-        for child_folder in child_folders:
+        for folder in folders:
+            expanded_child_folders = folder.pop("childFolders", None)
+            if not folder.get("childFolderCount", 0):
+                continue
 
-            if child_folder.get("childFolderCount", 0) == 0:
-                list_folder.append(child_folder)
+            # The expanded child folders are not paginated, fetch them separately if the expansion is truncated
+            if expanded_child_folders is not None and len(expanded_child_folders) >= folder["childFolderCount"]:
+                child_folders_map[folder["id"]] = expanded_child_folders
+                folder_ids.extend(self._get_unfetched_folder_ids(expanded_child_folders, child_folders_map))
             else:
-                ret_val = self._list_child_folders(
-                    action_result,
-                    list_folder,
-                    user_id=user_id,
-                    parent_folder=child_folder,
-                )
+                folder_ids.append(folder["id"])
+
+        return folder_ids
+
+    def _crawl_folder_tree(self, action_result, user_id, folder_ids, child_folders_map, expand_child_folders=False):
+        """
+        This function crawls the folder tree breadth-first below the given folders.
+        The child folders of all the folders of a level are fetched concurrently.
 
+        :param action_result: Object of ActionResult class
+        :param user_id: User ID/Principal name
+        :param folder_ids: IDs of the folders to crawl
+        :param child_folders_map: Dictionary of the child folders keyed by the parent folder ID, updated with the crawled folders
+        :param expand_child_folders: Whether to expand the child folders of every fetched folder to save a level of requests
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS
+        """
+        while folder_ids:
+            results = self._run_concurrently(
+                lambda worker_action_result, folder_id: self._fetch_child_folders(
+                    worker_action_result, user_id, folder_id, expand_child_folders
+                ),
+                folder_ids,
+            )
+
+            next_folder_ids = list()
+            for folder_id, (worker_action_result, (ret_val, child_folders)) in zip(folder_ids, results):
                 if phantom.is_fail(ret_val):
-                    return action_result.get_status()
+                    return action_result.set_status(phantom.APP_ERROR, worker_action_result.get_message())
 
-                list_folder.append(child_folder)
+                child_folders_map[folder_id] = child_folders
+                next_folder_ids.extend(self._get_unfetched_folder_ids(child_folders, child_folders_map))
+
+            folder_ids = next_folder_ids
 
         return phantom.APP_SUCCESS
 
-    def _fetch_child_folders(self, action_result, user_id, folder_id):
+    def _list_child_folders(self, list_folder, child_folders_map, folder_id):
+
+        # checking for child folder if have, add it in list of folders after its own child folders
+        for child_folder in child_folders_map.get(folder_id, []):
+
+            if child_folder.get("childFolderCount", 0):
+                self._list_child_folders(list_folder, child_folders_map, child_folder["id"])
+
+            list_folder.append(child_folder)
+
+    def _fetch_child_folders(self, action_result, user_id, folder_id, expand_child_folders=False):
 
         endpoint = "/users/{user_id}/mailFolders/{folder_id}/childFolders".format(user_id=user_id, folder_id=folder_id)
+        params = {"$expand": "childFolders"} if expand_child_folders else None
 
-        ret_val, folders = self._paginator(action_result, endpoint)
+        ret_val, folders = self._paginator(action_result, endpoint, params=params)
 
         if phantom.is_fail(ret_val):
             return action_result.get_status(), None
@@ -2084,6 +3019,119 @@ class Office365Connector(BaseConnector):
         limit = expected_duplicate_count_in_next_cycle + remaining_count
         return limit, total_ingested
 
+    def _get_emails_to_ingest(self, action_result, email_address, emails, headers=None):
+        """
+        This function filters the metadata-only emails of the two-phase fetch down to the new or modified ones
+        and fetches the full content of those emails in batches.
+
+        :param action_result: Action result or BaseConnector object
+        :param email_address: Email address of the mailbox being ingested
+        :param emails: Emails containing only the metadata fields
+        :param headers: Additional request headers to fetch the full content of the emails with
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, list of emails with full content, count of emails failed to fetch
+        """
+        last_time = self._state.get("last_time")
+        ingested_email_ids = self._state.get("last_time_email_ids", {})
+
+        pending_emails = []
+        for email in emails:
+            # Emails sitting exactly on the last checkpoint are returned again by the 'ge' filter,
+            # skip them here if they have not changed since they were ingested
+            if email["lastModifiedDateTime"] == last_time and ingested_email_ids.get(email["id"]) == email.get("changeKey"):
+                self._duplicate_count += 1
+                continue
+            pending_emails.append(email)
+
+        if not pending_emails:
+            return phantom.APP_SUCCESS, [], 0
+
+        self.save_progress("Fetching full content of {} new or modified email(s)".format(len(pending_emails)))
+
+        select = ",".join(MSGOFFICE365_PROJECTION_PROFILES[self._projection_profile])
+        batch_requests = [
+            {"id": str(index), "method": "GET", "url": "/users/{0}/messages/{1}?$select={2}".format(email_address, email["id"], select)}
+            for index, email in enumerate(pending_emails)
+        ]
+        if headers:
+            for batch_request in batch_requests:
+                batch_request["headers"] = headers
+
+        ret_val, responses = self._make_batch_request(action_result, batch_requests)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status(), None, 0
+
+        full_emails = []
+        failed_count = 0
+        for index, email in enumerate(pending_emails):
+            response = responses.get(str(index), {})
+            if 200 <= response.get("status", 0) < 300 and response.get("body"):
+                full_emails.append(response["body"])
+                continue
+
+            # The individual request of a batch can fail (e.g. throttled), fall back to a regular request for it
+            self.debug_print("Batch request failed for email ID: {}. Status: {}".format(email["id"], response.get("status")))
+            endpoint = "/users/{0}/messages/{1}".format(email_address, email["id"])
+            ret_val, full_email = self._make_rest_call_helper(action_result, endpoint, params={"$select": select}, headers=dict(headers or {}))
+            if phantom.is_fail(ret_val):
+                failed_count += 1
+                self.debug_print("Error occurred while fetching email ID: {}. {}".format(email["id"], action_result.get_message()))
+                continue
+            full_emails.append(full_email)
+
+        return phantom.APP_SUCCESS, full_emails, failed_count
+
+    def _update_last_time_email_ids(self, emails, last_time):
+        """
+        This function remembers the emails sitting on the new checkpoint, as they will be returned again by the next cycle.
+
+        :param emails: Processed emails
+        :param last_time: New checkpoint (last modified time) to be stored in the state file
+        """
+        last_time_email_ids = dict()
+        if self._state.get("last_time") == last_time:
+            last_time_email_ids = self._state.get("last_time_email_ids", {})
+
+        for email in emails:
+            if email["lastModifiedDateTime"] == last_time:
+                last_time_email_ids[email["id"]] = email.get("changeKey")
+
+        self._state["last_time_email_ids"] = last_time_email_ids
+
+    def _get_body_content_type_headers(self, config):
+        """
+        This function returns the request headers to fetch the emails with. The text rendition of the body is preferred
+        when it is enabled in the asset, unless the HTML body is required for the URL and domain extraction.
+
+        :param config: Asset configuration
+        :return: dictionary of request headers
+        """
+        if not self._prefer_text_body or config.get("extract_urls") or config.get("extract_domains"):
+            return {}
+
+        return dict(MSGOFFICE365_PREFER_TEXT_BODY_HEADER)
+
+    def _get_ingestion_endpoint(self, action_result, config):
+        """
+        This function returns the endpoint of the messages of the folder to ingest from.
+
+        :param action_result: Object of ActionResult class
+        :param config: Asset configuration
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, messages endpoint
+        """
+        endpoint = "/users/{0}".format(config.get("email_address"))
+
+        if "folder" in config:
+            folder = config.get("folder", "")
+            if config.get("get_folder_id", True):
+                ret_val, folder = self._resolve_folder_id(action_result, folder, config.get("email_address"))
+                if phantom.is_fail(ret_val):
+                    return RetVal(action_result.get_status(), None)
+            endpoint += "/mailFolders/{0}".format(folder)
+
+        endpoint += "/messages"
+
+        return RetVal(phantom.APP_SUCCESS, endpoint)
+
     def _handle_on_poll(self, param):
 
         self.save_progress("In action handler for: {0}".format(self.get_action_identifier()))
@@ -2121,34 +3169,26 @@ class Office365Connector(BaseConnector):
         elif not config.get("folder"):
             return action_result.set_status(phantom.APP_ERROR, "Folder to ingest from must be supplied in asset!")
 
-        endpoint = "/users/{0}".format(config.get("email_address"))
-
-        if "folder" in config:
-            folder = config.get("folder", "")
-            if config.get("get_folder_id", True):
-                try:
-                    dir_id, error, _ = self._get_folder_id(action_result, folder, config.get("email_address"))
-                except ReturnException as e:
-                    self._dump_error_log(e)
-
-                    return action_result.get_status()
-                if dir_id:
-                    folder = dir_id
-                else:
-                    self.save_progress(error)
-                    return action_result.set_status(phantom.APP_ERROR, error)
-            endpoint += "/mailFolders/{0}".format(folder)
+        ret_val, endpoint = self._get_ingestion_endpoint(action_result, config)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
 
-        endpoint += "/messages"
         order = "asc" if ingest_manner == "oldest first" else "desc"
 
         params = {"$orderBy": "lastModifiedDateTime {}".format(order)}
 
-        params["$select"] = ",".join(MSGOFFICE365_SELECT_PARAMETER_LIST)
+        # With the two-phase fetch, only the metadata of the emails is paged through first
+        # and the full content is fetched later for the new or modified emails only
+        two_phase_fetch = config.get("two_phase_fetch", False)
+        params["$select"] = ",".join(
+            MSGOFFICE365_METADATA_SELECT_PARAMETER_LIST if two_phase_fetch else MSGOFFICE365_PROJECTION_PROFILES[self._projection_profile]
+        )
 
         if start_time:
             params["$filter"] = "lastModifiedDateTime ge {0}".format(start_time)
 
+        headers = self._get_body_content_type_headers(config)
+
         cur_limit = max_emails
         total_ingested = 0
 
@@ -2159,7 +3199,13 @@ class Office365Connector(BaseConnector):
 
         while True:
             self._duplicate_count = 0
-            ret_val, emails = self._paginator(action_result, endpoint, limit=cur_limit, params=params)
+            ret_val, emails = self._paginator(action_result, endpoint, limit=cur_limit, params=params, headers=headers)
+            if phantom.is_fail(ret_val) and self._is_stale_folder_id(action_result, config.get("email_address"), config.get("folder")):
+                # The cached folder ID no longer exists, retry with the freshly resolved one
+                ret_val, endpoint = self._get_ingestion_endpoint(action_result, config)
+                if phantom.is_success(ret_val):
+                    ret_val, emails = self._paginator(action_result, endpoint, limit=cur_limit, params=params, headers=headers)
+
             if phantom.is_fail(ret_val):
                 return action_result.get_status()
 
@@ -2173,7 +3219,17 @@ class Office365Connector(BaseConnector):
             if self.is_poll_now():
                 self.save_progress("Ingesting all possible artifacts (ignoring maximum artifacts value) for POLL NOW")
 
-            for index, email in enumerate(emails):
+            emails_to_process = emails
+            attempted_emails = total_emails
+            if two_phase_fetch:
+                ret_val, emails_to_process, failed_email_ids = self._get_emails_to_ingest(
+                    action_result, config.get("email_address"), emails, headers=headers
+                )
+                if phantom.is_fail(ret_val):
+                    return action_result.get_status()
+                attempted_emails = len(emails_to_process) + failed_email_ids
+
+            for index, email in enumerate(emails_to_process):
                 try:
                     self.send_progress("Processing email # {} with ID ending in: {}".format(index + 1, email["id"][-10:]))
                     ret_val = self._process_email_data(config, action_result, endpoint, email)
@@ -2186,7 +3242,10 @@ class Office365Connector(BaseConnector):
                     error_msg = _get_error_msg_from_exception(e, self)
                     self.debug_print(f"Exception occurred while processing email ID: {email.get('id')}. {error_msg}")
 
-            if failed_email_ids == total_emails:
+            action_result.update_summary({"projection_profile": self._projection_profile, "payload_bytes": self._payload_bytes})
+            self._update_folder_cache_summary(action_result)
+
+            if attempted_emails and failed_email_ids == attempted_emails:
                 return action_result.set_status(
                     phantom.APP_ERROR,
                     "Error occurred while processing all the email IDs",
@@ -2194,8 +3253,11 @@ class Office365Connector(BaseConnector):
 
             if not self.is_poll_now():
                 last_time = datetime.strptime(emails[email_index]["lastModifiedDateTime"], O365_TIME_FORMAT).strftime(O365_TIME_FORMAT)
+
+                # Remember the emails sitting on the new checkpoint for the two-phase fetch of the next cycle
+                self._update_last_time_email_ids(emails, last_time)
                 self._state["last_time"] = last_time
-                self.save_state(deepcopy(self._state))
+                self._checkpoint_state()
 
                 # Setting filter for next cycle
                 params["$filter"] = "lastModifiedDateTime ge {0}".format(last_time)
@@ -2272,29 +3334,7 @@ class Office365Connector(BaseConnector):
         # user
         email_addr = param["email_address"]
         endpoint = "/users/{0}".format(email_addr)
-        query = ""
-        params = dict()
-
-        if "internet_message_id" in param:
-            params = {"$filter": "internetMessageId eq '{0}'".format(param["internet_message_id"])}
-
-        elif "query" in param:
-            query = "?{0}".format(param["query"])
-
-        else:
-            # search params
-            search_query = ""
-            if "subject" in param:
-                search_query += "subject:{0} ".format(param["subject"])
-
-            if "body" in param:
-                search_query += "body:{0} ".format(param["body"])
-
-            if "sender" in param:
-                search_query += "from:{0} ".format(param["sender"])
-
-            if search_query:
-                params["$search"] = '"{0}"'.format(search_query[:-1])
+        query, params = self._get_search_params(param)
 
         folder_ids = []
         # searches through well known folders
@@ -2312,24 +3352,19 @@ class Office365Connector(BaseConnector):
             folder = param["folder"]
 
             if param.get("get_folder_id", True):
-                try:
-                    dir_id, error, _ = self._get_folder_id(action_result, folder, email_addr)
-                except ReturnException as e:
-                    self._dump_error_log(e)
-
+                ret_val, folder = self._resolve_folder_id(action_result, folder, email_addr)
+                if phantom.is_fail(ret_val):
                     return action_result.get_status()
-                if dir_id:
-                    folder = dir_id
-                else:
-                    self.save_progress(error)
-                    return action_result.set_status(phantom.APP_ERROR, error)
             folder_ids.append(folder)
             endpoint += "/mailFolders/{folder_id}"
 
         # that should be enough to create the endpoint
         endpoint += "/messages"
 
-        if folder_ids:
+        if param.get("search_well_known_folders", False):
+            ret_val, messages = self._search_folders(action_result, endpoint, query, folder_ids, limit, params)
+
+        elif folder_ids:
             messages = []
             ret_val = False
             for folder_id in folder_ids:
@@ -2340,6 +3375,14 @@ class Office365Connector(BaseConnector):
                     params=params,
                 )
 
+                if phantom.is_fail(folder_ret_val) and self._is_stale_folder_id(action_result, email_addr, param.get("folder")):
+                    # The cached folder ID no longer exists, retry with the freshly resolved one
+                    folder_ret_val, folder_id = self._resolve_folder_id(action_result, param["folder"], email_addr)
+                    if phantom.is_success(folder_ret_val):
+                        folder_ret_val, folder_messages = self._paginator(
+                            action_result, endpoint.format(folder_id=folder_id) + query, limit, params=params
+                        )
+
                 if phantom.is_fail(folder_ret_val):
                     continue
 
@@ -2362,10 +3405,241 @@ class Office365Connector(BaseConnector):
 
         action_result.update_data(messages)
         action_result.update_summary({"emails_matched": action_result.get_data_size()})
+        self._update_folder_cache_summary(action_result)
 
         return action_result.set_status(phantom.APP_SUCCESS)
 
-    def _get_folder_id(self, action_result, folder, email):
+    def _get_search_params(self, param):
+        """
+        This function builds the message search from the action parameters.
+
+        :param param: Dictionary of input parameters
+        :return: query string to append to the messages endpoint, dictionary of the search parameters
+        """
+        query = ""
+        params = dict()
+
+        if "internet_message_id" in param:
+            params = {"$filter": "internetMessageId eq '{0}'".format(param["internet_message_id"])}
+
+        elif "query" in param:
+            query = "?{0}".format(param["query"])
+
+        else:
+            # search params
+            search_query = ""
+            if "subject" in param:
+                search_query += "subject:{0} ".format(param["subject"])
+
+            if "body" in param:
+                search_query += "body:{0} ".format(param["body"])
+
+            if "sender" in param:
+                search_query += "from:{0} ".format(param["sender"])
+
+            if search_query:
+                params["$search"] = '"{0}"'.format(search_query[:-1])
+
+        return query, params
+
+    def _search_folders(self, action_result, endpoint, query, folder_ids, limit, params):
+        """
+        This function searches the messages of the folders concurrently. The 'limit' most recent messages of every folder are fetched,
+        and they are merged by their received time, newest first, so that the 'limit' most recent messages of all the folders are returned.
+
+        :param action_result: Object of ActionResult class
+        :param endpoint: Messages endpoint containing the '{folder_id}' placeholder
+        :param query: Query string to append to the endpoint
+        :param folder_ids: IDs or well-known names of the folders to search
+        :param limit: Maximum number of messages to return
+        :param params: Dictionary of the search parameters
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, list of messages
+        """
+        results = self._run_concurrently(
+            lambda worker_action_result, folder_id: self._paginator(
+                worker_action_result, endpoint.format(folder_id=folder_id) + query, limit, params=dict(params)
+            ),
+            folder_ids,
+        )
+
+        folder_messages_list = list()
+        error_message = None
+        for folder_id, (worker_action_result, (ret_val, folder_messages)) in zip(folder_ids, results):
+            if phantom.is_fail(ret_val):
+                error_message = worker_action_result.get_message()
+                self.debug_print("Error occurred while searching the folder: {}. {}".format(folder_id, error_message))
+                continue
+
+            # The results of every folder are sorted locally, so that they can be merged in a single pass
+            folder_messages_list.append(sorted(folder_messages, key=lambda message: message.get("receivedDateTime") or "", reverse=True))
+
+        if not folder_messages_list:
+            return RetVal(action_result.set_status(phantom.APP_ERROR, error_message), None)
+
+        messages = heapq.merge(*folder_messages_list, key=lambda message: message.get("receivedDateTime") or "", reverse=True)
+
+        return RetVal(phantom.APP_SUCCESS, list(islice(messages, limit)))
+
+    def _get_group_mailboxes(self, action_result, group_id):
+        """
+        This function fetches the email addresses of all the users that are direct or nested members of the group.
+
+        :param action_result: Object of ActionResult class
+        :param group_id: ID of the group
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, list of email addresses
+        """
+        endpoint = "/groups/{0}/transitiveMembers/microsoft.graph.user".format(group_id)
+
+        ret_val, members = self._paginator(action_result, endpoint, params={"$select": "mail"})
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
+
+        return RetVal(phantom.APP_SUCCESS, [member["mail"] for member in members if member.get("mail")])
+
+    def _get_hunt_key(self, mailboxes, query, params):
+        hunt = json.dumps([mailboxes, query, params], sort_keys=True)
+        return hashlib.sha256(hunt.encode("utf-8")).hexdigest()
+
+    def _get_hunt_checkpoints(self):
+        """
+        This function returns the checkpoints of the interrupted hunts, without the ones older than MSGOFFICE365_HUNT_CHECKPOINT_TTL.
+
+        :return: dictionary of the checkpoints keyed by the hunt key
+        """
+        now = time.time()
+        checkpoints = self._state.setdefault(MSGOFFICE365_HUNT_CHECKPOINTS, {})
+        for hunt_key in [key for key, checkpoint in checkpoints.items() if now - checkpoint.get("time", 0) > MSGOFFICE365_HUNT_CHECKPOINT_TTL]:
+            checkpoints.pop(hunt_key)
+        return checkpoints
+
+    def _get_checkpoint_messages(self, action_result, matches):
+        """
+        This function fetches again the messages matched in the mailboxes searched by an interrupted run of the hunt.
+
+        :param action_result: Object of ActionResult class
+        :param matches: Dictionary of the lists of the matched message IDs keyed by the mailbox
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, list of messages
+        """
+        mailbox_messages = [(mailbox, message_id) for mailbox, message_ids in matches.items() for message_id in message_ids]
+        if not mailbox_messages:
+            return RetVal(phantom.APP_SUCCESS, [])
+
+        batch_requests = [
+            {"id": str(index), "method": "GET", "url": "/users/{0}/messages/{1}".format(mailbox, message_id)}
+            for index, (mailbox, message_id) in enumerate(mailbox_messages)
+        ]
+        ret_val, responses = self._make_batch_request(action_result, batch_requests)
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
+
+        messages = list()
+        for index, (mailbox, message_id) in enumerate(mailbox_messages):
+            response = responses.get(str(index), {})
+            if response.get("status") != 200:
+                # The message might have been deleted since the interrupted run
+                self.debug_print("Unable to fetch the matched message: {0}. Status Code: {1}".format(message_id, response.get("status")))
+                continue
+            message = response.get("body", {})
+            message["email_address"] = mailbox
+            messages.append(message)
+
+        return RetVal(phantom.APP_SUCCESS, messages)
+
+    def _handle_hunt_email(self, param):
+
+        self.save_progress("In action handler for: {0}".format(self.get_action_identifier()))
+        action_result = self.add_action_result(ActionResult(dict(param)))
+
+        limit = param.get("limit")
+        # Integer validation for 'limit' action parameter
+        ret_val, limit = _validate_integer(action_result, limit, "'limit' action")
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        email_addresses = [email.strip() for email in param.get("email_addresses", "").split(",") if email.strip()]
+        group_id = param.get("group_id")
+        if not email_addresses and not group_id:
+            return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_HUNT_NO_MAILBOXES)
+
+        if not any(param.get(key) for key in ("internet_message_id", "sender", "subject", "body")):
+            return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_HUNT_NO_CRITERIA)
+
+        if group_id:
+            ret_val, group_mailboxes = self._get_group_mailboxes(action_result, group_id)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
+            email_addresses.extend(group_mailboxes)
+
+        # Remove the duplicate mailboxes, keeping the order in which they were provided
+        mailboxes = list(dict.fromkeys(email.lower() for email in email_addresses))
+        query, params = self._get_search_params(param)
+
+        # The checkpoint remembers the mailboxes already searched and the IDs of their matched messages,
+        # so that an interrupted hunt can be resumed with the same results
+        hunt_key = self._get_hunt_key(mailboxes, query, params)
+        checkpoints = self._get_hunt_checkpoints()
+        matches = dict(checkpoints.get(hunt_key, {}).get("matches", {})) if param.get("resume", False) else dict()
+        pending = [mailbox for mailbox in mailboxes if mailbox not in matches]
+
+        ret_val, messages = self._get_checkpoint_messages(action_result, matches)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+        for message in messages:
+            action_result.add_data(message)
+
+        failed_mailboxes = 0
+        error_message = None
+        for index in range(0, len(pending), MSGOFFICE365_HUNT_CHECKPOINT_INTERVAL):
+            chunk = pending[index : index + MSGOFFICE365_HUNT_CHECKPOINT_INTERVAL]
+            results = self._run_concurrently(
+                lambda worker_action_result, mailbox: self._paginator(
+                    worker_action_result, "/users/{0}/messages{1}".format(mailbox, query), limit, params=dict(params)
+                ),
+                chunk,
+            )
+
+            for mailbox, (worker_action_result, (ret_val, messages)) in zip(chunk, results):
+                if phantom.is_fail(ret_val):
+                    failed_mailboxes += 1
+                    error_message = worker_action_result.get_message()
+                    self.debug_print("Error occurred while searching the mailbox: {}. {}".format(mailbox, error_message))
+                    continue
+
+                matches[mailbox] = [message["id"] for message in messages]
+                for message in messages:
+                    message["email_address"] = mailbox
+                    action_result.add_data(message)
+
+            checkpoints[hunt_key] = {"time": time.time(), "matches": matches}
+            self._checkpoint_state()
+            self.save_progress(
+                "Searched {} of {} mailboxes, {} email(s) matched".format(
+                    min(index + MSGOFFICE365_HUNT_CHECKPOINT_INTERVAL, len(pending)), len(pending), action_result.get_data_size()
+                )
+            )
+
+        # Only the hunts with failed mailboxes are left for resuming
+        if not failed_mailboxes:
+            checkpoints.pop(hunt_key, None)
+
+        action_result.update_summary(
+            {
+                "mailboxes_searched": len(pending) - failed_mailboxes,
+                "mailboxes_skipped": len(mailboxes) - len(pending),
+                "mailboxes_failed": failed_mailboxes,
+                "emails_matched": action_result.get_data_size(),
+            }
+        )
+
+        if pending and failed_mailboxes == len(pending):
+            return action_result.set_status(phantom.APP_ERROR, "Error occurred while searching all the mailboxes. {}".format(error_message))
+
+        if not action_result.get_data_size():
+            return action_result.set_status(phantom.APP_SUCCESS, MSGOFFICE365_NO_DATA_FOUND)
+
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _get_folder_path(self, folder):
         # hindsight is always 20-20, set the folder path separator to be '/', thinking folder names allow '\' as a char.
         # turns out even '/' is supported by office365, so let the action escape the '/' char if it's part of the folder name
         folder_path = folder.replace("\\/", self._REPLACE_CONST)
@@ -2374,37 +3648,151 @@ class Office365Connector(BaseConnector):
             folder_names[i] = folder_name.replace(self._REPLACE_CONST, "/").strip()
 
         # remove empty elements
-        path = list(filter(None, folder_names))
+        return list(filter(None, folder_names))
+
+    def _get_folder_cache_key(self, path):
+        # Folder names are case-insensitive, keep the '/' of a folder name escaped to avoid ambiguous keys
+        return "/".join(folder_name.replace("/", "\\/") for folder_name in path).lower()
+
+    def _get_cached_folder_path(self, email, path):
+        """
+        This function resolves the longest possible prefix of the folder path from the folder ID cache.
 
+        :param email: Email address of the mailbox
+        :param path: List of the folder names of the path
+        :return: list of the resolved path entries containing 'path', 'folder' and 'folder_id' keys
+        """
         ret = list()
+        if not self._folder_cache_ttl:
+            return ret
+
+        mailbox_cache = self._state.get(MSGOFFICE365_FOLDER_ID_CACHE, {}).get(email.lower(), {})
+        now = time.time()
+        for i, folder_name in enumerate(path):
+            entry = mailbox_cache.get(self._get_folder_cache_key(path[: i + 1]))
+            if not entry or now - entry["time"] > self._folder_cache_ttl:
+                break
+            ret.append({"path": "/".join(path[: i + 1]), "folder": folder_name, "folder_id": entry["id"]})
+
+        return ret
+
+    def _cache_folder_id(self, email, path, folder_id):
+        """
+        This function stores the folder ID of the folder path in the folder ID cache of the mailbox.
+
+        :param email: Email address of the mailbox
+        :param path: List of the folder names of the path
+        :param folder_id: ID of the folder
+        """
+        if not self._folder_cache_ttl:
+            return
+
+        folder_id_cache = self._state.setdefault(MSGOFFICE365_FOLDER_ID_CACHE, {})
+        now = int(time.time())
+
+        # Drop the expired entries of the mailbox while updating it
+        mailbox_cache = {
+            key: entry for key, entry in folder_id_cache.get(email.lower(), {}).items() if now - entry["time"] <= self._folder_cache_ttl
+        }
+        mailbox_cache[self._get_folder_cache_key(path)] = {"id": folder_id, "time": now}
+        folder_id_cache[email.lower()] = mailbox_cache
+
+    def _invalidate_folder_cache(self, email, path):
+        """
+        This function removes every prefix of the folder path from the folder ID cache of the mailbox.
+
+        :param email: Email address of the mailbox
+        :param path: List of the folder names of the path
+        """
+        mailbox_cache = self._state.get(MSGOFFICE365_FOLDER_ID_CACHE, {}).get(email.lower(), {})
+        for i in range(len(path)):
+            mailbox_cache.pop(self._get_folder_cache_key(path[: i + 1]), None)
+
+    def _is_stale_folder_id(self, action_result, email, folder):
+        """
+        This function checks whether the failed request was made with a folder ID served from the cache, which no longer exists.
+        The cached entries of the folder are removed in that case, so that the folder is resolved again.
+
+        :param action_result: Object of ActionResult class
+        :param email: Email address of the mailbox
+        :param folder: Folder path
+        :return: True if the request should be retried with a freshly resolved folder ID, False otherwise
+        """
+        if not self._folder_id_from_cache or "Status Code: 404" not in (action_result.get_message() or ""):
+            return False
+
+        self.debug_print("The cached ID of the folder '{}' was not found. Resolving the folder ID again".format(folder))
+        self._invalidate_folder_cache(email, self._get_folder_path(folder))
+        self._folder_id_from_cache = False
+
+        return True
+
+    def _update_folder_cache_summary(self, action_result):
+        action_result.update_summary({"folder_cache_hits": self._folder_cache_hits, "folder_cache_misses": self._folder_cache_misses})
+
+    def _resolve_folder_id(self, action_result, folder, email):
+        """
+        This function resolves the folder path to its folder ID.
+
+        :param action_result: Object of ActionResult class
+        :param folder: Folder path
+        :param email: Email address of the mailbox
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, folder ID
+        """
         try:
-            dir_id = self._get_folder(action_result, path[0], email)
+            dir_id, error, _ = self._get_folder_id(action_result, folder, email)
         except ReturnException as e:
             self._dump_error_log(e)
-            return None, "Error occurred while fetching folder {}. {}".format(path[0], e), None
+            return RetVal(action_result.get_status(), None)
 
         if not dir_id:
-            return None, "Error: folder not found; {}".format(path[0]), ret
+            self.save_progress(error)
+            return RetVal(action_result.set_status(phantom.APP_ERROR, error), None)
 
-        ret.append({"path": path[0], "folder": path[0], "folder_id": dir_id})
+        return RetVal(phantom.APP_SUCCESS, dir_id)
 
-        try:
-            for i, subf in enumerate(path[1:]):
-                subpath = "/".join(path[0 : i + 2])
-                parent_id = dir_id
-                dir_id = self._get_child_folder(action_result, subf, parent_id, email)
+    def _get_folder_id(self, action_result, folder, email, use_cache=True):
+        path = self._get_folder_path(folder)
+        if not path:
+            return None, "Error: Invalid folder path", None
 
-                if not dir_id:
-                    return (
-                        None,
-                        "Error: child folder not found; {}".format(subpath),
-                        ret,
-                    )
+        # Resolve the longest possible prefix of the path from the cache, the remaining folders are looked up one by one
+        ret = self._get_cached_folder_path(email, path) if use_cache else list()
+        cached_count = len(ret)
 
-                ret.append({"path": subpath, "folder": subf, "folder_id": dir_id})
-        except ReturnException as e:
-            self._dump_error_log(e)
-            return None, action_result.get_message(), None
+        self._folder_id_from_cache = cached_count == len(path)
+        if self._folder_id_from_cache:
+            self._folder_cache_hits += 1
+            return ret[-1]["folder_id"], None, ret
+
+        if self._folder_cache_ttl:
+            self._folder_cache_misses += 1
+
+        dir_id = ret[-1]["folder_id"] if ret else None
+        for i in range(cached_count, len(path)):
+            subpath = "/".join(path[: i + 1])
+            try:
+                if i == 0:
+                    dir_id = self._get_folder(action_result, path[0], email)
+                else:
+                    dir_id = self._get_child_folder(action_result, path[i], dir_id, email)
+            except ReturnException as e:
+                self._dump_error_log(e)
+                if cached_count:
+                    # The cached parent folder might not exist anymore, resolve the whole path again
+                    self._invalidate_folder_cache(email, path)
+                    return self._get_folder_id(action_result, folder, email, use_cache=False)
+                if i == 0:
+                    return None, "Error occurred while fetching folder {}. {}".format(path[0], e), None
+                return None, action_result.get_message(), None
+
+            if not dir_id:
+                if i == 0:
+                    return None, "Error: folder not found; {}".format(path[0]), ret
+                return None, "Error: child folder not found; {}".format(subpath), ret
+
+            ret.append({"path": subpath, "folder": path[i], "folder_id": dir_id})
+            self._cache_folder_id(email, path[: i + 1], dir_id)
 
         return dir_id, None, ret
 
@@ -2606,6 +3994,7 @@ class Office365Connector(BaseConnector):
 
         if dir_id:
             action_result.update_summary({"folder_id": dir_id})
+            self._update_folder_cache_summary(action_result)
             return action_result.set_status(phantom.APP_SUCCESS)
 
         else:
@@ -2616,20 +4005,16 @@ class Office365Connector(BaseConnector):
         recipient = {"emailAddress": {"address": email}}
         return recipient
 
-    def _create_draft_message(
+    def _build_message(
         self,
-        action_result,
         subject: str,
         body: str,
-        from_email: str,
         *,
         to_emails: list[str],
         cc_emails: list[str],
         bcc_emails: list[str],
         headers: dict[str, str],
     ):
-        endpoint = "/users/{}/messages".format(from_email)
-        req_headers = {"Prefer": 'IdType="ImmutableId"'}
         msg = {"subject": subject, "body": {"contentType": "HTML", "content": body}}
         if to_emails:
             msg["toRecipients"] = [self._email_to_recipient(email) for email in to_emails]
@@ -2640,6 +4025,48 @@ class Office365Connector(BaseConnector):
         if headers:
             msg["internetMessageHeaders"] = [{"name": key, "value": value} for key, value in headers.items()]
 
+        return msg
+
+    def _send_mail(self, action_result, user_id, msg, vault_infos):
+        """
+        This function sends the message in a single request, with the attachments inlined as base64 content.
+
+        :param action_result: Object of ActionResult class
+        :param user_id: Email address of the sender
+        :param msg: Dictionary of the message
+        :param vault_infos: List of the vault entries to attach, their total size must be within the upload session cutoff
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS
+        """
+        endpoint = "/users/{}/sendMail".format(user_id)
+
+        msg = dict(msg)
+        if vault_infos:
+            msg["attachments"] = [self._get_file_attachment_data(vault_info) for vault_info in vault_infos]
+
+        ret_val, _ = self._make_rest_call_helper(
+            action_result, endpoint, method="post", data=json.dumps({"message": msg, "saveToSentItems": True})
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.set_status(phantom.APP_ERROR, "Failed to send email. {}".format(action_result.get_message()))
+
+        return phantom.APP_SUCCESS
+
+    def _create_draft_message(
+        self,
+        action_result,
+        subject: str,
+        body: str,
+        from_email: str,
+        *,
+        to_emails: list[str],
+        cc_emails: list[str],
+        bcc_emails: list[str],
+        headers: dict[str, str],
+    ):
+        endpoint = "/users/{}/messages".format(from_email)
+        req_headers = {"Prefer": 'IdType="ImmutableId"'}
+        msg = self._build_message(subject, body, to_emails=to_emails, cc_emails=cc_emails, bcc_emails=bcc_emails, headers=headers)
+
         ret_val, response = self._make_rest_call_helper(action_result, endpoint, method="post", headers=req_headers, data=json.dumps(msg))
 
         if phantom.is_fail(ret_val):
@@ -2663,11 +4090,7 @@ class Office365Connector(BaseConnector):
             _, _, vault_infos = phantom_vault.vault_info(vault_id=vault_id)
         return vault_infos[0] if vault_infos else None
 
-    def _add_attachment_to_message(self, action_result, vault_id, user_id, message_id):
-        vault_info = self._get_vault_info(vault_id)
-        if not vault_info:
-            return action_result.set_status(phantom.APP_ERROR, "Failed to find vault entry {}".format(vault_id)), None
-
+    def _add_attachment_to_message(self, action_result, vault_info, user_id, message_id):
         if vault_info["size"] > MSGOFFICE365_UPLOAD_SESSION_CUTOFF:
             ret_val, attachment_id = self._upload_large_attachment(action_result, vault_info, user_id, message_id)
         else:
@@ -2675,17 +4098,20 @@ class Office365Connector(BaseConnector):
 
         return ret_val, attachment_id
 
-    def _upload_small_attachment(self, action_result, vault_info, user_id, message_id):
-        endpoint = "/users/{}/messages/{}/attachments".format(user_id, message_id)
+    def _get_file_attachment_data(self, vault_info):
         with open(vault_info["path"], mode="rb") as file:
             file_content = file.read()
-        data = {
+        return {
             "@odata.type": "#microsoft.graph.fileAttachment",
             "name": vault_info["name"],
             "contentType": vault_info["mime_type"],
             "contentBytes": base64.b64encode(file_content).decode("ascii"),
             "contentId": vault_info["vault_id"],
         }
+
+    def _upload_small_attachment(self, action_result, vault_info, user_id, message_id):
+        endpoint = "/users/{}/messages/{}/attachments".format(user_id, message_id)
+        data = self._get_file_attachment_data(vault_info)
         ret_val, response = self._make_rest_call_helper(action_result, endpoint, method="post", data=json.dumps(data))
         if phantom.is_fail(ret_val):
             return action_result.set_status(phantom.APP_ERROR, "Failed to upload vault entry {}".format(vault_info["vault_id"])), None
@@ -2709,46 +4135,11 @@ class Office365Connector(BaseConnector):
             return action_result.set_status(phantom.APP_ERROR, "Failed to upload vault entry {}".format(vault_info["vault_id"])), None
         upload_url = response["uploadUrl"]
 
-        with open(vault_info["path"], mode="rb") as file:
-            for start_position in range(0, file_size, MSGOFFICE365_UPLOAD_LARGE_FILE_CUTOFF):
-                file_content = file.read(MSGOFFICE365_UPLOAD_LARGE_FILE_CUTOFF)
-                end_position = start_position + len(file_content) - 1
-                headers = {
-                    "Content-Type": "application/octet-stream",
-                    "Content-Range": "bytes {}-{}/{}".format(start_position, end_position, file_size),
-                }
-                flag = True
-                while flag:
-                    response = requests.put(upload_url, headers=headers, data=file_content)
-
-                    if response.status_code == 429 and response.headers["Retry-After"]:
-                        retry_time = int(response.headers["Retry-After"])
-
-                        if retry_time > 300:  # throw error if wait time greater than 300 seconds
-                            self.debug_print("Retry is canceled as retry time is greater than 300 seconds")
-                            self._process_response(response, action_result)
-                            return (
-                                action_result.set_status(
-                                    phantom.APP_ERROR,
-                                    "Failed to upload file, {} Please retry after \
-                                    {} seconds".format(
-                                        action_result.get_message(), retry_time
-                                    ),
-                                ),
-                                None,
-                            )
-                        self.debug_print("Retrying after {} seconds".format(retry_time))
-                        time.sleep(retry_time + 1)
-                    elif not response.ok:
-                        return (
-                            action_result.set_status(
-                                phantom.APP_ERROR,
-                                "Failed to upload file, Error occurred : {}, {}".format(response.status_code, str(response.text)),
-                            ),
-                            None,
-                        )
-                    else:
-                        flag = False
+        # The chunks are sliced from the memory-mapped file, so only the chunk being uploaded is held in memory
+        with open(vault_info["path"], mode="rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            ret_val, response = self._upload_file_chunks(action_result, self._session, upload_url, content, file_size)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status(), None
 
         result_location = response.headers.get("Location", "no_location_found")
         match = re.search(r"Attachments\('(?P<attachment_id>[^']+)'\)", result_location)
@@ -2757,6 +4148,96 @@ class Office365Connector(BaseConnector):
         attachment_id = match.group("attachment_id")
         return phantom.APP_SUCCESS, attachment_id
 
+    def _get_next_expected_position(self, session, upload_url, response=None):
+        """
+        This function returns the position of the next byte the upload session expects, as reported by the server.
+
+        :param session: Object of requests.Session class
+        :param upload_url: URL of the upload session
+        :param response: Response of the last uploaded chunk, the upload session status is fetched if not provided
+        :return: position of the next byte to upload, None if it could not be determined
+        """
+        try:
+            if response is None:
+                response = session.get(upload_url, timeout=MSGOFFICE365_DEFAULT_REQUEST_TIMEOUT)
+            next_expected_ranges = response.json().get("nextExpectedRanges") or []
+            return int(next_expected_ranges[0].split("-")[0]) if next_expected_ranges else None
+        except Exception as e:
+            self.debug_print("Unable to fetch the status of the upload session. {}".format(_get_error_msg_from_exception(e, self)))
+            return None
+
+    def _upload_file_chunks(self, action_result, session, upload_url, content, file_size):
+        """
+        This function uploads the content to the upload session in chunks. After a throttled or failed chunk,
+        the upload resumes from the position the upload session expects next instead of starting over.
+
+        :param action_result: Object of ActionResult class
+        :param session: Object of requests.Session class
+        :param upload_url: URL of the upload session
+        :param content: Bytes-like object of the content to upload
+        :param file_size: Size of the content
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, response of the last chunk
+        """
+        start_position = 0
+        failures = 0
+        while True:
+            end_position = min(start_position + MSGOFFICE365_UPLOAD_CHUNK_SIZE, file_size)
+            headers = {
+                "Content-Type": "application/octet-stream",
+                "Content-Range": "bytes {}-{}/{}".format(start_position, end_position - 1, file_size),
+            }
+            try:
+                response = session.put(
+                    upload_url, headers=headers, data=content[start_position:end_position], timeout=MSGOFFICE365_DEFAULT_REQUEST_TIMEOUT
+                )
+            except Exception as e:
+                response = None
+                self.debug_print("Error occurred while uploading the file chunk. {}".format(_get_error_msg_from_exception(e, self)))
+
+            if response is not None and response.ok:
+                if end_position >= file_size:
+                    return phantom.APP_SUCCESS, response
+
+                failures = 0
+                start_position = self._get_next_expected_position(session, upload_url, response) or end_position
+                continue
+
+            if response is not None and response.status_code != 429 and response.status_code < 500:
+                return (
+                    action_result.set_status(
+                        phantom.APP_ERROR,
+                        "Failed to upload file, Error occurred : {}, {}".format(response.status_code, str(response.text)),
+                    ),
+                    None,
+                )
+
+            failures += 1
+            if failures >= self._number_of_retries:
+                error_msg = "{}, {}".format(response.status_code, str(response.text)) if response is not None else "Error connecting to server"
+                return action_result.set_status(phantom.APP_ERROR, "Failed to upload file, Error occurred : {}".format(error_msg)), None
+
+            retry_time = self._retry_wait_time
+            if response is not None and response.status_code == 429:
+                retry_time = self._get_retry_wait_time(response)
+                if retry_time > MSGOFFICE365_UPLOAD_MAX_RETRY_AFTER:  # throw error if wait time greater than 300 seconds
+                    self.debug_print("Retry is canceled as retry time is greater than 300 seconds")
+                    self._process_response(response, action_result)
+                    return (
+                        action_result.set_status(
+                            phantom.APP_ERROR,
+                            "Failed to upload file, {} Please retry after {} seconds".format(action_result.get_message(), retry_time),
+                        ),
+                        None,
+                    )
+            self.debug_print("Retrying after {} seconds".format(retry_time))
+            with self.performance_profile.measure("throttle_sleep"):
+                time.sleep(retry_time + 1)
+
+            # Resume from the first byte the server has not received yet
+            start_position = self._get_next_expected_position(session, upload_url)
+            if start_position is None:
+                return action_result.set_status(phantom.APP_ERROR, "Failed to upload file, unable to resume the upload session"), None
+
     def _get_message(self, action_result, user_id, message_id):
         endpoint = "/users/{}/messages/{}".format(user_id, message_id)
 
@@ -2785,6 +4266,23 @@ class Office365Connector(BaseConnector):
 
         body = param["body"]
         vault_ids = [vault_id for x in param.get("attachments", "").split(",") if (vault_id := x.strip())]
+        fetch_sent_email = param.get("fetch_sent_email", True)
+
+        vault_infos = []
+        for vault_id in vault_ids:
+            vault_info = self._get_vault_info(vault_id)
+            if not vault_info:
+                return action_result.set_status(phantom.APP_ERROR, "Failed to find vault entry {}".format(vault_id))
+            vault_infos.append(vault_info)
+
+        # The ID of the sent email is only known through the draft, the single request is used when the details are not needed
+        if not fetch_sent_email and sum(vault_info["size"] for vault_info in vault_infos) <= MSGOFFICE365_UPLOAD_SESSION_CUTOFF:
+            self.save_progress("Sending email")
+            msg = self._build_message(subject, body, to_emails=to_emails, cc_emails=cc_emails, bcc_emails=bcc_emails, headers=headers)
+            ret_val = self._send_mail(action_result, from_email, msg, vault_infos)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
+            return action_result.set_status(phantom.APP_SUCCESS, "Successfully sent email")
 
         self.save_progress("Creating draft message")
         ret_val, message_id = self._create_draft_message(
@@ -2794,14 +4292,19 @@ class Office365Connector(BaseConnector):
             return action_result
         self.save_progress("Created draft message with id: {}".format(message_id))
 
+        # The attachments of the draft are uploaded concurrently
+        self.save_progress("Creating attachments for vault ids: {}".format(", ".join(vault_ids)))
+        results = self._run_concurrently(
+            lambda worker_action_result, vault_info: self._add_attachment_to_message(worker_action_result, vault_info, from_email, message_id),
+            vault_infos,
+        )
+
         attachments = []
-        for vault_id in vault_ids:
-            self.save_progress("Creating attachment for vault id: {}".format(vault_id))
-            ret_val, attachment_id = self._add_attachment_to_message(action_result, vault_id, from_email, message_id)
+        for vault_info, (worker_action_result, (ret_val, attachment_id)) in zip(vault_infos, results):
             if phantom.is_fail(ret_val):
-                return action_result
+                return action_result.set_status(phantom.APP_ERROR, worker_action_result.get_message())
             self.save_progress("Created attachment with id: {}".format(attachment_id))
-            attachment = {"vault_id": vault_id, "attachment_id": attachment_id}
+            attachment = {"vault_id": vault_info["vault_id"], "attachment_id": attachment_id}
             attachments.append(attachment)
 
         self.save_progress("Sending draft email with id: {}".format(message_id))
@@ -2810,6 +4313,9 @@ class Office365Connector(BaseConnector):
             return action_result
         self.save_progress("Successfully sent draft email.")
 
+        if not fetch_sent_email:
+            return action_result.set_status(phantom.APP_SUCCESS, "Successfully sent email")
+
         self.save_progress("Getting sent email details with id: {}".format(message_id))
         ret_val, message_details = self._get_message(action_result, from_email, message_id)
         if phantom.is_fail(ret_val):
@@ -2819,7 +4325,120 @@ class Office365Connector(BaseConnector):
         action_result.add_data(message_details)
         return action_result.set_status(phantom.APP_SUCCESS, "Successfully sent email")
 
-    def _paginator(self, action_result, endpoint, limit=None, params=None, query=None, is_advance_query=False):
+    def _send_templated_email(self, action_result, from_email, subject, body, headers, recipient):
+        """
+        This function sends the templated email to a single recipient, substituting the template placeholders with its values.
+
+        :param action_result: Object of ActionResult class
+        :param from_email: Email address of the sender
+        :param subject: Template of the subject
+        :param body: Template of the body
+        :param headers: Dictionary of the additional email headers
+        :param recipient: Dictionary containing the 'to' key, the optional 'cc' and 'bcc' keys and the template substitutions
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS
+        """
+        # A literal '$', e.g. in '$100', and the placeholders without a value are kept as is
+        subject = subject.safe_substitute(recipient)
+        # The body is HTML, the substituted values are escaped
+        body = body.safe_substitute({key: html.escape(str(value)) for key, value in recipient.items()})
+
+        emails = {key: self._get_recipient_emails(recipient, key) for key in MSGOFFICE365_BULK_SEND_RECIPIENT_KEYS}
+        msg = self._build_message(subject, body, to_emails=emails["to"], cc_emails=emails["cc"], bcc_emails=emails["bcc"], headers=headers)
+
+        # The failure of a recipient must not stop the emails of the other ones
+        try:
+            return self._send_mail(action_result, from_email, msg, [])
+        except Exception as e:
+            error_msg = _get_error_msg_from_exception(e, self)
+            return action_result.set_status(phantom.APP_ERROR, "Error occurred while sending the email. {}".format(error_msg))
+
+    def _get_recipient_emails(self, recipient, key):
+        return [email for x in (recipient.get(key) or "").split(",") if (email := x.strip())]
+
+    def _validate_recipients(self, action_result, recipients):
+        """
+        This function validates the email addresses of all the recipients, before any email is sent.
+
+        :param action_result: Object of ActionResult class
+        :param recipients: List of the recipient dictionaries
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS
+        """
+        for index, recipient in enumerate(recipients):
+            for key in MSGOFFICE365_BULK_SEND_RECIPIENT_KEYS:
+                # The empty optional keys, e.g. a 'cc' column left blank, are considered absent
+                value = recipient.get(key)
+                if key != "to" and (value is None or isinstance(value, str) and not value.strip()):
+                    continue
+                emails = self._get_recipient_emails(recipient, key) if isinstance(value, str) else None
+                if not all(util.is_email(email) for email in emails or [None]):
+                    return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_BULK_SEND_INVALID_RECIPIENT.format(key=key, index=index))
+
+        return phantom.APP_SUCCESS
+
+    def _handle_bulk_send_email(self, param):
+        self.save_progress("In action handler for: {}".format(self.get_action_identifier()))
+        action_result = self.add_action_result(ActionResult(dict(param)))
+        config = self.get_config()
+
+        from_email = param.get("from") or config.get("email_address")
+
+        try:
+            headers = json.loads(param.get("headers", "{}"))
+        except Exception:
+            return action_result.set_status(phantom.APP_ERROR, "Please enter headers in a valid JSON format")
+
+        try:
+            recipients = json.loads(param["recipients"])
+            if (
+                not recipients
+                or not isinstance(recipients, list)
+                or not all(isinstance(x, dict) and isinstance(x.get("to"), str) for x in recipients)
+            ):
+                return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_BULK_SEND_INVALID_RECIPIENTS)
+        except Exception as e:
+            error_msg = _get_error_msg_from_exception(e, self)
+            return action_result.set_status(phantom.APP_ERROR, "{0}. {1}".format(MSGOFFICE365_BULK_SEND_INVALID_RECIPIENTS, error_msg))
+
+        ret_val = self._validate_recipients(action_result, recipients)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        subject = Template(param["subject"])
+        body = Template(param["body"])
+
+        self.save_progress("Sending email to {} recipient(s)".format(len(recipients)))
+        results = self._run_concurrently(
+            lambda worker_action_result, recipient: self._send_templated_email(
+                worker_action_result, from_email, subject, body, headers, recipient
+            ),
+            recipients,
+        )
+
+        failed_recipients = 0
+        for recipient, (worker_action_result, ret_val) in zip(recipients, results):
+            item = {"to": recipient["to"], "status": "success"}
+            if phantom.is_fail(ret_val):
+                failed_recipients += 1
+                item.update({"status": "failed", "message": worker_action_result.get_message()})
+            action_result.add_data(item)
+
+        action_result.update_summary(
+            {
+                "total_recipients": len(recipients),
+                "successful_recipients": len(recipients) - failed_recipients,
+                "failed_recipients": failed_recipients,
+            }
+        )
+
+        if failed_recipients == len(recipients):
+            return action_result.set_status(phantom.APP_ERROR, "Failed to send email to all the recipients")
+
+        return action_result.set_status(
+            phantom.APP_SUCCESS, "Successfully sent email to {} of {} recipient(s)".format(len(recipients) - failed_recipients, len(recipients))
+        )
+
+    @profiled("paginator")
+    def _paginator(self, action_result, endpoint, limit=None, params=None, query=None, is_advance_query=False, headers=None):
         """
         This action is used to create an iterator that will paginate through responses from called methods.
 
@@ -2830,7 +4449,7 @@ class Office365Connector(BaseConnector):
 
         list_items = list()
         next_link = None
-        headers = {}
+        headers = dict(headers or {})
 
         # maximum page size
         page_size = MSGOFFICE365_PER_PAGE_COUNT
@@ -2870,6 +4489,44 @@ class Office365Connector(BaseConnector):
 
         return phantom.APP_SUCCESS, list_items
 
+    def _make_batch_request(self, action_result, batch_requests):
+        """
+        This function executes the given requests through the MS Graph JSON batching endpoint.
+        The throttled requests of a batch are sent again after the delay requested by the server.
+
+        :param action_result: Object of ActionResult class
+        :param batch_requests: List of request dictionaries containing 'id', 'method' and 'url' keys
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, dictionary of responses keyed by the request ID
+        """
+        responses = dict()
+
+        for index in range(0, len(batch_requests), MSGOFFICE365_BATCH_REQUEST_LIMIT):
+            batch = batch_requests[index : index + MSGOFFICE365_BATCH_REQUEST_LIMIT]
+
+            for attempt in range(self._number_of_retries):
+                ret_val, response = self._make_rest_call_helper(action_result, "/$batch", data=json.dumps({"requests": batch}), method="post")
+
+                if phantom.is_fail(ret_val):
+                    return action_result.get_status(), None
+
+                retry_after = 0
+                for item in response.get("responses", []):
+                    if item.get("status") == 429 and attempt < self._number_of_retries - 1:
+                        wait_time = str((item.get("headers") or {}).get("Retry-After", ""))
+                        retry_after = max(retry_after, int(wait_time) if wait_time.isdigit() else self._retry_wait_time)
+                        continue
+                    responses[item.get("id")] = item
+
+                batch = [request for request in batch if request["id"] not in responses]
+                if not batch:
+                    break
+
+                self.debug_print("{0} request(s) of the batch were throttled by the server".format(len(batch)))
+                with self.performance_profile.measure("throttle_sleep"):
+                    time.sleep(retry_after)
+
+        return phantom.APP_SUCCESS, responses
+
     def _handle_update_email(self, param):
         self.save_progress(f"In action handler for: {self.get_action_identifier()}")
         action_result = self.add_action_result(ActionResult(param))
@@ -2957,28 +4614,29 @@ class Office365Connector(BaseConnector):
         # id or userPrincipalName
         email = param["email"]
 
-        endpoint = f"/users?$filter=startswith(displayName,'{email}') or startswith(mail,'{email}')"
-        ret_val, responses = self._make_rest_call_helper(action_result, endpoint)
+        # All the properties of the matched users are fetched by the search itself
+        query = f"startswith(displayName,'{email}') or startswith(mail,'{email}')"
+        params = {"$select": ",".join(MSGOFFICE365_RESOLVE_NAME_SELECT_PARAMETER_LIST)}
+        ret_val, users = self._paginator(action_result, "/users", params=params, query=query)
         self.save_progress(f"Fetching user ended witch {ret_val}")
 
         if phantom.is_fail(ret_val):
-            return action_result.set_status(phantom.APP_ERROR, "Got invalid ret val")
-
-        for response in responses.get("value"):
-
-            user_id = response.get("id")
-
-            endpoint_other_mails = f"/users/{user_id}?$select=mailNickname,proxyAddresses,otherMails"
-            endpoint_other_address = f"/users/{user_id}?$select=city,state,street,postalCode"
-            endpoint_mailbox = f"/users/{user_id}/mailboxSettings/userPurpose"
+            return action_result.get_status()
 
-            ret_val_proxy, response_proxy = self._make_rest_call_helper(action_result, endpoint_other_mails)
-            ret_val_address, response_address = self._make_rest_call_helper(action_result, endpoint_other_address)
-            ret_val_mailbox, response_mailbox = self._make_rest_call_helper(action_result, endpoint_mailbox)
+        # The mailbox settings are not part of the user resource, they are fetched in batches
+        batch_requests = [
+            {"id": str(index), "method": "GET", "url": "/users/{0}/mailboxSettings/userPurpose".format(user.get("id"))}
+            for index, user in enumerate(users)
+        ]
+        ret_val, responses = self._make_batch_request(action_result, batch_requests)
+        self.save_progress(f"Fetching mailbox settings ended with {ret_val}")
 
-            self.save_progress(f"Got statuses: mails: {ret_val_proxy}, address: {ret_val_address}, mailbox: {ret_val_mailbox}")
+        for index, user in enumerate(users):
+            response_mailbox = (responses or {}).get(str(index)) or {}
+            if response_mailbox.get("status") != 200:
+                response_mailbox = {"body": {"userPurpose": None}}
 
-            action_result.add_data(response | response_proxy | response_address | (response_mailbox or {"userPurpose": None}))
+            action_result.add_data(user | response_mailbox.get("body", {}))
 
         return action_result.set_status(phantom.APP_SUCCESS)
 
@@ -2994,6 +4652,13 @@ class Office365Connector(BaseConnector):
         download_attachments = param.get("download_attachments", False)
         download_email = param.get("download_email", False)
         extract_headers = param.get("extract_headers", False)
+        projection_profile = param.get("projection_profile", self._projection_profile)
+
+        if projection_profile not in MSGOFFICE365_PROJECTION_PROFILES:
+            return action_result.set_status(
+                phantom.APP_ERROR,
+                MSGOFFICE365_INVALID_PROJECTION_PROFILE.format(param="action parameter", values=", ".join(MSGOFFICE365_PROJECTION_PROFILES)),
+            )
 
         ret_val, limit = _validate_integer(action_result, limit, "'limit' action")
         if phantom.is_fail(ret_val):
@@ -3011,7 +4676,7 @@ class Office365Connector(BaseConnector):
         params = {
             "$top": limit,
             "$orderby": MSGOFFICE365_ORDERBY_RECEIVED_DESC,
-            "$select": ",".join(MSGOFFICE365_SELECT_PARAMETER_LIST),
+            "$select": ",".join(MSGOFFICE365_PROJECTION_PROFILES[projection_profile]),
             "$skip": offset,
         }
 
@@ -3070,6 +4735,8 @@ class Office365Connector(BaseConnector):
 
         summary = action_result.update_summary({})
         summary["total_messages"] = total_emails
+        summary["projection_profile"] = projection_profile
+        summary["payload_bytes"] = self._payload_bytes
         if ingest:
             duplicate_count = self._duplicate_count - duplicate_count
             summary["new_emails_ingested"] = total_emails - failed_email_ids - duplicate_count
@@ -3095,85 +4762,119 @@ class Office365Connector(BaseConnector):
 
         self.debug_print("action_id", self.get_action_identifier())
 
-        if action_id == "resolve_name":
-            ret_val = self._handle_resolve_name(param)
-
-        if action_id == "block_sender":
-            ret_val = self._handle_block_sender(param)
-
-        if action_id == "unblock_sender":
-            ret_val = self._handle_unblock_sender(param)
-
-        if action_id == "test_connectivity":
-            ret_val = self._handle_test_connectivity(param)
-
-        elif action_id == "copy_email":
-            ret_val = self._handle_copy_email(param)
-
-        elif action_id == "move_email":
-            ret_val = self._handle_move_email(param)
-
-        elif action_id == "delete_email":
-            ret_val = self._handle_delete_email(param)
-
-        elif action_id == "delete_event":
-            ret_val = self._handle_delete_event(param)
-
-        elif action_id == "get_email":
-            ret_val = self._handle_get_email(param)
-
-        elif action_id == "get_email_properties":
-            ret_val = self._handle_get_email_properties(param)
-
-        elif action_id == "on_poll":
-            ret_val = self._handle_on_poll(param)
-
-        elif action_id == "run_query":
-            ret_val = self._handle_run_query(param)
-
-        elif action_id == "list_events":
-            ret_val = self._handle_list_events(param)
-
-        elif action_id == "list_groups":
-            ret_val = self._handle_list_groups(param)
-
-        elif action_id == "list_group_members":
-            ret_val = self._handle_list_group_members(param)
-
-        elif action_id == "list_users":
-            ret_val = self._handle_list_users(param)
-
-        elif action_id == "list_folders":
-            ret_val = self._handle_list_folders(param)
-
-        elif action_id == "oof_check":
-            ret_val = self._handle_oof_check(param)
-
-        elif action_id == "generate_token":
-            ret_val = self._handle_generate_token(param)
+        action_mapping = {
+            "resolve_name": self._handle_resolve_name,
+            "block_sender": self._handle_block_sender,
+            "unblock_sender": self._handle_unblock_sender,
+            "test_connectivity": self._handle_test_connectivity,
+            "copy_email": self._handle_copy_email,
+            "move_email": self._handle_move_email,
+            "delete_email": self._handle_delete_email,
+            "bulk_remediate_email": self._handle_bulk_remediate_email,
+            "delete_event": self._handle_delete_event,
+            "get_email": self._handle_get_email,
+            "get_email_properties": self._handle_get_email_properties,
+            "on_poll": self._handle_on_poll,
+            "run_query": self._handle_run_query,
+            "hunt_email": self._handle_hunt_email,
+            "list_events": self._handle_list_events,
+            "list_groups": self._handle_list_groups,
+            "list_group_members": self._handle_list_group_members,
+            "list_users": self._handle_list_users,
+            "list_folders": self._handle_list_folders,
+            "oof_check": self._handle_oof_check,
+            "generate_token": self._handle_generate_token,
+            "create_folder": self._handle_create_folder,
+            "get_folder_id": self._handle_get_folder_id,
+            "list_rules": self._handle_list_rules,
+            "get_rule": self._handle_get_rule,
+            "send_email": self._handle_send_email,
+            "bulk_send_email": self._handle_bulk_send_email,
+            "update_email": self._handle_update_email,
+            "get_mailbox_messages": self._handle_get_mailbox_messages,
+        }
 
-        elif action_id == "create_folder":
-            ret_val = self._handle_create_folder(param)
+        if action_id in action_mapping:
+            if self._cassette_recorder:
+                self._cassette_recorder.record_action(action_id, self.get_config(), self._state, param)
+            with self._capture_action_profile():
+                ret_val = action_mapping[action_id](param)
 
-        elif action_id == "get_folder_id":
-            ret_val = self._handle_get_folder_id(param)
+        # Attach the performance profile of the action to its summary
+        action_results = self.get_action_results()
+        if self.performance_profile.enabled and action_results:
+            action_results[-1].update_summary({"performance_profile": self.performance_profile.get_summary()})
 
-        elif action_id == "list_rules":
-            ret_val = self._handle_list_rules(param)
+        return ret_val
 
-        elif action_id == "get_rule":
-            ret_val = self._handle_get_rule(param)
+    @contextmanager
+    def _capture_action_profile(self):
+        """
+        Capture the CPU profile and/or the allocations of the action, as configured by the 'profile_capture' asset configuration.
+        The captured files are added to the vault of the container of the action, or of the last container it saved.
+        """
+        if self._profile_capture == MSGOFFICE365_PROFILE_CAPTURE_NONE:
+            yield
+            return
 
-        elif action_id == "send_email":
-            ret_val = self._handle_send_email(param)
+        capture = ActionCapture(
+            cpu=self._profile_capture in (MSGOFFICE365_PROFILE_CAPTURE_CPU, MSGOFFICE365_PROFILE_CAPTURE_ALL),
+            memory=self._profile_capture in (MSGOFFICE365_PROFILE_CAPTURE_MEMORY, MSGOFFICE365_PROFILE_CAPTURE_ALL),
+        )
+        capture.start()
+        try:
+            yield
+        finally:
+            capture.stop()
+            self._save_action_capture(capture)
 
-        elif action_id == "update_email":
-            ret_val = self._handle_update_email(param)
+    def _save_action_capture(self, capture):
 
-        elif action_id == "get_mailbox_messages":
-            ret_val = self._handle_get_mailbox_messages(param)
+        container_id = self.get_container_id() or self._last_container_id
+        if not container_id:
+            self.debug_print("No container to add the profile of the action to")
+            return
 
-        return ret_val
+        vault_ids = []
+        tmp_dir = None
+        try:
+            tmp_dir = tempfile.mkdtemp(dir=Vault.get_vault_tmp_dir())
+            prefix = "{0}_profile_{1}".format(self.get_action_identifier(), self.get_app_run_id())
+            for file_path in capture.write(tmp_dir, prefix):
+                success, msg, vault_id = ph_rules.vault_add(
+                    container=container_id,
+                    file_location=file_path,
+                    file_name=os.path.basename(file_path),
+                )
+                if not success:
+                    self.debug_print("Error adding the profile of the action to the vault: {0}".format(msg))
+                    continue
+                vault_ids.append(vault_id)
+        except Exception as e:
+            self.debug_print("Error saving the profile of the action: {0}".format(_get_error_msg_from_exception(e, self)))
+        finally:
+            # The files not taken over by the vault are removed along with the directory
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        action_results = self.get_action_results()
+        if vault_ids and action_results:
+            action_results[-1].update_summary({"profile_vault_ids": vault_ids})
+
+    @profiled("save_container")
+    def save_container(self, container, *args, **kwargs):
+        ret_val, msg, container_id = super().save_container(container, *args, **kwargs)
+        if container_id:
+            self._last_container_id = container_id
+        return ret_val, msg, container_id
+
+    @profiled("save_artifacts")
+    def save_artifacts(self, artifacts):
+        return super().save_artifacts(artifacts)
+
+    @profiled("save_artifact")
+    def save_artifact(self, artifact):
+        return super().save_artifact(artifact)
 
     def _get_private_key(self, action_result):
         # When the private key is copied/pasted to an asset parameter
@@ -3214,6 +4915,8 @@ class Office365Connector(BaseConnector):
             return action_result.get_status(), None
 
         try:
+            import msal
+
             app = msal.ConfidentialClientApplication(
                 self._client_id,
                 authority=MSGOFFICE365_AUTHORITY_URL.format(tenant=self._tenant),
@@ -3310,10 +5013,15 @@ class Office365Connector(BaseConnector):
         self._refresh_token = resp_json.get("refresh_token")
 
         # Save state
-        self.save_state(self._state)
-        self._state = self.load_state()
-
-        if not isinstance(self._state, dict):
+        with self._state_file_lock() as locked:
+            if not locked:
+                # The token is used by this action and saved with the state at the next checkpoint or in finalize
+                self.debug_print("Unable to save the generated token without the state lock")
+                return action_result.set_status(phantom.APP_SUCCESS)
+            self.save_state(self._state)
+            saved_state = super().load_state()
+
+        if not isinstance(saved_state, dict):
             self.debug_print(MSGOFFICE365_STATE_FILE_CORRUPT_ERROR)
             self._reset_state_file()
 
@@ -3325,14 +5033,12 @@ class Office365Connector(BaseConnector):
         # the newly generated token is not being saved to state file and automatic workflow for token has been stopped.
         # So we have to check that token from response and token which are saved to state file
         # after successful generation of new token are same or not.
+        # The saved token is compared with the ciphertext it was saved with, the state file is not decrypted again.
 
-        if self._admin_access:
-
-            if self._access_token != self._state.get("admin_auth", {}).get("access_token"):
-                return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_INVALID_PERMISSION_ERROR)
-        else:
-            if self._access_token != self._state.get("non_admin_auth", {}).get("access_token"):
-                return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_INVALID_PERMISSION_ERROR)
+        auth_key = "admin_auth" if self._admin_access else "non_admin_auth"
+        saved_token = saved_state.get(auth_key, {}).get("access_token")
+        if saved_token != self._encrypted_secrets.get(self._access_token, self._access_token):
+            return action_result.set_status(phantom.APP_ERROR, MSGOFFICE365_INVALID_PERMISSION_ERROR)
 
         self.debug_print("Token generated successfully")
         return action_result.set_status(phantom.APP_SUCCESS)
@@ -3463,6 +5169,16 @@ class Office365Connector(BaseConnector):
         config = self.get_config()
         self._asset_id = self.get_asset_id()
 
+        debug_subsystems, unknown_subsystems = parse_debug_subsystems(config.get("debug_subsystems"))
+        if unknown_subsystems:
+            return self.set_status(
+                phantom.APP_ERROR,
+                MSGOFFICE365_INVALID_DEBUG_SUBSYSTEMS.format(
+                    unknown=", ".join(unknown_subsystems), values=", ".join((DEBUG_SUBSYSTEMS_ALL,) + DEBUG_SUBSYSTEMS)
+                ),
+            )
+        self.debug_logger = DebugLogger(self, debug_subsystems)
+
         # Load all the asset configuration in global variables
         self._state = self.load_state()
 
@@ -3493,6 +5209,54 @@ class Office365Connector(BaseConnector):
         if phantom.is_fail(ret_val):
             return self.get_status()
 
+        ret_val, self._max_concurrent_requests = _validate_integer(
+            self,
+            config.get("max_concurrent_requests", MSGOFFICE365_DEFAULT_MAX_CONCURRENT_REQUESTS),
+            "'Maximum concurrent requests' asset configuration",
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        # The connections are reused by all the requests of the action, the pool is sized for the concurrent workers
+        ret_val, adapter = self._get_http_adapter(config, max(self._max_concurrent_requests, MSGOFFICE365_DEFAULT_CONNECTION_POOL_SIZE))
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        ret_val, self._folder_cache_ttl = _validate_integer(
+            self,
+            config.get("folder_cache_ttl", MSGOFFICE365_DEFAULT_FOLDER_CACHE_TTL),
+            "'Folder ID cache TTL' asset configuration",
+            allow_zero=True,
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        ret_val, self._directory_cache_ttl = _validate_integer(
+            self,
+            config.get("directory_cache_ttl", MSGOFFICE365_DEFAULT_DIRECTORY_CACHE_TTL),
+            "'Directory snapshot TTL' asset configuration",
+            allow_zero=True,
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        self._prefer_text_body = config.get("prefer_text_body", False)
+        self.performance_profile = PerformanceProfile(config.get("performance_profile", False))
+        self._profile_capture = config.get("profile_capture", MSGOFFICE365_PROFILE_CAPTURE_NONE)
+        if self._profile_capture not in MSGOFFICE365_PROFILE_CAPTURES:
+            return self.set_status(
+                phantom.APP_ERROR,
+                MSGOFFICE365_INVALID_PROFILE_CAPTURE.format(values=", ".join(MSGOFFICE365_PROFILE_CAPTURES)),
+            )
+        self._projection_profile = config.get("projection_profile", MSGOFFICE365_DEFAULT_PROJECTION_PROFILE)
+        if self._projection_profile not in MSGOFFICE365_PROJECTION_PROFILES:
+            return self.set_status(
+                phantom.APP_ERROR,
+                MSGOFFICE365_INVALID_PROJECTION_PROFILE.format(param="asset configuration", values=", ".join(MSGOFFICE365_PROJECTION_PROFILES)),
+            )
+
         if not self._admin_access:
             if not self._scope and self._auth_type == "oauth":
                 return self.set_status(phantom.APP_ERROR, MSGOFFICE365_NON_ADMIN_SCOPE_ERROR)
@@ -3538,11 +5302,62 @@ class Office365Connector(BaseConnector):
                     "{0}. {1}".format(MSGOFFICE365_RUN_CONNECTIVITY_MSG, action_result.get_message()),
                 )
 
-        # Create ProcessEmail Object for on_poll
-        self._process_email = ProcessEmail(self, config)
-
         return phantom.APP_SUCCESS
 
+    def _get_http_adapter(self, config, pool_maxsize):
+        """
+        This function returns the transport adapter of the requests of the action. The 'cassette_mode' asset configuration
+        records the requests and responses of the action to a cassette file, or replays them from it without the network.
+
+        :param config: Asset configuration
+        :param pool_maxsize: Size of the connection pool
+        :return: status phantom.APP_ERROR/phantom.APP_SUCCESS, transport adapter
+        """
+        cassette_mode = config.get("cassette_mode", MSGOFFICE365_CASSETTE_MODE_NONE)
+        if cassette_mode not in MSGOFFICE365_CASSETTE_MODES:
+            return RetVal(
+                self.set_status(phantom.APP_ERROR, MSGOFFICE365_INVALID_CASSETTE_MODE.format(values=", ".join(MSGOFFICE365_CASSETTE_MODES))),
+                None,
+            )
+
+        if cassette_mode == MSGOFFICE365_CASSETTE_MODE_NONE:
+            return RetVal(phantom.APP_SUCCESS, requests.adapters.HTTPAdapter(pool_maxsize=pool_maxsize))
+
+        cassette_path = config.get("cassette_path")
+        if not cassette_path:
+            return RetVal(self.set_status(phantom.APP_ERROR, MSGOFFICE365_CASSETTE_PATH_ERROR), None)
+        # The cassette files are kept in the state directory of the app, the path can't point outside of it
+        state_dir = os.path.realpath(self.get_state_dir())
+        cassette_path = os.path.realpath(os.path.join(state_dir, cassette_path))
+        if os.path.commonpath([state_dir, cassette_path]) != state_dir or cassette_path == state_dir:
+            return RetVal(self.set_status(phantom.APP_ERROR, MSGOFFICE365_CASSETTE_PATH_OUTSIDE_STATE_DIR.format(state_dir=state_dir)), None)
+        if cassette_mode == MSGOFFICE365_CASSETTE_MODE_RECORD:
+            # Every action records its own file, so that an action never overwrites the recording of another one
+            root, extension = os.path.splitext(cassette_path)
+            cassette_path = "{0}_{1}_{2}{3}".format(root, self.get_action_identifier(), self.get_app_run_id(), extension)
+
+        latency = None
+        cassette_latency = str(config.get("cassette_latency", MSGOFFICE365_CASSETTE_LATENCY_RECORDED)).strip().lower()
+        if cassette_latency != MSGOFFICE365_CASSETTE_LATENCY_RECORDED:
+            try:
+                latency = float(cassette_latency) / 1000
+            except ValueError:
+                latency = -1
+            if not 0 <= latency < float("inf"):
+                return RetVal(self.set_status(phantom.APP_ERROR, MSGOFFICE365_INVALID_CASSETTE_LATENCY), None)
+
+        try:
+            if cassette_mode == MSGOFFICE365_CASSETTE_MODE_RECORD:
+                adapter = self._cassette_recorder = RecordingAdapter(cassette_path, pool_maxsize=pool_maxsize)
+            else:
+                adapter = ReplayAdapter(cassette_path, latency=latency, pool_maxsize=pool_maxsize)
+        except Exception as e:
+            error_msg = _get_error_msg_from_exception(e, self)
+            return RetVal(self.set_status(phantom.APP_ERROR, MSGOFFICE365_CASSETTE_OPEN_ERROR.format(path=cassette_path, error=error_msg)), None)
+
+        self.debug_print("Cassette mode '{0}' with the cassette file {1}".format(cassette_mode, cassette_path))
+        return RetVal(phantom.APP_SUCCESS, adapter)
+
     def _get_fips_enabled(self):
         try:
             from phantom_common.install_info import is_fips_enabled
@@ -3560,6 +5375,7 @@ class Office365Connector(BaseConnector):
 
         # Save the state, this data is saved across actions and app upgrades
         self.save_state(self._state)
+        self._session.close()
         return phantom.APP_SUCCESS
 
 
@@ -15,7 +15,8 @@
 TC_STATUS_SLEEP = 2
 MSGOFFICE365_PER_PAGE_COUNT = 999
 MSGOFFICE365_UPLOAD_SESSION_CUTOFF = 3145728  # 3MB
-MSGOFFICE365_UPLOAD_LARGE_FILE_CUTOFF = 52428800  # 52MB
+MSGOFFICE365_UPLOAD_CHUNK_SIZE = 12 * 327680  # 3.75MB, upload session chunks must be a multiple of 320KB and less than 4MB
+MSGOFFICE365_UPLOAD_MAX_RETRY_AFTER = 300  # in seconds
 SPLUNK_SOAR_SYS_INFO_URL = "{url}rest/system_info"
 SPLUNK_SOAR_ASSET_INFO_URL = "{url}rest/asset/{asset_id}"
 SPLUNK_SOAR_CONTAINER_INFO_URL = "{url}rest/container/{container_id}"
@@ -74,6 +75,36 @@ MSGOFFICE365_NON_ADMIN_SCOPE_ERROR = "Please provide scope for non-admin access
 MSGOFFICE365_DEFAULT_REQUEST_TIMEOUT = 30  # in seconds
 MSGOFFICE365_DEFAULT_NUMBER_OF_RETRIES = 3
 MSGOFFICE365_DEFAULT_RETRY_WAIT_TIME = 60  # in seconds
+MSGOFFICE365_DEFAULT_MAX_CONCURRENT_REQUESTS = 4  # Outlook allows 4 concurrent requests per mailbox
+MSGOFFICE365_DEFAULT_CONNECTION_POOL_SIZE = 10
+MSGOFFICE365_DEFAULT_FOLDER_CACHE_TTL = 3600  # in seconds
+MSGOFFICE365_FOLDER_ID_CACHE = "folder_id_cache"
+MSGOFFICE365_DEFAULT_DIRECTORY_CACHE_TTL = 0  # in seconds, the directory snapshot is disabled by default
+MSGOFFICE365_DIRECTORY_CACHE_FILE = "{asset_id}_directory.db"
+MSGOFFICE365_HUNT_CHECKPOINTS = "hunt_checkpoints"
+MSGOFFICE365_HUNT_CHECKPOINT_INTERVAL = 50  # number of mailboxes searched between the progress checkpoints
+MSGOFFICE365_HUNT_CHECKPOINT_TTL = 7 * 24 * 60 * 60  # in seconds, the older checkpoints of the interrupted hunts are dropped
+# Dictionary fields of the state updated per entry by the actions running in parallel, they are merged entry by entry
+MSGOFFICE365_STATE_MERGED_FIELDS = [MSGOFFICE365_FOLDER_ID_CACHE, MSGOFFICE365_HUNT_CHECKPOINTS]
+MSGOFFICE365_STATE_CHECKPOINT_INTERVAL = 10  # minimum number of seconds between two saves of the progress of an action
+MSGOFFICE365_STATE_LOCK_TIMEOUT = 60  # maximum number of seconds to wait for the state lock held by another action
+MSGOFFICE365_STATE_LOCK_POLL_INTERVAL = 0.1
+MSGOFFICE365_DEBUG_DATA_MAX_SIZE = 4 * 1024  # maximum number of bytes of a failed response body kept in debug data
+MSGOFFICE365_PROFILE_CAPTURE_NONE = "none"
+MSGOFFICE365_PROFILE_CAPTURE_CPU = "cpu"
+MSGOFFICE365_PROFILE_CAPTURE_MEMORY = "memory"
+MSGOFFICE365_PROFILE_CAPTURE_ALL = "cpu and memory"
+MSGOFFICE365_PROFILE_CAPTURES = [
+    MSGOFFICE365_PROFILE_CAPTURE_NONE,
+    MSGOFFICE365_PROFILE_CAPTURE_CPU,
+    MSGOFFICE365_PROFILE_CAPTURE_MEMORY,
+    MSGOFFICE365_PROFILE_CAPTURE_ALL,
+]
+MSGOFFICE365_CASSETTE_MODE_NONE = "none"
+MSGOFFICE365_CASSETTE_MODE_RECORD = "record"
+MSGOFFICE365_CASSETTE_MODE_REPLAY = "replay"
+MSGOFFICE365_CASSETTE_MODES = [MSGOFFICE365_CASSETTE_MODE_NONE, MSGOFFICE365_CASSETTE_MODE_RECORD, MSGOFFICE365_CASSETTE_MODE_REPLAY]
+MSGOFFICE365_CASSETTE_LATENCY_RECORDED = "recorded"
 MSGOFFICE365_CONTAINER_DESCRIPTION = "Email ingested using MS Graph API - {last_modified_time}"
 MSGOFFICE365_HTTP_401_STATUS_CODE = "401"
 MSGOFFICE365_INVALID_CLIENT_ID_ERROR_CODE = "AADSTS700016"
@@ -108,6 +139,21 @@ MSGOFFICE365_DECRYPTION_ERROR = "Error occurred while decrypting the state file"
 MSGOFFICE365_UNEXPECTED_ACCESS_TOKEN_ERROR = "Found unexpected value of access token. Please run the test connectivity to generate a new token"
 MSGOFFICE365_INVALID_EMAIL = "Please provide a valid email-address in the 'identificator' parameter"
 MSGOFFICE365_INVALID_METHOD = "Please provide a valid method in the 'method' parameter"
+MSGOFFICE365_HUNT_NO_MAILBOXES = "Please provide the 'email_addresses' or the 'group_id' parameter"
+MSGOFFICE365_BULK_INVALID_MESSAGES = (
+    "Please provide a valid JSON list of objects containing the 'email_address' and 'id' keys in the 'messages' parameter"
+)
+MSGOFFICE365_BULK_OPERATIONS = ["move", "copy", "delete"]
+MSGOFFICE365_BULK_INVALID_OPERATION = "Please provide a valid value in the 'operation' parameter. Valid values are: {values}"
+MSGOFFICE365_BULK_FOLDER_REQUIRED = "Please provide the 'folder' parameter to {operation} the emails"
+MSGOFFICE365_BULK_SEND_INVALID_RECIPIENTS = (
+    "Please provide a valid JSON list of objects containing the 'to' key and the template substitutions in the 'recipients' parameter"
+)
+MSGOFFICE365_BULK_SEND_RECIPIENT_KEYS = ["to", "cc", "bcc"]
+MSGOFFICE365_BULK_SEND_INVALID_RECIPIENT = (
+    "Please provide valid comma-separated email addresses in the '{key}' key of the recipient at index {index} of the 'recipients' parameter"
+)
+MSGOFFICE365_HUNT_NO_CRITERIA = "Please provide at least one of the 'internet_message_id', 'sender', 'subject' or 'body' parameters"
 
 MSGOFFICE365_SELECT_PARAMETER_LIST = [
     "bccRecipients",
@@ -143,6 +189,75 @@ MSGOFFICE365_SELECT_PARAMETER_LIST = [
     "internetMessageId",
 ]
 
+# Projection profiles controlling which email fields are fetched and which artifacts are built from them
+# minimal - no body and headers, only the email artifact is created
+# standard - body without the duplicated uniqueBody and the headers, the email and IOC artifacts are created
+# forensic - every field, the email artifact with the headers and the IOC artifacts are created
+MSGOFFICE365_PROJECTION_PROFILE_MINIMAL = "minimal"
+MSGOFFICE365_PROJECTION_PROFILE_STANDARD = "standard"
+MSGOFFICE365_PROJECTION_PROFILE_FORENSIC = "forensic"
+MSGOFFICE365_PROJECTION_PROFILES = {
+    MSGOFFICE365_PROJECTION_PROFILE_MINIMAL: [
+        field for field in MSGOFFICE365_SELECT_PARAMETER_LIST if field not in ("body", "uniqueBody", "internetMessageHeaders")
+    ],
+    MSGOFFICE365_PROJECTION_PROFILE_STANDARD: [
+        field for field in MSGOFFICE365_SELECT_PARAMETER_LIST if field not in ("uniqueBody", "internetMessageHeaders")
+    ],
+    MSGOFFICE365_PROJECTION_PROFILE_FORENSIC: MSGOFFICE365_SELECT_PARAMETER_LIST,
+}
+MSGOFFICE365_DEFAULT_PROJECTION_PROFILE = MSGOFFICE365_PROJECTION_PROFILE_FORENSIC
+MSGOFFICE365_INVALID_PROJECTION_PROFILE = "Please provide a valid value in the 'projection_profile' {param}. Valid values are: {values}"
+MSGOFFICE365_INVALID_PROFILE_CAPTURE = "Please provide a valid value in the 'profile_capture' asset configuration. Valid values are: {values}"
+MSGOFFICE365_INVALID_CASSETTE_MODE = "Please provide a valid value in the 'cassette_mode' asset configuration. Valid values are: {values}"
+MSGOFFICE365_CASSETTE_PATH_ERROR = "Please provide the 'cassette_path' asset configuration to record or replay a cassette"
+MSGOFFICE365_INVALID_CASSETTE_LATENCY = (
+    "Please provide 'recorded' or a non-negative number of milliseconds in the 'cassette_latency' asset configuration"
+)
+MSGOFFICE365_CASSETTE_PATH_OUTSIDE_STATE_DIR = (
+    "Please provide a 'cassette_path' asset configuration inside the state directory of the app: {state_dir}"
+)
+MSGOFFICE365_CASSETTE_OPEN_ERROR = "Error occurred while opening the cassette file {path}. {error}"
+MSGOFFICE365_INVALID_DEBUG_SUBSYSTEMS = (
+    "Please provide valid subsystems in the 'debug_subsystems' asset configuration, unknown: {unknown}. Valid values are: {values}"
+)
+
+# Metadata of the attachments, the content is streamed separately from the '$value' endpoint
+MSGOFFICE365_ATTACHMENT_SELECT_PARAMETER_LIST = ["id", "name", "contentType", "size", "lastModifiedDateTime", "isInline"]
+# The get email output also lists the properties of the file attachments, without their contentBytes
+MSGOFFICE365_ATTACHMENT_DETAILS_SELECT_PARAMETER_LIST = MSGOFFICE365_ATTACHMENT_SELECT_PARAMETER_LIST + [
+    "microsoft.graph.fileAttachment/contentId",
+    "microsoft.graph.fileAttachment/contentLocation",
+]
+MSGOFFICE365_DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # in bytes
+
+MSGOFFICE365_PREFER_TEXT_BODY_HEADER = {"Prefer": 'outlook.body-content-type="text"'}
+
+# Lightweight projection used by the first phase of the two-phase on_poll fetch
+MSGOFFICE365_METADATA_SELECT_PARAMETER_LIST = ["id", "lastModifiedDateTime", "changeKey", "hasAttachments"]
+MSGOFFICE365_BATCH_REQUEST_LIMIT = 20  # maximum number of requests in a single JSON batch
+
+# Default properties of a user along with the mail and address properties returned by the resolve name action
+MSGOFFICE365_RESOLVE_NAME_SELECT_PARAMETER_LIST = [
+    "id",
+    "userPrincipalName",
+    "givenName",
+    "surname",
+    "displayName",
+    "mailNickname",
+    "mail",
+    "otherMails",
+    "proxyAddresses",
+    "jobTitle",
+    "officeLocation",
+    "mobilePhone",
+    "businessPhones",
+    "preferredLanguage",
+    "city",
+    "state",
+    "street",
+    "postalCode",
+]
+
 MSGOFFICE365_AUTH_TYPES = {"Automatic": "auto", "OAuth": "oauth", "Certificate Based Authentication(CBA)": "cba"}
 
 MSGOFFICE365_AUTH_AUTOMATIC = "Automatic"
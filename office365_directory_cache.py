@@ -0,0 +1,111 @@
+# File: office365_directory_cache.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import json
+import sqlite3
+import time
+
+
+class DirectoryCache:
+    """
+    Local snapshot of the users and groups of the tenant, stored in a SQLite database.
+    The snapshot is kept up to date by applying the changes returned by the MS Graph delta queries.
+    """
+
+    def __init__(self, db_path):
+        self._conn = sqlite3.connect(db_path)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS directory_objects "
+                "(kind TEXT NOT NULL, id TEXT NOT NULL, mail TEXT, data TEXT NOT NULL, PRIMARY KEY (kind, id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS directory_objects_mail ON directory_objects (kind, mail)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS directory_sync (kind TEXT PRIMARY KEY, delta_link TEXT, synced_at REAL)")
+
+    def close(self):
+        self._conn.close()
+
+    def get_sync_state(self, kind):
+        """
+        :param kind: Kind of the directory objects, 'users' or 'groups'
+        :return: delta link to fetch the next changes from, time of the last sync (None for both if the kind was never synced)
+        """
+        row = self._conn.execute("SELECT delta_link, synced_at FROM directory_sync WHERE kind = ?", (kind,)).fetchone()
+        return row if row else (None, None)
+
+    def is_fresh(self, kind, max_age):
+        _, synced_at = self.get_sync_state(kind)
+        return synced_at is not None and time.time() - synced_at <= max_age
+
+    def clear(self, kind):
+        with self._conn:
+            self._conn.execute("DELETE FROM directory_objects WHERE kind = ?", (kind,))
+            self._conn.execute("DELETE FROM directory_sync WHERE kind = ?", (kind,))
+
+    def apply_changes(self, kind, changes, delta_link):
+        """
+        This function applies a page of delta query changes to the snapshot. The delta link of the next round is returned
+        with the last page only, it marks the snapshot as synced.
+        The updated objects only contain their changed properties, so they are merged into the stored ones. The annotations
+        and the '@delta' properties, e.g. the member changes of the groups, are not part of the objects and are not stored.
+
+        :param kind: Kind of the directory objects, 'users' or 'groups'
+        :param changes: List of the changed objects returned by the delta query
+        :param delta_link: Delta link returned with the last page of the changes, None for the other pages
+        """
+        with self._conn:
+            for change in changes:
+                if "@removed" in change:
+                    self._conn.execute("DELETE FROM directory_objects WHERE kind = ? AND id = ?", (kind, change["id"]))
+                    continue
+
+                row = self._conn.execute("SELECT data FROM directory_objects WHERE kind = ? AND id = ?", (kind, change["id"])).fetchone()
+                data = json.loads(row[0]) if row else dict()
+                data.update({key: value for key, value in change.items() if not key.startswith("@") and "@delta" not in key})
+
+                mail = (data.get("mail") or "").lower() or None
+                self._conn.execute(
+                    "INSERT INTO directory_objects (kind, id, mail, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (kind, id) DO UPDATE SET mail = excluded.mail, data = excluded.data",
+                    (kind, data["id"], mail, json.dumps(data)),
+                )
+
+            if not delta_link:
+                return
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO directory_sync (kind, delta_link, synced_at) VALUES (?, ?, ?)",
+                (kind, delta_link, time.time()),
+            )
+
+    def list(self, kind, limit=None):
+        """
+        :param kind: Kind of the directory objects, 'users' or 'groups'
+        :param limit: Maximum number of objects to return
+        :return: list of the objects of the kind, in the order they were first synced
+        """
+        cursor = self._conn.execute("SELECT data FROM directory_objects WHERE kind = ? ORDER BY rowid LIMIT ?", (kind, limit or -1))
+        return [json.loads(row[0]) for row in cursor]
+
+    def find_by_mail(self, kind, mail, limit=None):
+        """
+        :param kind: Kind of the directory objects, 'users' or 'groups'
+        :param mail: Email address of the objects, case-insensitive
+        :param limit: Maximum number of objects to return
+        :return: list of the objects of the kind with the email address, in the order they were first synced
+        """
+        cursor = self._conn.execute(
+            "SELECT data FROM directory_objects WHERE kind = ? AND mail = ? ORDER BY rowid LIMIT ?", (kind, mail.lower(), limit or -1)
+        )
+        return [json.loads(row[0]) for row in cursor]
@@ -0,0 +1,65 @@
+# File: office365_logging.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+
+# Subsystems whose verbose debug messages can be enabled with the 'debug_subsystems' asset configuration
+DEBUG_SUBSYSTEMS = ("state", "ingestion", "email_parsing", "artifacts", "vault")
+DEBUG_SUBSYSTEMS_ALL = "all"
+
+
+def parse_debug_subsystems(value):
+    """
+    :param value: Comma separated list of subsystems, or 'all'
+    :return: set of the enabled subsystems, list of the unknown subsystems
+    """
+    names = [name.strip().lower() for name in (value or "").split(",") if name.strip()]
+    unknown = [name for name in names if name not in DEBUG_SUBSYSTEMS and name != DEBUG_SUBSYSTEMS_ALL]
+    if DEBUG_SUBSYSTEMS_ALL in names:
+        return set(DEBUG_SUBSYSTEMS), unknown
+
+    return {name for name in names if name in DEBUG_SUBSYSTEMS}, unknown
+
+
+class DebugLogger:
+    """
+    Verbose debug messages of the app, enabled per subsystem.
+    A message is formatted with its arguments only when its subsystem is enabled, so a disabled message costs
+    a set lookup in the hot paths of the ingestion.
+    """
+
+    def __init__(self, connector=None, subsystems=()):
+        self._connector = connector
+        self._subsystems = frozenset(subsystems)
+
+    def is_enabled(self, subsystem):
+        return self._connector is not None and subsystem in self._subsystems
+
+    def debug(self, subsystem, msg, *args):
+        """
+        :param subsystem: Subsystem of the message, one of DEBUG_SUBSYSTEMS
+        :param msg: Message, with str.format placeholders for the arguments
+        :param args: Arguments of the message
+        """
+        if not self.is_enabled(subsystem):
+            return
+
+        self._connector.debug_print(msg.format(*args) if args else msg)
+
+
+def get_debug_logger(connector):
+    """
+    :param connector: Connector object, or None
+    :return: debug logger of the connector, a disabled one if the connector has none
+    """
+    return getattr(connector, "debug_logger", None) or DebugLogger()
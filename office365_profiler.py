@@ -0,0 +1,152 @@
+# File: office365_profiler.py
+#
+# Copyright (c) 2017-2024 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import cProfile
+import functools
+import math
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class PerformanceProfile:
+    """
+    Counts, durations and bytes of the hot paths of an action, aggregated per name.
+    The durations are inclusive, e.g. the duration of a paginator contains the durations of its REST calls.
+    A disabled profile records nothing.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._durations = dict()
+        self._bytes = dict()
+        self._lock = threading.Lock()
+
+    def record(self, name, duration):
+        with self._lock:
+            self._durations.setdefault(name, []).append(duration)
+
+    def add_bytes(self, name, size):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._bytes[name] = self._bytes.get(name, 0) + size
+
+    @contextmanager
+    def measure(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def get_summary(self):
+        """
+        :return: dictionary of the count, total and 95th percentile durations in milliseconds, and bytes of every name
+        """
+        summary = dict()
+        with self._lock:
+            for name, durations in sorted(self._durations.items()):
+                durations = sorted(durations)
+                summary[name] = {
+                    "count": len(durations),
+                    "total_ms": round(sum(durations) * 1000, 1),
+                    "p95_ms": round(durations[math.ceil(len(durations) * 0.95) - 1] * 1000, 1),
+                }
+            for name, size in sorted(self._bytes.items()):
+                summary.setdefault(name, {})["bytes"] = size
+
+        return summary
+
+
+def profiled(name):
+    """
+    Decorator recording the duration of a connector method in the performance profile of the connector.
+
+    :param name: Name the durations are aggregated under
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.performance_profile.measure(name):
+                return func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class ActionCapture:
+    """
+    cProfile and tracemalloc capture of a whole action.
+    cProfile only profiles the thread running the action, the work done by the worker threads of the concurrent requests
+    is accounted to the waits of that thread. tracemalloc traces the allocations of all the threads.
+    """
+
+    TRACEMALLOC_FRAMES = 10
+    TOP_ALLOCATIONS = 50
+
+    def __init__(self, cpu=False, memory=False):
+        self._cpu = cpu
+        self._memory = memory
+        self._profiler = None
+        self._snapshot = None
+        self._peak_memory = None
+
+    def start(self):
+        if self._memory:
+            tracemalloc.start(self.TRACEMALLOC_FRAMES)
+        if self._cpu:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        if self._profiler:
+            self._profiler.disable()
+        if self._memory:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def write(self, directory, prefix):
+        """
+        :param directory: Directory to write the files in
+        :param prefix: Prefix of the file names
+        :return: list of the paths of the written files, a pstats dump for cpu and a text report of the top allocations for memory
+        """
+        file_paths = []
+        if self._profiler:
+            file_path = os.path.join(directory, "{0}.pstats".format(prefix))
+            self._profiler.dump_stats(file_path)
+            file_paths.append(file_path)
+
+        if self._snapshot:
+            file_path = os.path.join(directory, "{0}_allocations.txt".format(prefix))
+            with open(file_path, "w") as report:
+                report.write("Peak traced memory: {0} bytes\n\n".format(self._peak_memory))
+                for index, stat in enumerate(self._snapshot.statistics("traceback")[: self.TOP_ALLOCATIONS]):
+                    report.write("#{0}: {1} blocks, {2} bytes\n".format(index + 1, stat.count, stat.size))
+                    report.write("\n".join(stat.traceback.format()))
+                    report.write("\n\n")
+            file_paths.append(file_path)
+
+        return file_paths
@@ -37,6 +37,7 @@ from phantom.vault import Vault
 from requests.structures import CaseInsensitiveDict
 
 from office365_consts import MSGOFFICE365_ERROR_MSG_UNAVAILABLE
+from office365_logging import get_debug_logger
 
 _container_common = {"run_automation": False}  # Don't run any playbooks, when this artifact is added
 
@@ -161,6 +162,7 @@ class ProcessEmail(object):
     def __init__(self, base_connector, config):
 
         self._base_connector = base_connector
+        self._logger = get_debug_logger(base_connector)
         self._config = config
         self._email_id_contains = list()
         self._container = dict()
@@ -447,7 +449,7 @@ class ProcessEmail(object):
             artifact["source_data_identifier"] = start_index + added_artifacts
             artifact["cef"] = item
             artifact["name"] = artifact_name
-            self._debug_print("Artifact:", artifact)
+            self._logger.debug("artifacts", "Artifact: {0}", artifact)
             artifacts.append(artifact)
             added_artifacts += 1
 
@@ -732,7 +734,7 @@ class ProcessEmail(object):
         # Remove any chars that we don't want in the name
         file_path = "{0}/{1}_{2}_{3}".format(tmp_dir, part_index, file_name.replace("<", "").replace(">", "").replace(" ", ""), child)
 
-        self._debug_print("file_path: {0}".format(file_path))
+        self._logger.debug("email_parsing", "file_path: {0}", file_path)
 
         # is the part representing the body of the email
         status, process_further = self._handle_if_body(content_disp, content_id, content_type, part, bodies, file_path)
@@ -922,8 +924,8 @@ class ProcessEmail(object):
                 elif message_id and part.get("Message-ID"):
                     child = True
 
-                self._debug_print("part: {0}".format(part.__dict__))
-                self._debug_print("part type", type(part))
+                self._logger.debug("email_parsing", "part: {0}", part.__dict__)
+                self._logger.debug("email_parsing", "part type: {0}", type(part))
                 if part.is_multipart():
                     continue
                 try:
@@ -1060,13 +1062,20 @@ class ProcessEmail(object):
             for artifact in artifacts:
                 artifact["container_id"] = cid
             ret_val, msg, ids = self._base_connector.save_artifacts(artifacts)
-            self._base_connector.debug_print("save_artifacts returns, value: {0}, reason: {1}".format(ret_val, msg))
+            # The failures are always logged, only the success messages are gated
+            if phantom.is_fail(ret_val):
+                self._base_connector.debug_print("save_artifacts returns, value: {0}, reason: {1}".format(ret_val, msg))
+            else:
+                self._logger.debug("artifacts", "save_artifacts returns, value: {0}, reason: {1}", ret_val, msg)
 
         else:
             ret_val, msg, cid = self._base_connector.save_container(container)
-            self._base_connector.debug_print(
-                "save_container (with artifacts) returns, value: {0}, reason: {1}, id: {2}".format(ret_val, msg, cid)
-            )
+            if phantom.is_fail(ret_val):
+                self._base_connector.debug_print(
+                    "save_container (with artifacts) returns, value: {0}, reason: {1}, id: {2}".format(ret_val, msg, cid)
+                )
+            else:
+                self._logger.debug("artifacts", "save_container (with artifacts) returns, value: {0}, reason: {1}, id: {2}", ret_val, msg, cid)
 
         return ret_val, msg, cid
 
@@ -1232,7 +1241,7 @@ class ProcessEmail(object):
         if not file_name:
             file_name = os.path.basename(local_file_path)
 
-        self._base_connector.debug_print("Vault file name: {0}".format(file_name))
+        self._logger.debug("vault", "Vault file name: {0}", file_name)
 
         vault_attach_dict[phantom.APP_JSON_ACTION_NAME] = self._base_connector.get_action_name()
         vault_attach_dict[phantom.APP_JSON_APP_RUN_ID] = self._base_connector.get_app_run_id()
@@ -1284,7 +1293,12 @@ class ProcessEmail(object):
             cef_artifact["parentSourceDataIdentifier"] = self._guid_to_hash[parent_guid]
 
         ret_val, status_string, artifact_id = self._base_connector.save_artifact(artifact)
-        self._base_connector.debug_print("save_artifact returns, value: {0}, reason: {1}, id: {2}".format(ret_val, status_string, artifact_id))
+        if phantom.is_fail(ret_val):
+            self._base_connector.debug_print(
+                "save_artifact returns, value: {0}, reason: {1}, id: {2}".format(ret_val, status_string, artifact_id)
+            )
+        else:
+            self._logger.debug("artifacts", "save_artifact returns, value: {0}, reason: {1}, id: {2}", ret_val, status_string, artifact_id)
 
         return (phantom.APP_SUCCESS, ret_val)
 
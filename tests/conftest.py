@@ -0,0 +1,67 @@
+# File: tests/conftest.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""
+The tests run the connector offline, with the SOAR platform modules replaced by the in-memory stand-in of the
+benchmarks (benchmarks/soar_stub.py) and the Graph API served by the mock server (benchmarks/mock_graph.py).
+"""
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path[:0] = [REPO_DIR, os.path.join(REPO_DIR, "benchmarks")]
+
+import pytest  # noqa: E402
+import soar_stub  # noqa: E402
+from mock_graph import MailboxSpec, MockGraphServer  # noqa: E402
+from on_poll import ASSET_CONFIG  # noqa: E402
+
+import office365_connector  # noqa: E402
+
+
+@pytest.fixture
+def graph_server(monkeypatch):
+    """
+    :return: function starting a mock Graph server serving a mailbox of the given MailboxSpec fields
+    """
+    servers = []
+
+    def start(**spec):
+        server = MockGraphServer(MailboxSpec(**spec)).__enter__()
+        servers.append(server)
+        monkeypatch.setattr(office365_connector, "MSGRAPH_API_URL", server.url)
+        return server
+
+    yield start
+    for server in servers:
+        server.__exit__(None, None, None)
+
+
+@pytest.fixture
+def new_connector():
+    """
+    :return: function creating an initialized connector running the given action with the given asset configuration
+    """
+    soar_stub.VAULT.clear()
+
+    def create(action="on_poll", state=None, **config):
+        connector = office365_connector.Office365Connector()
+        connector.config = dict(ASSET_CONFIG, **config)
+        connector.action_identifier = action
+        connector.state = {"admin_consent": True, "admin_auth": {"access_token": "test"}} if state is None else state
+        assert connector.initialize(), connector.get_status_message()
+        return connector
+
+    return create
@@ -0,0 +1,106 @@
+# File: tests/test_attachments.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import os
+import threading
+
+import phantom.app as phantom
+import soar_stub
+from phantom.action_result import ActionResult
+
+import office365_connector
+
+ATTACHMENTS = 6
+
+
+def _extract_first_email_attachments(connector):
+    """
+    :return: status of the extraction of the attachments of the first message of the mailbox, and the artifacts
+    """
+    endpoint = "/users/{0}/messages/AAMkAGI2-00000000/attachments".format(connector.get_config()["email_address"])
+    action_result = ActionResult()
+    ret_val, response = connector._make_rest_call_helper(action_result, endpoint)
+    assert ret_val, action_result.get_message()
+
+    artifacts = []
+    ret_val = connector._extract_attachments(
+        connector.get_config(), endpoint, artifacts, action_result, response["value"], container_id=1, first_time=True
+    )
+    return ret_val, artifacts
+
+
+def test_prefetched_attachments_are_added_to_the_vault(graph_server, new_connector):
+    graph_server(messages=1, attachments=ATTACHMENTS, attachment_size=1024)
+    connector = new_connector(max_concurrent_requests=4)
+
+    ret_val, artifacts = _extract_first_email_attachments(connector)
+
+    assert ret_val
+    assert len(artifacts) == ATTACHMENTS
+    assert len(soar_stub.VAULT) == ATTACHMENTS
+    assert os.listdir(soar_stub.VAULT_TMP_DIR) == []
+
+
+def test_prefetched_attachments_are_removed_on_early_return(graph_server, new_connector, monkeypatch):
+    graph_server(messages=1, attachments=ATTACHMENTS, attachment_size=1024)
+    connector = new_connector(max_concurrent_requests=4)
+    added = []
+
+    def add_file_to_vault(attachment, container_id, tmp_file_path):
+        # The second attachment fails, the content of the following ones was already fetched
+        if added:
+            return phantom.APP_ERROR, None
+        added.append(tmp_file_path)
+        return office365_connector.Office365Connector._add_file_to_vault(connector, attachment, container_id, tmp_file_path)
+
+    monkeypatch.setattr(connector, "_add_file_to_vault", add_file_to_vault)
+
+    ret_val, _ = _extract_first_email_attachments(connector)
+
+    assert not ret_val
+    assert len(soar_stub.VAULT) == 1
+    assert os.listdir(soar_stub.VAULT_TMP_DIR) == []
+
+
+def test_prefetched_attachments_are_removed_on_worker_exception(graph_server, new_connector, monkeypatch):
+    graph_server(messages=1, attachments=ATTACHMENTS, attachment_size=1024)
+    connector = new_connector(max_concurrent_requests=4)
+    download_to_file = connector._download_to_file
+    downloads = []
+    lock = threading.Lock()
+
+    def failing_download_to_file(action_result, url, file_obj):
+        with lock:
+            downloads.append(url)
+            if len(downloads) == 3:
+                raise OSError("No space left on device")
+        return download_to_file(action_result, url, file_obj)
+
+    monkeypatch.setattr(connector, "_download_to_file", failing_download_to_file)
+
+    ret_val, _ = _extract_first_email_attachments(connector)
+
+    assert not ret_val
+    assert len(downloads) == ATTACHMENTS
+    assert os.listdir(soar_stub.VAULT_TMP_DIR) == []
+
+
+def test_payload_bytes_of_concurrent_downloads(graph_server, new_connector):
+    server = graph_server(messages=1, attachments=ATTACHMENTS, attachment_size=64 * 1024)
+    connector = new_connector(max_concurrent_requests=4)
+
+    ret_val, _ = _extract_first_email_attachments(connector)
+
+    assert ret_val
+    assert connector._payload_bytes == server.graph.stats["bytes"]
@@ -0,0 +1,58 @@
+# File: tests/test_bulk_remediate_email.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import json
+import time
+
+from office365_consts import MSGOFFICE365_FOLDER_ID_CACHE
+
+MAILBOXES = ["first@example.com", "second@example.com"]
+MESSAGES = [{"email_address": mailbox, "id": "AAMkAGI2-0000000{0}".format(index)} for mailbox in MAILBOXES for index in range(2)]
+
+
+def _move(connector, get_folder_id):
+    param = {"operation": "move", "folder": "Archive", "get_folder_id": get_folder_id, "messages": json.dumps(MESSAGES)}
+    connector._handle_bulk_remediate_email(param)
+    return connector.get_action_results()[-1]
+
+
+def test_not_found_folder_id_is_not_resolved_again(graph_server, new_connector):
+    # The mock server does not know the move operation, every request of the batches fails with 404
+    server = graph_server(messages=2, attachments=0)
+    connector = new_connector(action="bulk_remediate_email", max_concurrent_requests=2)
+
+    action_result = _move(connector, get_folder_id=False)
+
+    assert action_result.get_summary()["failed_emails"] == len(MESSAGES)
+    assert server.graph.stats["batch"] == len(MAILBOXES)
+
+
+def test_not_found_cached_folder_id_is_resolved_again(graph_server, new_connector):
+    server = graph_server(messages=2, attachments=0)
+    now = int(time.time())
+    state = {
+        "admin_consent": True,
+        "admin_auth": {"access_token": "test"},
+        MSGOFFICE365_FOLDER_ID_CACHE: {mailbox: {"archive": {"id": "deleted-folder", "time": now}} for mailbox in MAILBOXES},
+    }
+    connector = new_connector(action="bulk_remediate_email", state=state, max_concurrent_requests=2)
+
+    action_result = _move(connector, get_folder_id=True)
+
+    # The stale entries are dropped and the folders are looked up again, the mock server does not serve the folders
+    assert action_result.get_summary()["failed_emails"] == len(MESSAGES)
+    assert action_result.get_summary()["folder_cache_hits"] == len(MAILBOXES)
+    assert server.graph.stats["batch"] == len(MAILBOXES)
+    assert server.graph.stats["not_found"] == len(MAILBOXES)
+    assert connector._state[MSGOFFICE365_FOLDER_ID_CACHE] == {mailbox: {} for mailbox in MAILBOXES}
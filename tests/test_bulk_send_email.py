@@ -0,0 +1,81 @@
+# File: tests/test_bulk_send_email.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import json
+
+import phantom.app as phantom
+
+BULK_SEND_PARAM = {"subject": "Incident ${incident}", "body": "<p>Dear ${name}</p>"}
+
+
+def _bulk_send(connector, monkeypatch, recipients):
+    sent = []
+
+    def send_mail(action_result, from_email, msg, vault_infos):
+        if msg["toRecipients"][0]["emailAddress"]["address"] == "broken@example.com":
+            raise ValueError("connection reset")
+        sent.append(msg)
+        return phantom.APP_SUCCESS
+
+    monkeypatch.setattr(connector, "_send_mail", send_mail)
+    connector._handle_bulk_send_email(dict(BULK_SEND_PARAM, recipients=json.dumps(recipients)))
+    return connector.get_action_results()[-1], sent
+
+
+def test_invalid_recipients_fail_before_sending(new_connector, monkeypatch):
+    connector = new_connector(action="bulk_send_email")
+    recipients = [
+        {"to": "first@example.com", "name": "First", "incident": 1},
+        {"to": "second@example.com", "bcc": "not an address", "name": "Second", "incident": 2},
+    ]
+
+    action_result, sent = _bulk_send(connector, monkeypatch, recipients)
+
+    assert not action_result.get_status()
+    assert "'bcc' key of the recipient at index 1" in action_result.get_message()
+    assert sent == []
+
+
+def test_recipient_exceptions_are_reported_as_failures(new_connector, monkeypatch):
+    connector = new_connector(action="bulk_send_email")
+    recipients = [
+        {"to": "broken@example.com", "name": "Broken", "incident": 1},
+        {"to": "second@example.com", "cc": "cc@example.com", "bcc": "bcc@example.com", "name": "<b>Second</b>", "incident": 2},
+    ]
+
+    action_result, sent = _bulk_send(connector, monkeypatch, recipients)
+
+    assert action_result.get_status()
+    assert action_result.get_summary()["failed_recipients"] == 1
+    assert action_result.get_data()[0]["status"] == "failed"
+    assert "connection reset" in action_result.get_data()[0]["message"]
+    assert sent[0]["subject"] == "Incident 2"
+    assert sent[0]["body"]["content"] == "<p>Dear &lt;b&gt;Second&lt;/b&gt;</p>"
+    assert sent[0]["bccRecipients"] == [{"emailAddress": {"address": "bcc@example.com"}}]
+
+
+def test_literal_dollar_and_empty_optional_recipients(new_connector, monkeypatch):
+    connector = new_connector(action="bulk_send_email")
+    monkeypatch.setitem(BULK_SEND_PARAM, "subject", "$100 invoice for incident ${incident}")
+    recipients = [
+        {"to": "first@example.com", "cc": "", "bcc": "  ", "name": "First", "incident": 1},
+        {"to": "second@example.com", "cc": None, "name": "Second", "incident": 2},
+    ]
+
+    action_result, sent = _bulk_send(connector, monkeypatch, recipients)
+
+    assert action_result.get_status(), action_result.get_message()
+    assert action_result.get_summary()["failed_recipients"] == 0
+    assert [msg["subject"] for msg in sent] == ["$100 invoice for incident 1", "$100 invoice for incident 2"]
+    assert all(not msg.get("ccRecipients") and not msg.get("bccRecipients") for msg in sent)
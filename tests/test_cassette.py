@@ -0,0 +1,165 @@
+# File: tests/test_cassette.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import json
+import os
+import uuid
+
+import requests
+import soar_stub
+from on_poll import run_on_poll
+
+from office365_cassette import REDACTED, RecordingAdapter, _get_request_key, read_cassette_header, sanitize, sanitize_config, sanitize_url
+
+USER_ID = "4f1b8c2e-3a5d-4e6f-9a7b-8c9d0e1f2a3b"
+
+RESOLVE_NAME_RESPONSE = {
+    "@odata.context": "https://graph.microsoft.com/v1.0/$metadata#users",
+    "value": [
+        {
+            "id": USER_ID,
+            "displayName": "Jane Doe",
+            "givenName": "Jane",
+            "surname": "Doe",
+            "mail": "jane.doe@contoso.com",
+            "userPrincipalName": "jane.doe@contoso.com",
+            "mobilePhone": "+1 415 555 0100",
+            "businessPhones": ["+1 425 555 0199"],
+            "streetAddress": "1 Market Street",
+            "jobTitle": "Chief Financial Officer",
+            "officeLocation": "Building 7",
+        }
+    ],
+}
+
+PERSONAL_VALUES = ["Jane", "Doe", "jane.doe", "contoso", "415 555", "425 555", "Market", "Financial", "Building"]
+
+
+def test_sanitize_resolve_name_masks_personal_fields():
+    sanitized = sanitize(RESOLVE_NAME_RESPONSE)
+    text = json.dumps(sanitized)
+
+    for value in PERSONAL_VALUES:
+        assert value not in text
+
+    user = sanitized["value"][0]
+    assert sanitized["@odata.context"] == RESOLVE_NAME_RESPONSE["@odata.context"]
+    assert user["id"] == USER_ID
+    assert set(user) == set(RESOLVE_NAME_RESPONSE["value"][0])
+    # The masked values keep their size, and the email addresses are replaced with consistent pseudonyms
+    assert len(user["streetAddress"]) == len("1 Market Street")
+    assert user["mail"] == user["userPrincipalName"]
+    assert user["mail"].endswith(".invalid")
+
+
+def test_sanitize_redacts_state_secrets():
+    state = {
+        "code": "0.AXEA-authorization-code",
+        "token": {"access_token": "eyJ0eXAi", "refresh_token": "0.AXEA"},
+        "last_time": "2026-01-01T00:00:00Z",
+    }
+
+    sanitized = sanitize(state)
+
+    assert sanitized["code"] == REDACTED
+    assert sanitized["token"] == {"access_token": REDACTED, "refresh_token": REDACTED}
+    assert sanitized["last_time"] == state["last_time"]
+
+
+def test_sanitize_keeps_error_codes():
+    response = {
+        "error": {"code": "ErrorItemNotFound", "message": "The specified object was not found in the store.", "innerError": {"date": "x"}}
+    }
+
+    assert sanitize(response) == response
+
+
+def test_sanitize_url_masks_query_values():
+    url = (
+        "https://graph.microsoft.com/v1.0/users/soc@contoso.com/messages"
+        "?$top=50&$select=id,subject&$search=%22subject:invoice%22&$skiptoken=MSZZVlkxMjM0"
+    )
+
+    sanitized = sanitize_url(url)
+
+    assert "contoso" not in sanitized
+    assert "invoice" not in sanitized
+    assert "MSZZVlkxMjM0" not in sanitized
+    assert "$top=50&$select=id,subject&$search=" in sanitized
+    assert "&$skiptoken=" in sanitized
+    assert sanitize_url(sanitized) == sanitized
+
+
+def test_sanitized_upload_url_matches_its_request():
+    upload_url = "https://outlook.office.com/api/v2.0/Users('soc@contoso.com')/Messages('AAMk')/AttachmentSessions('AAMk')?authtoken=eyJ0eXAi"
+    recorded = requests.Request("PUT", upload_url, data=b"chunk").prepare()
+
+    replayed_url = sanitize({"uploadUrl": upload_url})["uploadUrl"]
+    replayed = requests.Request("PUT", replayed_url, data=b"chunk").prepare()
+
+    assert "eyJ0eXAi" not in replayed_url
+    assert "contoso" not in replayed_url
+    assert _get_request_key(replayed) == _get_request_key(recorded)
+
+
+def test_recorded_location_header_is_sanitized(monkeypatch, tmp_path):
+    response = requests.Response()
+    response.status_code = 201
+    response._content = b""
+    response.headers["Location"] = "https://graph.microsoft.com/v1.0/users('soc@contoso.com')/messages('AAMk')"
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, "send", lambda *args, **kwargs: response)
+    path = str(tmp_path / "cassette.jsonl")
+    adapter = RecordingAdapter(path)
+    adapter.send(requests.Request("POST", "https://graph.microsoft.com/v1.0/users/soc@contoso.com/messages").prepare())
+    adapter.close()
+
+    with open(path) as cassette:
+        interaction = json.loads(cassette.readline())
+
+    assert "contoso" not in json.dumps(interaction)
+    assert interaction["headers"]["Location"] == sanitize_url(response.headers["Location"])
+
+
+def test_sanitize_config_keeps_settings():
+    config = {"tenant": "contoso.onmicrosoft.com", "client_secret": "secret", "email_address": "soc@contoso.com", "folder": "Inbox"}
+
+    sanitized = sanitize_config(config)
+
+    assert sanitized["client_secret"] == REDACTED
+    assert sanitized["folder"] == "Inbox"
+    assert sanitized["tenant"] == config["tenant"]
+    assert "contoso" not in sanitized["email_address"]
+
+
+def test_recorded_on_poll_is_replayed_offline(graph_server, new_connector):
+    server = graph_server(messages=10, body_size=2048, attachments=1, attachment_size=1024, item_attachments=1)
+    name = "cassette_{0}".format(uuid.uuid4().hex)
+    recorded = run_on_poll(server, {"cassette_mode": "record", "cassette_path": "{0}.jsonl".format(name)})
+    cassette_path = os.path.join(soar_stub.STATE_DIR, "{0}_on_poll_1.jsonl".format(name))
+
+    with open(cassette_path) as cassette:
+        text = cassette.read()
+    assert "example.com" not in text
+    assert "example.org" not in text
+
+    header = read_cassette_header(cassette_path)
+    config = dict(header["config"], cassette_mode="replay", cassette_path=os.path.basename(cassette_path), cassette_latency="0")
+    connector = new_connector(action=header["action"], state=header["state"], **config)
+    connector.handle_action(header["param"])
+
+    adapter = connector._session.get_adapter("https://")
+    assert connector.get_action_results()[-1].get_status()
+    assert adapter.missed == 0
+    assert len(connector.containers) == recorded["emails"]
+    assert len(connector.artifacts) == recorded["artifacts"]
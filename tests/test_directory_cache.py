@@ -0,0 +1,43 @@
+# File: tests/test_directory_cache.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+from office365_directory_cache import DirectoryCache
+
+
+def test_delta_properties_are_not_stored(tmp_path):
+    cache = DirectoryCache(str(tmp_path / "directory.db"))
+    changes = [
+        {
+            "@odata.type": "#microsoft.graph.group",
+            "id": "group1",
+            "displayName": "Security",
+            "mail": "Security@example.com",
+            "members@delta": [{"@odata.type": "#microsoft.graph.user", "id": "user1"}],
+        }
+    ]
+
+    cache.apply_changes("groups", changes, "https://graph.microsoft.com/v1.0/groups/delta?$deltatoken=1")
+
+    assert cache.list("groups") == [{"id": "group1", "displayName": "Security", "mail": "Security@example.com"}]
+    cache.close()
+
+
+def test_find_by_mail_honors_the_limit(tmp_path):
+    cache = DirectoryCache(str(tmp_path / "directory.db"))
+    changes = [{"id": "group{0}".format(index), "mail": "shared@example.com"} for index in range(3)]
+    cache.apply_changes("groups", changes, None)
+
+    assert [group["id"] for group in cache.find_by_mail("groups", "SHARED@example.com", limit=2)] == ["group0", "group1"]
+    assert len(cache.find_by_mail("groups", "shared@example.com")) == 3
+    cache.close()
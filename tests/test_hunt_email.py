@@ -0,0 +1,94 @@
+# File: tests/test_hunt_email.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import time
+
+from phantom.action_result import ActionResult
+
+from office365_consts import MSGOFFICE365_HUNT_CHECKPOINT_TTL, MSGOFFICE365_HUNT_CHECKPOINTS
+
+MAILBOXES = ["first@example.com", "second@example.com", "third@example.com"]
+HUNT_PARAM = {"email_addresses": ",".join(MAILBOXES), "subject": "Benchmark", "limit": 2}
+
+
+def _hunt(connector, **param):
+    connector._handle_hunt_email(dict(HUNT_PARAM, **param))
+    action_result = connector.get_action_results()[-1]
+    return action_result, sorted((message["email_address"], message["id"]) for message in action_result.get_data())
+
+
+def _fail_mailbox(connector, monkeypatch, failed_mailbox):
+    paginator = connector._paginator
+
+    def fail_paginator(action_result, endpoint, *args, **kwargs):
+        if failed_mailbox in endpoint:
+            return action_result.set_status(False, "Mailbox unavailable"), None
+        return paginator(action_result, endpoint, *args, **kwargs)
+
+    monkeypatch.setattr(connector, "_paginator", fail_paginator)
+
+
+def test_resumed_hunt_returns_the_matches_of_the_interrupted_run(graph_server, new_connector, monkeypatch):
+    graph_server(messages=5, attachments=0)
+    connector = new_connector(action="hunt_email", max_concurrent_requests=2)
+    _fail_mailbox(connector, monkeypatch, MAILBOXES[2])
+
+    action_result, interrupted_matches = _hunt(connector)
+
+    assert action_result.get_summary()["mailboxes_failed"] == 1
+    assert len(interrupted_matches) == 4
+    state = connector._state
+
+    connector = new_connector(action="hunt_email", state=state, max_concurrent_requests=2)
+    action_result, matches = _hunt(connector, resume=True)
+
+    assert action_result.get_status()
+    assert action_result.get_summary()["mailboxes_skipped"] == 2
+    assert action_result.get_summary()["mailboxes_searched"] == 1
+    assert set(interrupted_matches) < set(matches)
+    assert len(matches) == 6
+    # The checkpoint of the completed hunt is removed
+    assert connector._state[MSGOFFICE365_HUNT_CHECKPOINTS] == {}
+
+
+def test_expired_hunt_checkpoints_are_ignored(graph_server, new_connector, monkeypatch):
+    graph_server(messages=5, attachments=0)
+    connector = new_connector(action="hunt_email")
+    _fail_mailbox(connector, monkeypatch, MAILBOXES[2])
+    _hunt(connector)
+    state = connector._state
+    for checkpoint in state[MSGOFFICE365_HUNT_CHECKPOINTS].values():
+        checkpoint["time"] = time.time() - MSGOFFICE365_HUNT_CHECKPOINT_TTL - 1
+
+    connector = new_connector(action="hunt_email", state=state)
+    action_result, matches = _hunt(connector, resume=True)
+
+    assert action_result.get_summary()["mailboxes_skipped"] == 0
+    assert action_result.get_summary()["mailboxes_searched"] == 3
+    assert len(matches) == 6
+
+
+def test_get_checkpoint_messages_skips_the_deleted_messages(graph_server, new_connector):
+    graph_server(messages=2, attachments=0)
+    connector = new_connector(action="hunt_email")
+
+    ret_val, messages = connector._get_checkpoint_messages(
+        ActionResult(), {MAILBOXES[0]: ["AAMkAGI2-00000001"], MAILBOXES[1]: ["AAMkAGI2-00000000", "AAMkAGI2-00000002"]}
+    )
+
+    assert ret_val
+    assert [(message["email_address"], message["id"]) for message in messages] == [
+        (MAILBOXES[0], "AAMkAGI2-00000001"),
+        (MAILBOXES[1], "AAMkAGI2-00000000"),
+    ]
@@ -0,0 +1,112 @@
+# File: tests/test_state.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import json
+import threading
+import time
+
+import pytest
+import soar_stub
+
+import office365_connector
+from office365_consts import MSGOFFICE365_FOLDER_ID_CACHE, MSGOFFICE365_HUNT_CHECKPOINTS
+
+
+@pytest.fixture
+def state_file(monkeypatch):
+    """
+    :return: dictionary holding the state file shared by all the connectors of the asset, in its 'state' key
+    """
+    state_file = {"state": {"admin_consent": True, "admin_auth": {"access_token": "test"}, "is_encrypted": True}}
+
+    def load_state(connector):
+        return json.loads(json.dumps(state_file["state"]))
+
+    def save_state(connector, state):
+        state_file["state"] = json.loads(json.dumps(state))
+        return True
+
+    monkeypatch.setattr(soar_stub.BaseConnector, "load_state", load_state)
+    monkeypatch.setattr(soar_stub.BaseConnector, "save_state", save_state)
+    return state_file
+
+
+def test_parallel_actions_keep_each_other_fields(state_file, new_connector):
+    first, second = new_connector(action="on_poll"), new_connector(action="run_query")
+
+    first._state["last_time"] = "2026-01-01T00:00:00Z"
+    first.save_state(first._state)
+    second._state["custom_field"] = 1
+    second.save_state(second._state)
+
+    assert state_file["state"]["last_time"] == "2026-01-01T00:00:00Z"
+    assert state_file["state"]["custom_field"] == 1
+    assert second._state["last_time"] == "2026-01-01T00:00:00Z"
+
+
+@pytest.mark.parametrize("field", [MSGOFFICE365_HUNT_CHECKPOINTS, MSGOFFICE365_FOLDER_ID_CACHE])
+def test_parallel_actions_merge_the_entries_of_the_dictionary_fields(state_file, new_connector, field):
+    state_file["state"][field] = {"removed": {"time": 1}}
+    first, second = new_connector(action="hunt_email"), new_connector(action="hunt_email")
+    second_entries = second._state[field]
+
+    first._state[field]["first"] = {"time": 2}
+    first._state[field].pop("removed")
+    first.save_state(first._state)
+    second._state[field]["second"] = {"time": 3}
+    second.save_state(second._state)
+
+    assert state_file["state"][field] == {"first": {"time": 2}, "second": {"time": 3}}
+    # The dictionary is updated in place, the references held by the action stay valid
+    assert second._state[field] is second_entries
+    assert second_entries == state_file["state"][field]
+
+
+def test_unchanged_state_is_not_saved(state_file, new_connector):
+    connector = new_connector()
+    state_file["state"]["saved_by_another_action"] = True
+
+    connector.save_state(connector._state)
+
+    assert "saved_by_another_action" in state_file["state"]
+
+
+def test_state_lock_serializes_the_saves(state_file, new_connector):
+    first, second = new_connector(action="on_poll"), new_connector(action="run_query")
+    second._state["custom_field"] = 1
+    saver = threading.Thread(target=second.save_state, args=(second._state,))
+
+    with first._state_file_lock():
+        saver.start()
+        time.sleep(0.5)
+        assert saver.is_alive()
+        assert "custom_field" not in state_file["state"]
+
+    saver.join(timeout=5)
+    assert not saver.is_alive()
+    assert state_file["state"]["custom_field"] == 1
+
+
+def test_state_is_not_saved_without_the_lock(state_file, new_connector, monkeypatch):
+    monkeypatch.setattr(office365_connector, "MSGOFFICE365_STATE_LOCK_TIMEOUT", 0.2)
+    first, second = new_connector(action="on_poll"), new_connector(action="run_query")
+    second._state["custom_field"] = 1
+
+    with first._state_file_lock():
+        assert not second.save_state(second._state)
+        assert "custom_field" not in state_file["state"]
+
+    # The changed field is saved by the next save
+    assert second.save_state(second._state)
+    assert state_file["state"]["custom_field"] == 1
@@ -0,0 +1,58 @@
+# File: tests/test_upload_file_chunks.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import requests
+from phantom.action_result import ActionResult
+
+import office365_connector
+
+
+def _response(status_code, headers=None, body=b"{}"):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = body
+    return response
+
+
+class UploadSession:
+    """
+    Upload session throttling the first chunk with the given Retry-After header.
+    """
+
+    def __init__(self, retry_after):
+        self.responses = [_response(429, {"Retry-After": retry_after}), _response(201)]
+        self.chunks = []
+
+    def put(self, url, headers=None, data=None, timeout=None):
+        self.chunks.append(headers["Content-Range"])
+        return self.responses.pop(0)
+
+    def get(self, url, timeout=None):
+        return _response(200, body=b'{"nextExpectedRanges": ["0-"]}')
+
+
+def test_http_date_retry_after_uses_the_configured_wait_time(new_connector, monkeypatch):
+    connector = new_connector(action="send_email", retry_wait_time=2)
+    sleeps = []
+    monkeypatch.setattr(office365_connector.time, "sleep", sleeps.append)
+    session = UploadSession("Wed, 21 Oct 2026 07:28:00 GMT")
+    action_result = ActionResult()
+
+    ret_val, response = connector._upload_file_chunks(action_result, session, "https://upload.invalid/session", b"content", 7)
+
+    assert ret_val, action_result.get_message()
+    assert response.status_code == 201
+    assert session.chunks == ["bytes 0-6/7", "bytes 0-6/7"]
+    assert sleeps == [3]